@@ -8,6 +8,16 @@ def create_app():
     app.config.from_object(Config)
     # Removed db.init_app(app) - no longer using SQLAlchemy
 
+    # Keep template backgrounds in memory so exports never re-read them from disk
+    from .template_assets import load_template_assets
+    load_template_assets()
+    from .vector_templates import load_vector_templates
+    load_vector_templates()
+
+    # Start export workers while the process is still single-threaded
+    from .pptx_export import start_render_pool
+    start_render_pool(app.config.get('EXPORT_RENDER_WORKERS', 1))
+
     from .routes import main
     app.register_blueprint(main)
     
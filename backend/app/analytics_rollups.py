@@ -0,0 +1,185 @@
+import re
+from firebase_admin import firestore
+
+# analytics/<user_id> keeps counters maintained at write time, so the analytics
+# page is one document read:
+#   'monthly': {'YYYY-MM': presentations created that month}
+#   'topics': {lowercased title: presentations with that title}
+#   'quizzes_generated' / 'scripts_generated': saved quizzes and scripts
+#   'rollup_version': set once the counters were built from the user's documents
+ANALYTICS_COLLECTION = 'analytics'
+ROLLUP_VERSION = 1
+ROLLUP_FIELDS = ['monthly', 'topics', 'quizzes_generated', 'scripts_generated', 'rollup_version']
+# Saved item collection -> its counter
+SAVED_ITEM_COUNTERS = {'saved_quizzes': 'quizzes_generated', 'saved_scripts': 'scripts_generated'}
+# Titles are cut to this length before they become topic keys
+MAX_TOPIC_LENGTH = 200
+# Firestore reserves field names of this form
+_RESERVED_KEY = re.compile(r'^__.*__$')
+
+def _analytics_ref(db, user_id):
+    return db.collection(ANALYTICS_COLLECTION).document(str(user_id))
+
+def month_key(created_at):
+    """'YYYY-MM' bucket of a creation time; None for unset or server timestamps"""
+    if created_at is None or created_at is firestore.SERVER_TIMESTAMP:
+        return None
+    if hasattr(created_at, 'isoformat'):
+        return created_at.isoformat()[:7]
+    return str(created_at)[:7] or None
+
+def topic_key(title):
+    """Topic counter key of a presentation title, or None when it has none"""
+    if not isinstance(title, str):
+        return None
+    key = title.strip().lower()[:MAX_TOPIC_LENGTH]
+    if not key or _RESERVED_KEY.match(key):
+        return None
+    return key
+
+def _stage_increments(writer, db, user_id, increments):
+    """
+    Queue counter increments on a user's analytics document.
+
+    Map keys are set as nested dicts with merge, so titles containing dots or
+    other path characters are stored as single keys, never split into paths.
+    """
+    document = {}
+    for path, delta in increments:
+        if not delta or None in path:
+            continue
+        target = document
+        for part in path[:-1]:
+            target = target.setdefault(part, {})
+        target[path[-1]] = firestore.Increment(delta)
+    if document:
+        writer.set(_analytics_ref(db, user_id), document, merge=True)
+
+def stage_presentation_counts(writer, db, user_id, created_at, title, delta):
+    """
+    Queue the monthly and topic counter changes for a created (+1) or deleted (-1) presentation.
+
+    Args:
+        writer: Transaction, WriteBatch or anything with set(ref, data, merge=True)
+        db: Firestore client
+        user_id: Owner of the presentation
+        created_at: Its creation time
+        title: Its title
+        delta: 1 or -1
+    """
+    if not user_id:
+        return
+    _stage_increments(writer, db, user_id, [
+        (('monthly', month_key(created_at)), delta),
+        (('topics', topic_key(title)), delta),
+    ])
+
+def stage_topic_change(writer, db, user_id, old_title, new_title):
+    """Queue moving a renamed presentation from its old topic counter to the new one"""
+    old_key, new_key = topic_key(old_title), topic_key(new_title)
+    if not user_id or old_key == new_key:
+        return
+    _stage_increments(writer, db, user_id, [(('topics', old_key), -1), (('topics', new_key), 1)])
+
+def stage_saved_item_count(writer, db, user_id, collection, delta):
+    """Queue the counter change for a quiz or script saved (+1) to or deleted (-1) from `collection`"""
+    if user_id:
+        _stage_increments(writer, db, user_id, [((SAVED_ITEM_COUNTERS[collection],), delta)])
+
+def save_item(db, collection, fields):
+    """
+    Save a quiz or script and count it in its owner's analytics in one batch.
+
+    Returns:
+        The new document reference
+    """
+    doc = db.collection(collection).document()
+    batch = db.batch()
+    batch.set(doc, fields)
+    stage_saved_item_count(batch, db, fields.get('user_id'), collection, 1)
+    batch.commit()
+    return doc
+
+def delete_item(db, collection, item_id):
+    """
+    Delete a saved quiz or script and uncount it in one transaction.
+
+    Returns:
+        False when the document did not exist
+    """
+    item_ref = db.collection(collection).document(str(item_id))
+
+    @firestore.transactional
+    def delete(transaction):
+        snapshot = item_ref.get(field_paths=['user_id'], transaction=transaction)
+        if not snapshot.exists:
+            return False
+        transaction.delete(item_ref)
+        stage_saved_item_count(transaction, db, (snapshot.to_dict() or {}).get('user_id'), collection, -1)
+        return True
+
+    return delete(db.transaction())
+
+def _count_rollups(transaction, db, user_id):
+    monthly = {}
+    topics = {}
+    presentations = db.collection('presentations').where('user_id', '==', user_id).select(['created_at', 'title'])
+    for doc in transaction.get(presentations):
+        data = doc.to_dict() or {}
+        month, topic = month_key(data.get('created_at')), topic_key(data.get('title'))
+        if month:
+            monthly[month] = monthly.get(month, 0) + 1
+        if topic:
+            topics[topic] = topics.get(topic, 0) + 1
+    rollups = {'monthly': monthly, 'topics': topics, 'rollup_version': ROLLUP_VERSION}
+    for collection, counter in SAVED_ITEM_COUNTERS.items():
+        items = db.collection(collection).where('user_id', '==', user_id).select(['user_id'])
+        rollups[counter] = sum(1 for _ in transaction.get(items))
+    return rollups
+
+def build_rollups(db, user_id, force=False):
+    """
+    Count a user's presentations, quizzes and scripts into their analytics document.
+
+    Runs in a transaction, so saves racing the count are not lost. Other
+    analytics fields (slides_created, image budget, ...) are kept.
+
+    Args:
+        db: Firestore client
+        user_id: User to build the counters of
+        force: Recount even when the counters were built before
+
+    Returns:
+        The user's analytics document data
+    """
+    analytics_ref = _analytics_ref(db, user_id)
+
+    @firestore.transactional
+    def build(transaction):
+        snapshot = analytics_ref.get(transaction=transaction)
+        data = snapshot.to_dict() if snapshot.exists else {}
+        if not force and data.get('rollup_version') == ROLLUP_VERSION:
+            return data
+        rollups = _count_rollups(transaction, db, user_id)
+        # Merging only these fields replaces the maps whole instead of merging into stale keys
+        transaction.set(analytics_ref, rollups, merge=ROLLUP_FIELDS)
+        return dict(data, **rollups)
+
+    return build(db.transaction())
+
+def user_analytics(db, user_id):
+    """
+    A user's analytics document with its rollups.
+
+    Normally a single document read; users whose counters were never built
+    get them built once (see build_rollups).
+    """
+    snapshot = _analytics_ref(db, user_id).get()
+    data = snapshot.to_dict() if snapshot.exists else {}
+    if data.get('rollup_version') == ROLLUP_VERSION:
+        return data
+    return build_rollups(db, user_id)
+
+def positive_counts(counts):
+    """Counter map without the keys whose presentations were all deleted"""
+    return {key: count for key, count in (counts or {}).items() if isinstance(count, (int, float)) and count > 0}
@@ -0,0 +1,230 @@
+import hashlib
+import json
+import os
+import struct
+import tempfile
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from flask import Response, current_app, request, send_file
+from app.export_streaming import save_package, send_document
+
+# Bump whenever a change to the exporters alters their output for the same input
+EXPORTER_VERSION = "2"
+
+DEFAULT_CACHE_MAX_BYTES = 512 * 1024 * 1024
+# DOS date/time of 1980-01-01 00:00:00, the zip format's epoch
+_ZIP_EPOCH_TIME = 0
+_ZIP_EPOCH_DATE = (1 << 5) | 1
+
+# One background builder so pre-warming never competes with interactive exports for cores
+_prewarm_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="export-prewarm")
+# Serializes builds of the same artifact (key -> [lock, threads using it]) and eviction scans
+_key_locks = {}
+_key_locks_lock = threading.Lock()
+_evict_lock = threading.Lock()
+
+def artifact_key(kind, payload, template_id=None, options=None):
+    """
+    Content hash identifying an export artifact.
+
+    Args:
+        kind: Export type, e.g. "pptx" or "quiz-docx"
+        payload: JSON-serializable input the document is built from
+        template_id: Template applied to the export, if any
+        options: Dict of settings that change the output (DPI, vector templates, ...)
+
+    Returns:
+        Hex sha256 of the canonical JSON of all inputs plus EXPORTER_VERSION
+    """
+    canonical = json.dumps(
+        {"kind": kind, "payload": payload, "template": template_id, "options": options or {}, "version": EXPORTER_VERSION},
+        sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+def _cache_dir():
+    directory = current_app.config.get('EXPORT_CACHE_DIR') or os.path.join(tempfile.gettempdir(), "smartslide-exports")
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+def artifact_path(key, extension):
+    return os.path.join(_cache_dir(), f"{key}.{extension}")
+
+def pin_zip_timestamps(package):
+    """
+    Overwrite the modification time of every entry in a saved zip with the zip epoch.
+
+    python-pptx and python-docx stamp each part with the time of saving; this
+    patches the local and central headers in place so identical documents
+    produce identical bytes.
+
+    Args:
+        package: Seekable binary file holding a complete zip
+    """
+    with zipfile.ZipFile(package) as archive:
+        entries = archive.infolist()
+        central_offset = archive.start_dir
+    stamp = struct.pack("<HH", _ZIP_EPOCH_TIME, _ZIP_EPOCH_DATE)
+    for info in entries:
+        package.seek(info.header_offset + 10)
+        package.write(stamp)
+    # Central directory records are contiguous: 46 fixed bytes plus name, extra and comment
+    for _ in entries:
+        package.seek(central_offset + 12)
+        package.write(stamp)
+        package.seek(central_offset + 28)
+        name_len, extra_len, comment_len = struct.unpack("<HHH", package.read(6))
+        central_offset += 46 + name_len + extra_len + comment_len
+    package.seek(0)
+
+@contextmanager
+def key_lock(key, locks=None, locks_lock=None):
+    """
+    Hold the lock of one key, e.g. while building the artifact it names.
+
+    Entries are reference-counted and only dropped once no thread holds or
+    waits on them, so every caller for the same key shares one lock.
+
+    Args:
+        key: Key to serialize on
+        locks: Dict of key -> [lock, users] to use instead of the export cache's
+        locks_lock: Lock guarding `locks`
+    """
+    if locks is None:
+        locks, locks_lock = _key_locks, _key_locks_lock
+    with locks_lock:
+        entry = locks.setdefault(key, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with locks_lock:
+            entry[1] -= 1
+            if not entry[1]:
+                del locks[key]
+
+def get_or_build_artifact(key, extension, build, compresslevel=None):
+    """
+    Path of the cached artifact for `key`, building and storing it on a miss.
+
+    Args:
+        key: artifact_key() of the inputs
+        extension: File extension, e.g. "pptx"
+        build: Callable returning a Presentation or Document
+        compresslevel: Deflate level passed to save_package
+
+    Returns:
+        Path to the artifact on disk
+    """
+    path = artifact_path(key, extension)
+    with key_lock(key):
+        if os.path.exists(path):
+            # mtime doubles as the LRU clock
+            os.utime(path)
+            return path
+        document = build()
+        handle, temp_path = tempfile.mkstemp(suffix=".partial", dir=os.path.dirname(path))
+        try:
+            with os.fdopen(handle, "w+b") as package:
+                save_package(document, package, compresslevel)
+                pin_zip_timestamps(package)
+            os.replace(temp_path, path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+    evict_artifacts()
+    return path
+
+def evict_artifacts(max_bytes=None, directory=None):
+    """
+    Delete least recently used artifacts until the cache fits in `max_bytes`.
+
+    Args:
+        max_bytes: Size cap (defaults to EXPORT_CACHE_MAX_BYTES)
+        directory: Cache directory to trim (defaults to the export cache)
+
+    Returns:
+        Number of artifacts removed
+    """
+    if max_bytes is None:
+        max_bytes = current_app.config.get('EXPORT_CACHE_MAX_BYTES', DEFAULT_CACHE_MAX_BYTES)
+    with _evict_lock:
+        entries = []
+        for entry in os.scandir(directory or _cache_dir()):
+            if entry.is_file() and not entry.name.endswith(".partial"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+    if removed:
+        current_app.logger.info(f"Evicted {removed} cached export artifacts")
+    return removed
+
+def send_artifact(key, extension, build, download_name, mimetype, compresslevel=None):
+    """
+    Respond with a cached export, honouring If-None-Match.
+
+    Falls back to building and streaming the document directly when
+    EXPORT_CACHE_ENABLED is off or the cache directory cannot be written.
+
+    Args:
+        key: artifact_key() of the inputs; also used as the strong ETag
+        extension: File extension, e.g. "pptx"
+        build: Callable returning a Presentation or Document
+        download_name: Attachment file name
+        mimetype: Response content type
+        compresslevel: Deflate level passed to save_package
+
+    Returns:
+        Flask response (304 when the client already has this artifact)
+    """
+    if not current_app.config.get('EXPORT_CACHE_ENABLED', True):
+        return send_document(build(), download_name, mimetype, compresslevel)
+    if request.if_none_match.contains(key):
+        response = Response(status=304)
+        response.set_etag(key)
+        return response
+    try:
+        path = get_or_build_artifact(key, extension, build, compresslevel)
+    except OSError as e:
+        current_app.logger.error(f"Export cache unavailable, sending uncached: {e}")
+        return send_document(build(), download_name, mimetype, compresslevel)
+    response = send_file(path, as_attachment=True, download_name=download_name, mimetype=mimetype, etag=key)
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+def prewarm_artifact(app, key, extension, build, compresslevel=None):
+    """
+    Build an artifact in the background so the next download is a cache hit.
+
+    Args:
+        app: Flask app, used to provide an app context to the worker thread
+        key: artifact_key() of the inputs
+        extension: File extension, e.g. "pptx"
+        build: Callable returning a Presentation or Document
+        compresslevel: Deflate level passed to save_package
+    """
+    if not app.config.get('EXPORT_CACHE_ENABLED', True):
+        return
+
+    def run():
+        with app.app_context():
+            try:
+                get_or_build_artifact(key, extension, build, compresslevel)
+            except Exception as e:
+                app.logger.error(f"Pre-warming export {key[:12]} failed: {e}")
+
+    _prewarm_executor.submit(run)
@@ -0,0 +1,231 @@
+import atexit
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from app.presentation_index import VersionConflict
+
+# Editor autosaves of a presentation are held here for a short window and only
+# the last one of a burst is written. The buffer is per process: a deployment
+# with several workers coalesces the saves each worker receives.
+DEFAULT_COALESCE_SECONDS = 2.0
+DEFAULT_MAX_DELAY_SECONDS = 10.0
+# Presentations whose last written state is remembered to drop no-op saves
+MAX_REMEMBERED_STATES = 4096
+
+# Presentation id -> pending entry (see buffer_autosave)
+_pending = {}
+# Presentation id -> (state hash, version) of its last write from this process
+_written = OrderedDict()
+# Presentation id -> record of its last buffered write that failed after the client got a 202:
+#   {'pending_version': version promised to the client, 'base_version': version the write was based on,
+#    'current_version': stored version when it conflicted, 'error': message when it failed otherwise}
+# Kept until a later save of the presentation succeeds, so that save (or an editor reload) reports it
+_failed = {}
+_cond = threading.Condition()
+_flusher = None
+# Serializes writes of the same presentation, so an older buffered state never lands after a newer save
+_key_locks = {}
+_key_locks_lock = threading.Lock()
+_metrics = {'saves': 0, 'unchanged': 0, 'coalesced': 0, 'writes': 0, 'conflicts': 0, 'failures': 0}
+
+def slides_state_hash(slides, template_id, presentation_type):
+    """Content hash of a saved editor state; identical saves hash the same"""
+    payload = json.dumps([slides, template_id, presentation_type], sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8", "surrogatepass")).hexdigest()
+
+def _key_lock(key):
+    with _key_locks_lock:
+        return _key_locks.setdefault(key, threading.Lock())
+
+def _due_at(entry):
+    # Written once the editor is idle for the window, or after the max delay during a long burst
+    return min(entry['last_at'] + entry['window'], entry['first_at'] + entry['max_delay'])
+
+def _remember(key, state_hash, version):
+    _written[key] = (state_hash, version)
+    _written.move_to_end(key)
+    while len(_written) > MAX_REMEMBERED_STATES:
+        _written.popitem(last=False)
+
+def buffer_autosave(app, key, state_hash, base_version, write,
+                    window=DEFAULT_COALESCE_SECONDS, max_delay=DEFAULT_MAX_DELAY_SECONDS):
+    """
+    Hold an autosave of a presentation so a burst of saves becomes one write.
+
+    Args:
+        app: Flask app, used to provide an app context to the write
+        key: Presentation id
+        state_hash: slides_state_hash of the saved state
+        base_version: Version the client's edits are based on, or None
+        write: Callable(base_version) writing the state and returning the new
+            version (None when the presentation is gone); may raise VersionConflict
+        window: Seconds without a newer save after which the state is written
+        max_delay: Most seconds a state waits during a continuous burst
+
+    Returns:
+        (status, version) where status is 'buffered' (version: the one the
+        write will create, when known), 'unchanged' (the state is already
+        stored or pending), 'conflict' (an earlier buffered write of this
+        client conflicted; version: the stored one) or 'direct' (the save
+        does not follow the pending one, or an earlier buffered write failed,
+        and must be written now, after flush_autosave)
+    """
+    now = time.monotonic()
+    with _cond:
+        failed = _failed.get(key)
+        if failed and failed['error'] is None and base_version is not None and base_version == failed['pending_version']:
+            _metrics['saves'] += 1
+            _metrics['conflicts'] += 1
+            return 'conflict', failed['current_version']
+        if failed and failed['error'] is not None:
+            # Written now, so the client learns about the lost write from this save's response
+            return 'direct', None
+        entry = _pending.get(key)
+        if entry is not None:
+            if entry['base_version'] is not None and base_version is not None \
+                    and base_version not in (entry['base_version'], entry['pending_version']):
+                return 'direct', None
+            _metrics['saves'] += 1
+            if state_hash == entry['hash']:
+                _metrics['unchanged'] += 1
+                return 'unchanged', entry['pending_version']
+            _metrics['coalesced'] += 1
+            entry.update(hash=state_hash, write=write, last_at=now)
+            return 'buffered', entry['pending_version']
+
+        _metrics['saves'] += 1
+        written = _written.get(key)
+        if written and written[0] == state_hash and base_version in (None, written[1]):
+            _metrics['unchanged'] += 1
+            return 'unchanged', written[1]
+        _pending[key] = {
+            'app': app,
+            'hash': state_hash,
+            'write': write,
+            'base_version': base_version,
+            'pending_version': base_version + 1 if base_version is not None else None,
+            'first_at': now,
+            'last_at': now,
+            'window': window,
+            'max_delay': max_delay,
+        }
+        _start_flusher()
+        _cond.notify()
+        return 'buffered', _pending[key]['pending_version']
+
+def _write_entry(key, entry):
+    app = entry['app']
+    with app.app_context():
+        try:
+            version = entry['write'](entry['base_version'])
+        except VersionConflict as e:
+            app.logger.warning(f"Buffered autosave of presentation {key} conflicted with version {e.current_version}")
+            with _cond:
+                _metrics['conflicts'] += 1
+                if entry['pending_version'] is not None:
+                    _failed[key] = {
+                        'pending_version': entry['pending_version'], 'base_version': entry['base_version'],
+                        'current_version': e.current_version, 'error': None
+                    }
+            return None
+        except Exception as e:
+            app.logger.error(f"Error writing buffered autosave of presentation {key}: {e}", exc_info=True)
+            with _cond:
+                _metrics['failures'] += 1
+                _failed[key] = {
+                    'pending_version': entry['pending_version'], 'base_version': entry['base_version'],
+                    'current_version': None, 'error': "An autosave could not be written; its changes were not saved"
+                }
+            return None
+    with _cond:
+        _metrics['writes'] += 1
+        _failed.pop(key, None)
+        if version is not None:
+            _remember(key, entry['hash'], version)
+    return version
+
+def _flush_key(key, due_only=False):
+    with _key_lock(key):
+        with _cond:
+            entry = _pending.get(key)
+            if entry is None or (due_only and _due_at(entry) > time.monotonic()):
+                return
+            del _pending[key]
+        _write_entry(key, entry)
+
+def flush_autosave(key, base_version=None):
+    """
+    Write a presentation's pending autosave now, before an explicit save or a read.
+
+    Args:
+        key: Presentation id
+        base_version: Version the caller's own save is based on
+
+    Returns:
+        (version the caller's save should be checked against, message of a
+        buffered write of this presentation that failed and was not saved
+        over since, or None)
+
+    Raises:
+        VersionConflict: `base_version` was promised by a buffered write that conflicted
+    """
+    _flush_key(key)
+    with _cond:
+        failed = _failed.get(key)
+    if not failed:
+        return base_version, None
+    if base_version is None or base_version != failed['pending_version']:
+        return base_version, failed['error']
+    if failed['error'] is None:
+        raise VersionConflict(failed['current_version'])
+    # The promised version was never written; the save applies on top of the one it was based on
+    return failed['base_version'], failed['error']
+
+def record_saved_state(key, state_hash, version):
+    """Note a state written outside the buffer (None when unknown, e.g. after a patch)"""
+    with _cond:
+        _failed.pop(key, None)
+        if version is not None:
+            _remember(key, state_hash, version)
+
+def flush_all_autosaves():
+    """Write every pending autosave; run at shutdown"""
+    with _cond:
+        keys = list(_pending)
+    for key in keys:
+        _flush_key(key)
+
+def autosave_metrics():
+    """
+    Counters of this process's autosave buffer.
+
+    'coalescing_ratio' is the number of autosaves received per Firestore write.
+    """
+    with _cond:
+        metrics = dict(_metrics, pending=len(_pending))
+    metrics['coalescing_ratio'] = round(metrics['saves'] / metrics['writes'], 2) if metrics['writes'] else None
+    return metrics
+
+def _run_flusher():
+    while True:
+        with _cond:
+            while True:
+                now = time.monotonic()
+                due = [key for key, entry in _pending.items() if _due_at(entry) <= now]
+                if due:
+                    break
+                next_due = min((_due_at(entry) for entry in _pending.values()), default=None)
+                _cond.wait(None if next_due is None else next_due - now)
+        for key in due:
+            _flush_key(key, due_only=True)
+
+def _start_flusher():
+    # Called with _cond held
+    global _flusher
+    if _flusher is None:
+        _flusher = threading.Thread(target=_run_flusher, name="autosave-flusher", daemon=True)
+        _flusher.start()
+
+atexit.register(flush_all_autosaves)
@@ -0,0 +1,146 @@
+import base64
+import hashlib
+import math
+import threading
+from collections import OrderedDict, namedtuple
+from io import BytesIO
+from PIL import Image
+
+# Pixels per inch kept for editor images; sharper than screens need, well below camera originals
+DEFAULT_IMAGE_DPI = 150
+JPEG_QUALITY = 85
+# Formats python-pptx can embed as they are; anything else (e.g. WebP) is re-encoded
+EMBEDDABLE_FORMATS = ("JPEG", "PNG", "GIF", "BMP", "TIFF")
+
+# An editor image ready to embed; field names match TemplateAsset so add_asset_picture can place it
+ExportImage = namedtuple("ExportImage", ["name", "blob", "sha1", "px_size", "cache_key"])
+
+# Prepared images keyed by (payload sha1, box, dpi, quality), shared across exports
+_prepared = OrderedDict()
+_PREPARED_MAX = 128
+_prepared_lock = threading.Lock()
+
+def collect_image_boxes(image_elements, px_to_in_x, px_to_in_y):
+    """
+    Largest box, in inches, each distinct data URI is placed in.
+
+    Args:
+        image_elements: Editor image dicts that will be rendered
+        px_to_in_x, px_to_in_y: Editor pixel to slide inch factors
+
+    Returns:
+        Dict mapping the data URI string to [max width, max height] in inches
+    """
+    boxes = {}
+    for img_data in image_elements:
+        src = img_data.get("src")
+        if not src or not src.startswith("data:image"):
+            continue
+        try:
+            width_in = float(img_data.get("width", 100)) * px_to_in_x
+            height_in = float(img_data.get("height", 100)) * px_to_in_y
+        except (TypeError, ValueError):
+            continue
+        box = boxes.setdefault(src, [0.0, 0.0])
+        box[0] = max(box[0], width_in)
+        box[1] = max(box[1], height_in)
+    return boxes
+
+def _target_size(px_size, box_in, dpi):
+    width, height = px_size
+    # Pictures are stretched to their box, so each axis can be reduced independently
+    return (
+        min(width, max(1, math.ceil(box_in[0] * dpi))),
+        min(height, max(1, math.ceil(box_in[1] * dpi)))
+    )
+
+def _encode(image, image_format, quality=JPEG_QUALITY):
+    output = BytesIO()
+    if image_format == "JPEG":
+        image.convert("RGB").save(output, format="JPEG", quality=quality, optimize=True)
+    else:
+        image.save(output, format="PNG")
+    return output.getvalue()
+
+def _has_alpha(image):
+    return image.mode in ("RGBA", "LA") and image.getchannel("A").getextrema()[0] < 255
+
+def _cache_key(src, box_in, dpi, quality):
+    header, encoded = src.split(",", 1)
+    payload_sha1 = hashlib.sha1(encoded.encode("ascii", "ignore")).hexdigest()
+    return (payload_sha1, round(box_in[0], 2), round(box_in[1], 2), dpi, quality), encoded
+
+def cached_export_image(src, box_in, dpi=DEFAULT_IMAGE_DPI, quality=JPEG_QUALITY):
+    """Previously prepared image for this data URI, box and quality, or None"""
+    key, _ = _cache_key(src, box_in, dpi, quality)
+    with _prepared_lock:
+        if key in _prepared:
+            _prepared.move_to_end(key)
+            return _prepared[key]
+    return None
+
+def remember_export_image(prepared):
+    """Cache an image prepared elsewhere (e.g. in a worker process) and return it"""
+    with _prepared_lock:
+        _prepared[prepared.cache_key] = prepared
+        _prepared.move_to_end(prepared.cache_key)
+        if len(_prepared) > _PREPARED_MAX:
+            _prepared.popitem(last=False)
+    return prepared
+
+def prepare_export_image(src, box_in, dpi=DEFAULT_IMAGE_DPI, cache=True, quality=JPEG_QUALITY):
+    """
+    Decode an editor data URI once and shrink it to the largest box it is placed in.
+
+    JPEGs are resampled only when larger than the box at `dpi`. PNGs without
+    transparency become JPEGs when that is smaller. Images python-pptx cannot
+    embed are re-encoded.
+
+    Args:
+        src: data:image URI from the editor
+        box_in: (width, height) in inches of the largest placement
+        dpi: Target resolution
+        cache: Look up and store the result in this process's cache
+        quality: JPEG quality used when the image is re-encoded
+
+    Returns:
+        ExportImage
+    """
+    key, encoded = _cache_key(src, box_in, dpi, quality)
+    payload_sha1 = key[0]
+    if cache:
+        with _prepared_lock:
+            if key in _prepared:
+                _prepared.move_to_end(key)
+                return _prepared[key]
+
+    blob = base64.b64decode(encoded)
+    with Image.open(BytesIO(blob)) as image:
+        source_format = image.format
+        px_size = image.size
+        target = _target_size(px_size, box_in, dpi)
+        animated = getattr(image, "is_animated", False)
+        resize = target != px_size and not animated
+        convert = source_format not in EMBEDDABLE_FORMATS
+        if resize or convert or source_format == "PNG":
+            if resize and source_format == "JPEG":
+                # Let the JPEG decoder scale down by a power of two while decoding
+                image.draft("RGB", target)
+            # Palette and exotic modes are widened first so resampling is not nearest-neighbour
+            working = image if image.mode in ("RGB", "RGBA", "L", "LA") else image.convert("RGBA")
+            if resize:
+                working = working.resize(target, Image.Resampling.BICUBIC, reducing_gap=2.0)
+            alpha = _has_alpha(working)
+            if source_format == "JPEG" and not convert:
+                candidates = [_encode(working, "JPEG", quality)]
+            elif alpha:
+                candidates = [_encode(working, "PNG")]
+            else:
+                candidates = [_encode(working, "JPEG", quality), _encode(working, "PNG")]
+            if not resize and not convert:
+                candidates.append(blob)
+            blob = min(candidates, key=len)
+            px_size = working.size
+
+    prepared = ExportImage(payload_sha1, blob, f"{payload_sha1}:{px_size[0]}x{px_size[1]}", px_size, key)
+    return remember_export_image(prepared) if cache else prepared
@@ -0,0 +1,38 @@
+from collections import namedtuple
+from flask import current_app
+from app.export_images import DEFAULT_IMAGE_DPI, JPEG_QUALITY
+
+# Settings trading export size and speed against fidelity.
+# zip_level None keeps python-pptx's own deflate settings (no extra re-zip pass).
+ExportProfile = namedtuple("ExportProfile", ["name", "image_dpi", "jpeg_quality", "recompress_backgrounds", "zip_level"])
+
+EXPORT_PROFILES = {
+    # Quick previews: screen resolution, visibly lossy JPEGs, shrunken template backgrounds
+    "draft": ExportProfile("draft", 96, 70, True, 1),
+    # Everyday downloads; image DPI follows EXPORT_IMAGE_DPI
+    "standard": ExportProfile("standard", DEFAULT_IMAGE_DPI, JPEG_QUALITY, False, None),
+    # Handouts: print resolution, near-lossless JPEGs, smallest XML
+    "print": ExportProfile("print", 300, 92, False, 9)
+}
+DEFAULT_EXPORT_PROFILE = "standard"
+
+def resolve_export_profile(name=None):
+    """
+    ExportProfile for a profile name from a request.
+
+    Args:
+        name: "draft", "standard" or "print"; None uses EXPORT_DEFAULT_PROFILE
+
+    Returns:
+        ExportProfile; unknown names fall back to the default profile
+    """
+    default_name = current_app.config.get('EXPORT_DEFAULT_PROFILE', DEFAULT_EXPORT_PROFILE)
+    if name is None:
+        name = default_name
+    profile = EXPORT_PROFILES.get(str(name).lower())
+    if profile is None:
+        current_app.logger.warning(f"Unknown export profile '{name}', using '{default_name}'")
+        profile = EXPORT_PROFILES.get(default_name, EXPORT_PROFILES[DEFAULT_EXPORT_PROFILE])
+    if profile.name == "standard":
+        profile = profile._replace(image_dpi=current_app.config.get('EXPORT_IMAGE_DPI', DEFAULT_IMAGE_DPI))
+    return profile
@@ -0,0 +1,91 @@
+import os
+import tempfile
+import zipfile
+from flask import current_app, send_file
+
+# Exported packages up to this size stay in memory; larger ones spill to a temp file
+DEFAULT_SPOOL_MAX_BYTES = 8 * 1024 * 1024
+
+PPTX_MIMETYPE = "application/vnd.openxmlformats-officedocument.presentationml.presentation"
+DOCX_MIMETYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+# Package parts that are already compressed; deflating them again only costs time
+STORED_EXTENSIONS = (".jpeg", ".jpg", ".png", ".gif", ".tif", ".tiff", ".emf", ".wmf")
+
+def save_package(document, file, compresslevel=None):
+    """
+    Save a python-pptx or python-docx document, optionally at a chosen deflate level.
+
+    With the default level the document saves itself directly. Otherwise its
+    package is re-zipped part by part: XML at `compresslevel`, media parts stored
+    as they are since they are compressed already. Neither library lets the
+    caller pick its zip settings, so this costs one extra pass over the package.
+
+    Args:
+        document: Object with a save(file) method
+        file: Seekable binary file to write the package to
+        compresslevel: zlib level 0-9, or None for python-pptx/python-docx's default
+    """
+    if compresslevel is None:
+        document.save(file)
+        return
+    with tempfile.SpooledTemporaryFile(max_size=current_app.config.get('EXPORT_SPOOL_MAX_BYTES', DEFAULT_SPOOL_MAX_BYTES)) as original:
+        document.save(original)
+        original.seek(0)
+        with zipfile.ZipFile(original) as source, zipfile.ZipFile(file, "w", zipfile.ZIP_DEFLATED, compresslevel=compresslevel) as target:
+            for info in source.infolist():
+                entry = zipfile.ZipInfo(info.filename, info.date_time)
+                entry.external_attr = info.external_attr
+                stored = os.path.splitext(info.filename)[1].lower() in STORED_EXTENSIONS
+                entry.compress_type = zipfile.ZIP_STORED if stored else zipfile.ZIP_DEFLATED
+                target.writestr(entry, source.read(info), compresslevel=compresslevel)
+
+def spool_document(document, max_memory=None, compresslevel=None):
+    """
+    Save a python-pptx Presentation or python-docx Document into a spooled file.
+
+    The zip writer streams each part into the spool as it is finalized, so
+    only `max_memory` bytes of the package are ever held in memory.
+
+    Args:
+        document: Object with a save(file) method
+        max_memory: Bytes kept in memory before spilling to disk
+            (defaults to EXPORT_SPOOL_MAX_BYTES)
+        compresslevel: Deflate level passed to save_package
+
+    Returns:
+        Tuple of (spooled file positioned at 0, package size in bytes)
+    """
+    if max_memory is None:
+        max_memory = current_app.config.get('EXPORT_SPOOL_MAX_BYTES', DEFAULT_SPOOL_MAX_BYTES)
+    spool = tempfile.SpooledTemporaryFile(max_size=max_memory, suffix=".export")
+    try:
+        save_package(document, spool, compresslevel)
+        size = spool.tell()
+        spool.seek(0)
+    except Exception:
+        spool.close()
+        raise
+    return spool, size
+
+def send_document(document, download_name, mimetype, compresslevel=None):
+    """
+    Send a saved document as an attachment, read back from a spooled file in chunks.
+
+    The package is written completely before the response starts, so a failed
+    save still becomes an error response instead of a truncated download.
+    The spool is closed (and any temp file removed) when the response closes.
+
+    Args:
+        document: Presentation or Document to save
+        download_name: Attachment file name
+        mimetype: Response content type
+        compresslevel: Deflate level passed to save_package
+
+    Returns:
+        Flask response with Content-Length set
+    """
+    spool, size = spool_document(document, compresslevel=compresslevel)
+    response = send_file(spool, as_attachment=True, download_name=download_name, mimetype=mimetype)
+    response.content_length = size
+    return response
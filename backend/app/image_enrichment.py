@@ -0,0 +1,130 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from firebase_admin import firestore
+from app.image_service import generate_slide_image
+from app.placeholder_images import placeholder_data_uri
+from app.slide_store import load_slides, stage_slide_updates, uses_slide_subcollection
+
+# Shared pool for background image enrichment; bounded so a burst of decks
+# cannot open an unbounded number of connections to the image service.
+_enrichment_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="image-enrichment")
+
+# Stored slide statuses that a finished remote image may still replace
+UPGRADABLE_STATUSES = ('pending', 'placeholder')
+
+def start_image_enrichment(app, db, presentation_id, jobs, style="professional", template_id=None, on_complete=None):
+    """
+    Generate slide images in the background and attach them to a stored presentation.
+
+    Args:
+        app: Flask app, used to provide an app context to the worker threads
+        db: Firestore client
+        presentation_id: Presentation document to attach images to
+        jobs: List of (slide_index, image_prompt) tuples
+        style: Image style preference
+        template_id: Template whose palette is used for placeholders when an image fails
+        on_complete: Optional callable(generated_count) run once all jobs finished
+    """
+    # The coordinator waits on the pool, so it runs on its own thread rather than in it
+    threading.Thread(
+        target=_run_enrichment,
+        args=(app, db, presentation_id, jobs, style, template_id, on_complete),
+        daemon=True
+    ).start()
+
+def attach_late_images(app, db, presentation_id, pending, on_complete=None):
+    """
+    Upgrade placeholder images once their remote generations finish.
+
+    Args:
+        app: Flask app, used to provide an app context to the worker thread
+        db: Firestore client
+        presentation_id: Presentation document holding the placeholders
+        pending: List of (slide_index, future) tuples from generate_slide_image_with_deadline
+        on_complete: Optional callable(generated_count) run once all futures resolved
+    """
+    def run():
+        presentation_ref = db.collection('presentations').document(str(presentation_id))
+        wait([future for _, future in pending])
+        results = {}
+        with app.app_context():
+            for index, future in pending:
+                try:
+                    image_url = future.result()
+                except Exception as e:
+                    app.logger.error(f"❌ Late image for slide {index+1} failed: {e}")
+                    image_url = None
+                # A failed upgrade keeps the placeholder already stored on the slide
+                if image_url:
+                    results[index] = _store_result(app, presentation_ref, index, image_url, 'ready')
+            _finish(app, db, presentation_ref, presentation_id, results, len(pending), on_complete)
+
+    threading.Thread(target=run, daemon=True).start()
+
+def _store_result(app, presentation_ref, index, image_url, status):
+    result = {'image_url': image_url, 'image_status': status}
+    # Field-level update so concurrent workers never overwrite each other
+    try:
+        presentation_ref.update({f'slide_images.{index}': result})
+    except Exception as e:
+        app.logger.error(f"Error storing background image for slide {index+1}: {e}")
+    return result
+
+def _generate_one(app, presentation_ref, index, prompt, style, template_id):
+    with app.app_context():
+        try:
+            image_url = generate_slide_image(prompt=prompt, width=1024, height=576, style=style)
+        except Exception as e:
+            app.logger.error(f"❌ Background image for slide {index+1} failed: {e}")
+            image_url = None
+        if image_url:
+            return index, _store_result(app, presentation_ref, index, image_url, 'ready')
+        return index, _store_result(app, presentation_ref, index, placeholder_data_uri(prompt, template_id), 'placeholder')
+
+def _run_enrichment(app, db, presentation_id, jobs, style, template_id, on_complete):
+    presentation_ref = db.collection('presentations').document(str(presentation_id))
+    futures = [
+        _enrichment_executor.submit(_generate_one, app, presentation_ref, index, prompt, style, template_id)
+        for index, prompt in jobs
+    ]
+    results = dict(f.result() for f in futures)
+
+    with app.app_context():
+        _finish(app, db, presentation_ref, presentation_id, results, len(jobs), on_complete)
+
+def _finish(app, db, presentation_ref, presentation_id, results, job_count, on_complete):
+    try:
+        _merge_into_slides(db, presentation_ref, results)
+    except Exception as e:
+        app.logger.error(f"Error merging background images into presentation {presentation_id}: {e}")
+    generated_count = sum(1 for r in results.values() if r['image_status'] == 'ready')
+    app.logger.info(f"✅ Background enrichment for {presentation_id}: {generated_count}/{job_count} images")
+    if on_complete:
+        on_complete(generated_count)
+
+def _merge_into_slides(db, presentation_ref, results):
+    """Copy finished images into the stored slides that are still waiting for them."""
+    @firestore.transactional
+    def merge(transaction):
+        snapshot = presentation_ref.get(transaction=transaction)
+        if not snapshot.exists:
+            return
+        data = snapshot.to_dict()
+        indexes = sorted(results)
+        # Only the slides that got an image are read (and, when stored as documents, rewritten)
+        stored = load_slides(db, presentation_ref, data, indexes, transaction=transaction)
+        changes = {}
+        for index, slide in zip(indexes, stored):
+            # Slides already rewritten by the editor no longer carry an upgradable status
+            if isinstance(slide, dict) and slide.get('image_status') in UPGRADABLE_STATUSES:
+                changes[index] = dict(slide, image_status=results[index]['image_status'], image_url=results[index]['image_url'])
+        if uses_slide_subcollection(data):
+            fields = stage_slide_updates(transaction, presentation_ref, data.get('slide_ids') or [], changes)
+        else:
+            slides = data.get('slides') or []
+            for index, slide in changes.items():
+                slides[index] = slide
+            fields = {'slides': slides}
+        transaction.update(presentation_ref, dict(fields, image_enrichment='done'))
+
+    merge(db.transaction())
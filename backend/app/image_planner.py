@@ -0,0 +1,104 @@
+import re
+
+# Title keywords that suggest a slide benefits from a visual
+VISUAL_KEYWORDS = [
+    "process", "system", "architecture", "comparison", "versus", "vs", "data",
+    "trend", "statistic", "map", "timeline", "cycle", "structure", "diagram",
+    "workflow", "anatomy", "lifecycle", "evolution", "landscape", "design",
+    "model", "framework", "ecosystem", "growth", "impact", "example", "case study"
+]
+
+# Title keywords for slides that are purely textual
+TEXT_ONLY_KEYWORDS = [
+    "introduction", "conclusion", "summary", "reference", "source", "bibliography",
+    "citation", "quote", "definition", "agenda", "outline", "next steps", "q&a", "questions"
+]
+
+# Slides scoring below this are never scheduled nor offered for lazy generation
+MIN_IMAGE_SCORE = 2.0
+
+def build_slide_image_prompt(slide):
+    """Build the image prompt for a slide from its title and first content point"""
+    title = slide.get('title', 'presentation topic')
+    title = str(title).replace('"', '').replace("'", '').replace('\\', '')
+
+    content = slide.get('content', [])
+    first_content = ''
+    if isinstance(content, list) and len(content) > 0:
+        first_content = str(content[0])[:100]
+        first_content = first_content.replace('"', '').replace("'", '')
+
+    image_prompt = f"{title}. {first_content}"
+    image_prompt = image_prompt.strip()[:200]
+    return ''.join(char for char in image_prompt if ord(char) < 127 or char.isalpha())
+
+def _contains_keyword(text, keywords):
+    return [kw for kw in keywords if re.search(rf"\b{re.escape(kw)}", text)]
+
+def score_slide(slide, index, total):
+    """
+    Score how much a slide is expected to benefit from an image.
+
+    Combines the LLM's needs_image flag with local signals: visual or text-only
+    title keywords, content length and the slide's position in the deck.
+
+    Returns:
+        Float score, or None if the slide must never get an image (title slide, references)
+    """
+    title = str(slide.get('title', '')).lower()
+    if index == 0 or _contains_keyword(title, ["reference", "source", "bibliography"]):
+        return None
+
+    score = 3.0 if slide.get("needs_image", False) else 0.0
+
+    score += min(2, len(_contains_keyword(title, VISUAL_KEYWORDS))) * 1.0
+    if _contains_keyword(title, TEXT_ONLY_KEYWORDS):
+        score -= 3.0
+
+    # Dense slides leave little room for a picture
+    content = slide.get('content', [])
+    text_length = sum(len(str(c)) for c in content) if isinstance(content, list) else len(str(content))
+    if text_length < 300:
+        score += 1.0
+    elif text_length > 700:
+        score -= 1.0
+
+    # Prefer the core content in the middle of the deck over the edges
+    if total > 2:
+        center_distance = abs(index / (total - 1) - 0.5) * 2
+        score += (1.0 - center_distance) * 0.5
+
+    return score
+
+def plan_slide_images(slides, deck_budget, user_budget=None):
+    """
+    Decide which slides get an image generated now.
+
+    Eligible slides are ranked by score and only the top-N are scheduled, where N
+    is the smaller of the per-deck and remaining per-user budget. Other eligible
+    slides are left for lazy, on-demand generation.
+
+    Args:
+        slides: Slide dicts as returned by the LLM
+        deck_budget: Maximum images to generate for this deck
+        user_budget: Remaining images allowed for the user, or None for no limit
+
+    Returns:
+        Tuple of (scheduled_indexes, lazy_indexes), each in slide order
+    """
+    total = len(slides)
+    candidates = []
+    for i, slide in enumerate(slides):
+        score = score_slide(slide, i, total)
+        if score is not None and score >= MIN_IMAGE_SCORE:
+            candidates.append((score, i))
+
+    budget = max(0, deck_budget)
+    if user_budget is not None:
+        budget = min(budget, max(0, user_budget))
+
+    # Highest score first, earlier slide wins ties
+    candidates.sort(key=lambda c: (-c[0], c[1]))
+    scheduled = sorted(i for _, i in candidates[:budget])
+    lazy = sorted(i for _, i in candidates[budget:])
+    return scheduled, lazy
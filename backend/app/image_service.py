@@ -1,10 +1,71 @@
-import os
+import re
+import hashlib
+import threading
+import unicodedata
 import requests
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
 from flask import current_app
 from urllib.parse import quote
 import time
+from app.placeholder_images import placeholder_data_uri
 
-def generate_image_pollinations(prompt, width=1024, height=576, model="flux"):
+# Style descriptors prepended to every prompt. Kept as lists so they can be
+# merged with the shared suffix and put in a stable order.
+STYLE_ENHANCEMENTS = {
+    "professional": ["professional", "clean", "high-quality", "business presentation style"],
+    "minimalist": ["minimalist", "simple", "clean lines", "modern design"],
+    "colorful": ["vibrant colors", "eye-catching", "energetic", "dynamic"],
+    "3d": ["3d rendered", "realistic lighting", "detailed textures"],
+    "illustration": ["illustrated", "artistic", "hand-drawn style", "creative"],
+    "photorealistic": ["photorealistic", "detailed", "sharp focus", "professional photography"]
+}
+PROMPT_SUFFIX_DESCRIPTORS = ["no text", "no watermarks", "high quality"]
+MAX_SUBJECT_LENGTH = 200
+
+# Remote generations keep running here after a deadline miss so they can upgrade the placeholder
+_hedge_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="image-hedge")
+
+# Image URLs already verified in this process, keyed by image_cache_key()
+_verified_image_urls = OrderedDict()
+_verified_image_urls_lock = threading.Lock()
+_VERIFIED_IMAGE_URLS_MAX = 512
+
+def normalize_image_prompt(prompt, style="professional"):
+    """
+    Normalize a slide image prompt so equivalent slide concepts map to the same text.
+
+    The subject is NFKC-normalized, lower-cased, stripped of quotes and stray
+    punctuation and whitespace-collapsed; the style descriptors are merged with
+    the shared suffix, de-duplicated and sorted.
+
+    Returns:
+        Tuple of (normalized_prompt, normalized_style)
+    """
+    if style not in STYLE_ENHANCEMENTS:
+        style = "professional"
+
+    subject = unicodedata.normalize("NFKC", str(prompt or ""))
+    subject = subject.lower()
+    subject = re.sub(r"[^\w\s,.:;&+/-]", " ", subject)
+    subject = re.sub(r"\s+", " ", subject).strip(" .,:;-")
+    if len(subject) > MAX_SUBJECT_LENGTH:
+        subject = subject[:MAX_SUBJECT_LENGTH].rsplit(" ", 1)[0]
+
+    descriptors = sorted(set(STYLE_ENHANCEMENTS[style] + PROMPT_SUFFIX_DESCRIPTORS))
+    return f"{subject}. {', '.join(descriptors)}", style
+
+def image_seed(normalized_prompt, style):
+    """Derive a deterministic Pollinations seed from the normalized prompt and style"""
+    digest = hashlib.sha256(f"{style}|{normalized_prompt}".encode("utf-8")).hexdigest()
+    return int(digest[:8], 16) % (2 ** 31)
+
+def image_cache_key(normalized_prompt, style, width, height, model):
+    """Stable cache key for a generated image; identical inputs always share it"""
+    raw = f"{style}|{model}|{width}x{height}|{normalized_prompt}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+def generate_image_pollinations(prompt, width=1024, height=576, model="flux", seed=None):
     """
     Generate image using Pollinations.ai (100% FREE, no API key needed)
     
@@ -13,6 +74,7 @@ def generate_image_pollinations(prompt, width=1024, height=576, model="flux"):
         width:  Image width (default 1024 for slides)
         height: Image height (default 576 for 16:9 slides)
         model: AI model to use ('flux', 'turbo', or 'flux-realism')
+        seed: Optional seed; the same prompt and seed always yield the same image
     
     Returns:
         Image URL (direct link to generated image)
@@ -24,6 +86,8 @@ def generate_image_pollinations(prompt, width=1024, height=576, model="flux"):
         # Build the Pollinations.ai URL
         # Format: https://image.pollinations.ai/prompt/{prompt}? width={width}&height={height}&model={model}
         image_url = f"https://image.pollinations.ai/prompt/{encoded_prompt}?width={width}&height={height}&model={model}&nologo=true&enhance=true"
+        if seed is not None:
+            image_url += f"&seed={seed}"
         
         current_app.logger.info(f"Generating image via Pollinations.ai: {prompt}")
         current_app.logger.info(f"Image URL: {image_url}")
@@ -59,20 +123,11 @@ def generate_slide_image(prompt, width=1024, height=576, style="professional"):
         Direct URL to generated image
     """
     
-    # Enhance prompt based on style
-    style_enhancements = {
-        "professional": "Professional, clean, high-quality, business presentation style,",
-        "minimalist": "Minimalist, simple, clean lines, modern design,",
-        "colorful":  "Vibrant colors, eye-catching, energetic, dynamic,",
-        "3d":  "3D rendered, realistic lighting, detailed textures,",
-        "illustration": "Illustrated, artistic, hand-drawn style, creative,",
-        "photorealistic": "Photorealistic, detailed, sharp focus, professional photography,"
-    }
-    
-    enhancement = style_enhancements.get(style, style_enhancements["professional"])
-    enhanced_prompt = f"{enhancement} {prompt}.  No text, no watermarks, high quality."
+    # Normalize the prompt so the same slide concept always maps to the same URL
+    normalized_prompt, style = normalize_image_prompt(prompt, style)
+    seed = image_seed(normalized_prompt, style)
     
-    current_app.logger.info(f"Generating slide image:  {enhanced_prompt[: 100]}...")
+    current_app.logger.info(f"Generating slide image:  {normalized_prompt[: 100]}...")
     
     # Choose model based on style
     if style in ["photorealistic", "3d"]: 
@@ -82,16 +137,69 @@ def generate_slide_image(prompt, width=1024, height=576, style="professional"):
     else:
         model = "flux"  # Default to flux (best quality)
     
+    # Deterministic URLs only need to be verified once per process
+    cache_key = image_cache_key(normalized_prompt, style, width, height, model)
+    with _verified_image_urls_lock:
+        cached_url = _verified_image_urls.get(cache_key)
+        if cached_url is not None:
+            _verified_image_urls.move_to_end(cache_key)
+    if cached_url is not None:
+        current_app.logger.info(f"♻️ Reusing cached image for:  {prompt[: 50]}...")
+        return cached_url
+    
     # Generate with Pollinations.ai
-    image_url = generate_image_pollinations(enhanced_prompt, width, height, model)
+    image_url = generate_image_pollinations(normalized_prompt, width, height, model, seed=seed)
     
     if image_url:
+        with _verified_image_urls_lock:
+            _verified_image_urls[cache_key] = image_url
+            if len(_verified_image_urls) > _VERIFIED_IMAGE_URLS_MAX:
+                _verified_image_urls.popitem(last=False)
         current_app.logger.info(f"✅ Successfully generated image for:  {prompt[: 50]}...")
         return image_url
     else:
         current_app.logger.warning(f"❌ Failed to generate image for:  {prompt}")
         return None
 
+def generate_slide_image_with_deadline(prompt, title=None, template_id=None, deadline=8.0,
+                                       width=1024, height=576, style="professional"):
+    """
+    Generate a slide image, falling back to a local placeholder if the remote image is late
+    
+    Args:
+        prompt: Description of what to generate
+        title: Slide title used for the placeholder keywords (defaults to the prompt)
+        template_id: Template whose palette the placeholder uses
+        deadline: Seconds to wait for the remote image before using the placeholder
+        width: Image width (default 1024)
+        height: Image height (default 576 for 16:9)
+        style: Image style preference
+    
+    Returns:
+        Tuple of (image_url, is_placeholder, pending_future). pending_future is the
+        still-running remote generation when the deadline was missed, so callers can
+        upgrade the placeholder once it resolves; otherwise None.
+    """
+    app = current_app._get_current_object()
+    
+    def remote():
+        with app.app_context():
+            return generate_slide_image(prompt, width, height, style)
+    
+    future = _hedge_executor.submit(remote)
+    pending_future = None
+    try:
+        image_url = future.result(timeout=deadline)
+        if image_url:
+            return image_url, False, None
+    except FuturesTimeout:
+        current_app.logger.warning(f"⏱️ Image missed {deadline}s deadline, using placeholder:  {prompt[: 50]}...")
+        pending_future = future
+    except Exception as e:
+        current_app.logger.error(f"Error generating slide image: {e}")
+    
+    return placeholder_data_uri(title or prompt, template_id), True, pending_future
+
 def generate_multiple_images(prompts, width=1024, height=576, style="professional", delay=0.5):
     """
     Generate multiple images with a delay between requests
@@ -0,0 +1,74 @@
+import re
+import base64
+import hashlib
+import random
+from io import BytesIO
+from PIL import Image, ImageChops, ImageDraw, ImageFont
+from app.template_registry import template_palette
+
+STOPWORDS = {
+    "a", "an", "and", "the", "of", "in", "on", "for", "to", "with", "by", "from", "its",
+    "at", "as", "is", "are", "how", "what", "why", "into", "vs", "versus", "their", "our"
+}
+
+def _rgb(hex_color):
+    return tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
+
+def title_keywords(title, limit=3):
+    """Pick up to `limit` meaningful words from a slide title, in title order"""
+    words = re.findall(r"[A-Za-z0-9][A-Za-z0-9'-]*", str(title or ""))
+    keywords = [w for w in words if w.lower() not in STOPWORDS and len(w) > 2]
+    return keywords[:limit]
+
+def generate_placeholder_image(title, template_id=None, width=512, height=288, quality=75):
+    """
+    Render a local placeholder image for a slide in a few milliseconds.
+
+    Draws a diagonal gradient in the template palette, a handful of translucent
+    geometric motifs seeded from the title (so a slide always gets the same
+    placeholder) and the title keywords.
+
+    Returns:
+        JPEG bytes
+    """
+    palette = template_palette(template_id)
+    start, end, accent, text_color = (_rgb(c) for c in palette)
+    rng = random.Random(hashlib.sha256(str(title or "").encode("utf-8")).hexdigest())
+
+    # Diagonal gradient: average a vertical and a horizontal ramp into the blend mask
+    vertical = Image.linear_gradient("L").resize((width, height))
+    horizontal = Image.linear_gradient("L").rotate(rng.choice([90, -90])).resize((width, height))
+    mask = ImageChops.add(vertical, horizontal, scale=2.0)
+    image = Image.composite(Image.new("RGB", (width, height), end), Image.new("RGB", (width, height), start), mask)
+
+    overlay = Image.new("RGBA", (width, height), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(overlay)
+    for _ in range(rng.randint(3, 6)):
+        size = rng.randint(height // 5, height // 2)
+        x = rng.randint(-size // 2, width - size // 2)
+        y = rng.randint(-size // 2, height - size // 2)
+        color = rng.choice([accent, text_color]) + (rng.randint(40, 90),)
+        if rng.random() < 0.5:
+            draw.ellipse((x, y, x + size, y + size), fill=color)
+        else:
+            draw.rounded_rectangle((x, y, x + size, y + size * 2 // 3), radius=size // 8, fill=color)
+    image = Image.alpha_composite(image.convert("RGBA"), overlay).convert("RGB")
+
+    keywords = title_keywords(title)
+    if keywords:
+        draw = ImageDraw.Draw(image)
+        font = ImageFont.load_default(size=max(12, height // 9))
+        label = "  ·  ".join(keywords)
+        left, top, right, bottom = draw.textbbox((0, 0), label, font=font)
+        x = (width - (right - left)) // 2
+        y = (height - (bottom - top)) // 2
+        draw.text((x, y), label, font=font, fill=text_color)
+
+    output = BytesIO()
+    image.save(output, format="JPEG", quality=quality)
+    return output.getvalue()
+
+def placeholder_data_uri(title, template_id=None, width=512, height=288):
+    """Placeholder image as a data URI usable directly as a slide image_url"""
+    encoded = base64.b64encode(generate_placeholder_image(title, template_id, width, height)).decode("ascii")
+    return f"data:image/jpeg;base64,{encoded}"
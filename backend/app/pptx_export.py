@@ -0,0 +1,935 @@
+import math
+import multiprocessing
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from itertools import repeat
+from io import BytesIO
+from flask import current_app
+from pptx import Presentation as PptxPresentation
+from pptx.util import Pt, Inches
+from pptx.dml.color import RGBColor
+from pptx.enum.text import PP_ALIGN, MSO_AUTO_SIZE
+from lxml import etree
+from pptx.oxml import parse_xml
+from pptx.oxml.ns import nsdecls, qn
+from app.export_images import DEFAULT_IMAGE_DPI, JPEG_QUALITY, cached_export_image, collect_image_boxes, prepare_export_image, remember_export_image
+from app.rich_text import parse_runs
+from app.slide_fragments import cached_slide_fragment, remember_slide_fragment, restore_slide_fragment, slide_fragment_key
+from app.template_assets import add_asset_picture, recompress_template_asset
+from app.template_registry import lookup_template, normalize_template_id, template_background
+from app.text_fit import TEXT_FIT_VERSION, fit_textbox_plan
+from app.vector_templates import vector_shapes
+
+# Define slide and editor dimensions (in inches and pixels)
+PPTX_SLIDE_WIDTH_INCHES = 13.33
+PPTX_SLIDE_HEIGHT_INCHES = 7.5
+EDITOR_SLIDE_WIDTH_PX = 1280 # Assuming this is the canvas width in the frontend editor
+EDITOR_SLIDE_HEIGHT_PX = 720 # Assuming this is the canvas height in the frontend editor
+
+# Layouts of the default deck reused for template backgrounds; 6 (Blank) stays plain
+TITLE_LAYOUT_INDEX = 0
+CONTENT_LAYOUT_INDEX = 1
+BLANK_LAYOUT_INDEX = 6
+# Layout placeholders kept when a layout becomes a background layout; add_slide never clones these
+NON_CLONED_PLACEHOLDER_TYPES = ("dt", "ftr", "sldNum")
+
+# Serialized base decks keyed by (template id, title asset sha1, content asset sha1, slide size)
+_base_decks = OrderedDict()
+_BASE_DECKS_MAX = 32
+_base_decks_lock = threading.Lock()
+# Compiled vector shapes keyed by (template id, slide type, slide size)
+_compiled_vector_shapes = {}
+
+# Decks shorter than this are compiled in the request process; pool overhead outweighs the gain
+PARALLEL_MIN_SLIDES = 12
+_render_pool = None
+_render_pool_lock = threading.Lock()
+
+@lru_cache(maxsize=256)
+def parse_hex_color(hex_color, default_color="bfdbfe"):
+    """
+    Pure version of hex_to_rgb for code that runs without an app context.
+
+    Returns:
+        (rgb tuple, warning message or None)
+    """
+    warning = None
+    if not hex_color:
+        warning = f"Empty hex color, using default {default_color}"
+        hex_color = default_color
+    if hex_color.startswith('#'):
+        hex_color = hex_color[1:]
+    if len(hex_color) == 3:
+        hex_color = ''.join([c*2 for c in hex_color])
+    if len(hex_color) != 6:
+        warning = f"Invalid hex color length: '{hex_color}', using default {default_color}"
+        hex_color = default_color
+    try:
+        return tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4)), warning
+    except ValueError as e:
+        warning = f"Invalid hex color: '{hex_color}', using default {default_color}. Error: {e}"
+        return tuple(int(default_color[i:i+2], 16) for i in (0, 2, 4)), warning
+
+def hex_to_rgb(hex_color, default_color="bfdbfe"):
+    """Convert hex color to RGB tuple. Expands 3-digit hex, defaults to the provided default_color if invalid."""
+    rgb, warning = parse_hex_color(hex_color, default_color)
+    if warning:
+        current_app.logger.warning(warning)
+    return rgb
+
+def calculate_position(shape_def, position_type, slide_width_inches, slide_height_inches):
+    """Calculate position (left/top) based on shape definition"""
+    # Check for direct inch values first
+    inch_key = f"{position_type}_in"
+    if inch_key in shape_def:
+        return Inches(shape_def[inch_key])
+        
+    # Check for ratio-based positioning
+    ratio_key = f"{position_type}_ratio"
+    if ratio_key in shape_def:
+        ratio = shape_def[ratio_key]
+        if position_type == "left":
+            return Inches(ratio * slide_width_inches)
+        else:  # top
+            return Inches(ratio * slide_height_inches)
+            
+    # Default to 0
+    return Inches(0)
+
+def calculate_dimension(shape_def, dimension_type, slide_width_inches, slide_height_inches):
+    """Calculate dimension (width/height) based on shape definition"""
+    # Check for direct inch values first
+    inch_key = f"{dimension_type}_in"
+    if inch_key in shape_def:
+        return Inches(shape_def[inch_key])
+        
+    # Check for ratio-based sizing
+    ratio_key = f"{dimension_type}_ratio"
+    if ratio_key in shape_def:
+        ratio = shape_def[ratio_key]
+        if dimension_type == "width":
+            return Inches(ratio * slide_width_inches)
+        else:  # height
+            return Inches(ratio * slide_height_inches)
+            
+    # Check for slide-height-based sizing
+    height_ratio_key = f"{dimension_type}_as_ratio_of_slide_height"
+    if height_ratio_key in shape_def:
+        ratio = shape_def[height_ratio_key]
+        return Inches(ratio * slide_height_inches)
+        
+    # Default to 1 inch
+    return Inches(1)
+
+def set_color_transparency(color_elements, transparency):
+    """Give <a:srgbClr> elements an alpha; python-pptx has no transparency API"""
+    alpha = str(int(round((1.0 - float(transparency)) * 100000)))
+    for color in color_elements:
+        for existing in color.findall(qn("a:alpha")):
+            color.remove(existing)
+        color.append(parse_xml(f'<a:alpha {nsdecls("a")} val="{alpha}"/>'))
+
+def draw_template_shape(slide, shape_def, slide_width_inches, slide_height_inches):
+    """
+    Draw a shape on the slide based on shape definition
+    
+    Args:
+        slide: PowerPoint slide object
+        shape_def: Shape definition from template
+        slide_width_inches: Slide width in inches
+        slide_height_inches: Slide height in inches
+    
+    Returns:
+        bool: True if shape was drawn successfully, False otherwise
+    """
+    try:
+        if not shape_def:
+            current_app.logger.warning("Empty shape definition provided")
+            return False
+            
+        shape_type = shape_def.get("type", "rectangle")
+        current_app.logger.debug(f"Drawing template shape: type={shape_type}, def={shape_def}")
+        
+        # Calculate position and size with validation
+        left = calculate_position(shape_def, "left", slide_width_inches, slide_height_inches)
+        top = calculate_position(shape_def, "top", slide_width_inches, slide_height_inches)
+        width = calculate_dimension(shape_def, "width", slide_width_inches, slide_height_inches)
+        height = calculate_dimension(shape_def, "height", slide_width_inches, slide_height_inches)
+        
+        # Validate dimensions
+        if width <= 0 or height <= 0:
+            current_app.logger.warning(f"Invalid shape dimensions: width={width}, height={height}")
+            return False
+        
+        from pptx.enum.shapes import MSO_SHAPE
+        
+        # Use rounded rectangle for content box if specified
+        is_content_box = shape_def.get("comment", "") == "content_box"
+        if shape_type == "rectangle" and is_content_box:
+            shape = slide.shapes.add_shape(MSO_SHAPE.ROUNDED_RECTANGLE, left, top, width, height)
+            # Set rounding if radius is specified (python-pptx uses adjustment values 0-1)
+            radius = shape_def.get("radius")
+            if radius is not None:
+                try:
+                    # Adjustment 0 is corner rounding, 0.0 (square) to 1.0 (fully round)
+                    shape.adjustments[0] = float(radius)
+                except Exception as radius_error:
+                    current_app.logger.warning(f"Failed to set shape radius: {radius_error}")
+        elif shape_type == "rectangle":
+            shape = slide.shapes.add_shape(MSO_SHAPE.RECTANGLE, left, top, width, height)
+        elif shape_type == "oval":
+            shape = slide.shapes.add_shape(MSO_SHAPE.OVAL, left, top, width, height)
+        else:
+            current_app.logger.warning(f"Unsupported shape type: {shape_type}")
+            return False
+            
+        # Apply fill
+        fill_style = shape_def.get("fill_style", "solid")
+        try:
+            if fill_style == "none":
+                shape.fill.background()
+            else:
+                fill_color_hex = shape_def.get("fill_color_hex", "FFFFFF")
+                fill_transparency = shape_def.get("fill_transparency", 0.0)
+                
+                shape.fill.solid()
+                shape.fill.fore_color.rgb = RGBColor(*hex_to_rgb(fill_color_hex))
+                if fill_transparency > 0:
+                    set_color_transparency(shape._element.spPr.xpath("./a:solidFill/a:srgbClr"), fill_transparency)
+        except Exception as fill_error:
+            current_app.logger.warning(f"Failed to apply shape fill: {fill_error}")
+                
+        # Apply line/border
+        line_style = shape_def.get("line_style", "solid")
+        try:
+            if line_style == "none":
+                shape.line.fill.background()
+            else:
+                line_color_hex = shape_def.get("line_color_hex", "000000")
+                line_width_pt = shape_def.get("line_width_pt", 1)
+                line_transparency = shape_def.get("line_transparency", 0.0)
+                
+                shape.line.color.rgb = RGBColor(*hex_to_rgb(line_color_hex))
+                shape.line.width = Pt(line_width_pt)
+                if line_transparency > 0:
+                    set_color_transparency(shape._element.spPr.xpath("./a:ln/a:solidFill/a:srgbClr"), line_transparency)
+        except Exception as line_error:
+            current_app.logger.warning(f"Failed to apply shape line: {line_error}")
+                
+        # Template shapes are flat: an empty effect list overrides the theme's drop shadow
+        shape._element.spPr.get_or_add_effectLst()
+
+        # Apply rotation if specified
+        rotation = shape_def.get("rotation", 0)
+        if rotation != 0:
+            try:
+                shape.rotation = rotation
+            except Exception as rotation_error:
+                current_app.logger.warning(f"Failed to apply shape rotation: {rotation_error}")
+        
+        current_app.logger.debug(f"Successfully drew template shape: {shape_type}")
+        return True
+            
+    except Exception as e:
+        current_app.logger.error(f"Error drawing template shape: {e}")
+        return False
+
+def background_asset(asset, recompress, slide_width_inches=PPTX_SLIDE_WIDTH_INCHES, slide_height_inches=PPTX_SLIDE_HEIGHT_INCHES):
+    """`asset` as embedded: unchanged, or shrunk to the slide at (dpi, JPEG quality) `recompress`"""
+    if asset is None or recompress is None:
+        return asset
+    dpi, quality = recompress
+    return recompress_template_asset(asset, (math.ceil(slide_width_inches * dpi), math.ceil(slide_height_inches * dpi)), quality)
+
+def draw_template_slide_background(slide, template_def, slide_type="default", slide_width_inches=13.33, slide_height_inches=7.5, image_parts=None, db=None, use_vector=True, recompress=None):
+    try:
+        slide_width = Inches(slide_width_inches)
+        slide_height = Inches(slide_height_inches)
+        template_id = template_def.get("id") or template_def.get("name", "").lower()
+        # Image parts shared across the export; without one each call embeds its own lookup
+        if image_parts is None:
+            image_parts = {}
+
+        # Vector templates are a few shapes instead of a full-size picture
+        compiled = compile_vector_shapes(template_id, slide_type, slide_width_inches, slide_height_inches) if use_vector else None
+        if compiled:
+            add_vector_shapes(slide.shapes, compiled)
+            return True
+
+        # Built-in and custom templates both resolve through the registry
+        definition = lookup_template(template_id, db=db, user_id=template_def.get("user_id"))
+        asset = background_asset(template_background(definition, slide_type), recompress, slide_width_inches, slide_height_inches)
+        if asset:
+            add_asset_picture(slide, asset, 0, 0, slide_width, slide_height, image_parts)
+            return True
+
+        # No fallback: only use image backgrounds for all templates
+        return False
+    except Exception as e:
+        current_app.logger.error(f"Error drawing template background: {e}")
+        return False
+
+def compile_vector_shapes(template_id, slide_type, slide_width_inches=PPTX_SLIDE_WIDTH_INCHES, slide_height_inches=PPTX_SLIDE_HEIGHT_INCHES):
+    """
+    Shape XML of a vector template, drawn once per (template, slide type, slide size).
+
+    The shapes are drawn with draw_template_shape on a scratch slide and kept as
+    serialized <p:sp> elements, so later exports only parse and append them.
+
+    Returns:
+        Tuple of shape XML byte strings, or None if the template has no vector shapes
+    """
+    shape_defs = vector_shapes(template_id, slide_type)
+    if not shape_defs:
+        return None
+    key = (template_id, "title" if slide_type == "title" else "content", slide_width_inches, slide_height_inches)
+    cached = _compiled_vector_shapes.get(key)
+    # Entries are tied to the shape list they were drawn from, so a rewritten template recompiles
+    if cached is not None and cached[0] is shape_defs:
+        return cached[1]
+
+    scratch = PptxPresentation()
+    scratch.slide_width = Inches(slide_width_inches)
+    scratch.slide_height = Inches(slide_height_inches)
+    slide = scratch.slides.add_slide(scratch.slide_layouts[BLANK_LAYOUT_INDEX])
+    for shape_def in shape_defs:
+        draw_template_shape(slide, shape_def, slide_width_inches, slide_height_inches)
+    compiled = tuple(etree.tostring(element) for element in slide.shapes._spTree.iter_shape_elms())
+    _compiled_vector_shapes[key] = (shape_defs, compiled)
+    return compiled
+
+def add_vector_shapes(shapes, compiled, index=None):
+    """
+    Append compiled vector shapes to a slide's or layout's shape tree.
+
+    Args:
+        shapes: python-pptx shapes collection of a slide or layout
+        compiled: Shape XML from compile_vector_shapes
+        index: Optional position in the shape tree; defaults to after existing shapes
+    """
+    spTree = shapes._spTree
+    for offset, xml in enumerate(compiled):
+        element = parse_xml(xml)
+        # Shape ids must stay unique within the part
+        element.xpath("./*[1]/p:cNvPr")[0].set("id", str(shapes._next_shape_id))
+        if index is None:
+            spTree.insert_element_before(element, "p:extLst")
+        else:
+            spTree.insert(index + offset, element)
+
+def _prepare_background_layout(layout, name):
+    """Rename a layout and drop the placeholders add_slide would clone onto its slides"""
+    layout._element.cSld.set("name", name)
+    for placeholder in list(layout.placeholders):
+        ph = placeholder._element.ph
+        if ph is None or ph.get("type") not in NON_CLONED_PLACEHOLDER_TYPES:
+            placeholder._element.getparent().remove(placeholder._element)
+
+def _set_layout_picture_background(layout, asset):
+    """Make `asset` the full-bleed background of a slide layout"""
+    _, rId = layout.part.get_or_add_image_part(BytesIO(asset.blob))
+    bg = parse_xml(
+        f'<p:bg {nsdecls("p", "a", "r")}><p:bgPr>'
+        f'<a:blipFill dpi="0" rotWithShape="1"><a:blip r:embed="{rId}"/><a:srcRect/><a:stretch><a:fillRect/></a:stretch></a:blipFill>'
+        f'<a:effectLst/></p:bgPr></p:bg>'
+    )
+    cSld = layout._element.cSld
+    if cSld.bg is not None:
+        cSld.remove(cSld.bg)
+    cSld.insert(0, bg)
+
+def build_base_deck(definition, slide_width_inches=PPTX_SLIDE_WIDTH_INCHES, slide_height_inches=PPTX_SLIDE_HEIGHT_INCHES, use_vector=True, recompress=None):
+    """
+    Serialized empty deck whose title and content layouts carry a template's backgrounds.
+
+    Slides added on those layouts inherit the background, so each background is
+    stored once in the package and no slide needs its own picture or shapes.
+    Vector templates put their shapes on the layouts; image templates use a
+    picture fill as the layout background.
+
+    Args:
+        definition: Template registry definition
+        slide_width_inches, slide_height_inches: Slide size of the deck
+        use_vector: Prefer the template's vector version when it has one
+        recompress: Optional (dpi, JPEG quality) image backgrounds are shrunk to
+
+    Returns:
+        (pptx bytes, slide types with a background layout), or None if the template has no backgrounds
+    """
+    template_id = definition["id"]
+    vector = {t: compile_vector_shapes(template_id, t, slide_width_inches, slide_height_inches) for t in ("title", "content")} if use_vector else {}
+    if any(vector.values()):
+        assets = {}
+        key = (template_id, "vector", vector.get("title"), vector.get("content"), slide_width_inches, slide_height_inches)
+    else:
+        # Recompressed copies have their own sha1, so they get their own base deck
+        assets = {t: background_asset(template_background(definition, t), recompress, slide_width_inches, slide_height_inches) for t in ("title", "content")}
+        if not any(assets.values()):
+            return None
+        key = (
+            template_id,
+            "image",
+            assets["title"].sha1 if assets["title"] else None,
+            assets["content"].sha1 if assets["content"] else None,
+            slide_width_inches, slide_height_inches
+        )
+    with _base_decks_lock:
+        if key in _base_decks:
+            _base_decks.move_to_end(key)
+            return _base_decks[key]
+
+    prs = PptxPresentation()
+    prs.slide_width = Inches(slide_width_inches)
+    prs.slide_height = Inches(slide_height_inches)
+    layout_types = []
+    for slide_type, layout_index in (("title", TITLE_LAYOUT_INDEX), ("content", CONTENT_LAYOUT_INDEX)):
+        if not vector.get(slide_type) and not assets.get(slide_type):
+            continue
+        layout = prs.slide_layouts[layout_index]
+        _prepare_background_layout(layout, f"{template_id} {slide_type}")
+        if vector.get(slide_type):
+            # Behind the layout's remaining footer placeholders
+            add_vector_shapes(layout.shapes, vector[slide_type], index=2)
+        else:
+            _set_layout_picture_background(layout, assets[slide_type])
+        layout_types.append(slide_type)
+    output = BytesIO()
+    prs.save(output)
+    base_deck = (output.getvalue(), tuple(layout_types))
+
+    with _base_decks_lock:
+        _base_decks[key] = base_deck
+        if len(_base_decks) > _BASE_DECKS_MAX:
+            _base_decks.popitem(last=False)
+    return base_deck
+
+def forget_base_decks(template_id):
+    """Drop cached base decks of a template, e.g. when a custom template is deleted"""
+    with _base_decks_lock:
+        for key in [k for k in _base_decks if k[0] == template_id]:
+            del _base_decks[key]
+
+def is_references_slide(slide_item_data):
+    """References/sources slides are exported without their images"""
+    slide_title = slide_item_data.get("title", "").lower()
+    return any(keyword in slide_title for keyword in ["reference", "source", "bibliography", "citation"])
+
+# Editor alignment names to python-pptx values
+ALIGN_MAP = {
+    "LEFT": PP_ALIGN.LEFT, "CENTER": PP_ALIGN.CENTER,
+    "RIGHT": PP_ALIGN.RIGHT, "JUSTIFY": PP_ALIGN.JUSTIFY,
+}
+
+def _compile_textbox(el_data, px_to_in_x, px_to_in_y, messages, fit_text=True):
+    """Textbox render plan: EMU geometry plus paragraphs of (text, font) runs, shrunk to fit the box when `fit_text`"""
+    x_px = float(el_data.get("x", 0))
+    y_px = float(el_data.get("y", 0))
+    width_px = float(el_data.get("width", 100))
+    height_px = float(el_data.get("height", 50))
+    geometry = (
+        int(Inches(x_px * px_to_in_x)), int(Inches(y_px * px_to_in_y)),
+        int(Inches(width_px * px_to_in_x)), int(Inches(height_px * px_to_in_y))
+    )
+    if geometry[2] <= 0 or geometry[3] <= 0:
+        messages.append(("warning", f"Skipping textbox with invalid dimensions: w_px={width_px}, h_px={height_px}"))
+        return None
+
+    def color(value):
+        rgb, warning = parse_hex_color(value)
+        if warning:
+            messages.append(("warning", warning))
+        return rgb
+
+    text_content = el_data.get("text", "")
+    default_font_family = el_data.get("fontFamily", "Lexend")  # Changed from Arial to Lexend
+    default_font_size_pt = float(el_data.get("fontSize", 16))  # Changed from 18 to 16
+    default_font_color_rgb = color(el_data.get("fill", "#000000"))
+    
+    default_font_style_data = el_data.get("fontStyle", {})
+    default_bold = default_font_style_data.get("bold", False)
+    default_italic = default_font_style_data.get("italic", False)
+    default_underline = default_font_style_data.get("underline", False)
+    default_alignment = ALIGN_MAP.get(el_data.get("align", "left").upper(), PP_ALIGN.LEFT)
+    
+    default_line_height_multiplier = el_data.get("lineHeight") # e.g., 1, 1.15, 1.5
+    line_spacing = None
+    if default_line_height_multiplier and isinstance(default_line_height_multiplier, (int, float)):
+        line_spacing = float(default_line_height_multiplier)
+    default_paragraph_spacing_pt = float(el_data.get("paragraphSpacing", 0))
+    is_bulleted = el_data.get("bullets", False)
+
+    paragraphs = []
+    paragraphs_text = text_content.split('\\\\n') # Split by literal \\n from JSON
+    
+    if not paragraphs_text and not text_content.strip(): # Handle completely empty textbox or textbox with only &nbsp;
+        # A space keeps it selectable and visible if it has dimensions
+        paragraphs.append({"alignment": None, "line_spacing": None, "space_before": None, "level": None,
+                           "runs": [(" ", (None, 1, None, None, None, None))]})
+        return {"type": "textbox", "id": el_data.get("id"), "geometry": geometry, "paragraphs": paragraphs}
+
+    for para_idx, para_text_html in enumerate(paragraphs_text):
+        paragraph = {
+            "alignment": default_alignment,
+            "line_spacing": line_spacing,
+            "space_before": default_paragraph_spacing_pt if para_idx > 0 and default_paragraph_spacing_pt > 0 else None,
+            # Add bullet only if line has content
+            "level": 0 if is_bulleted and para_text_html.strip() else None,
+            "runs": []
+        }
+        paragraphs.append(paragraph)
+
+        # Parse HTML-like content (spans) for rich text
+        # Replace &nbsp; with space before tokenizing
+        runs = parse_runs(para_text_html.replace('&nbsp;', ' '))
+        
+        if not runs: # Handle paragraph that becomes empty after parsing (e.g. only &nbsp;)
+            # Bulleted lines keep the bare paragraph for the bullet point; other lines
+            # get a space so they take height unless the textbox is a single empty line
+            if not is_bulleted and (len(paragraphs_text) > 1 or para_text_html):
+                paragraph["runs"].append((" ", None))
+            continue
+
+        for text_to_add, run_style in runs:
+            if not text_to_add:
+                paragraph["runs"].append(("", None))
+                continue
+            run_font_family = default_font_family
+            run_font_size_pt = default_font_size_pt
+            run_font_color_rgb = default_font_color_rgb
+            run_bold = default_bold
+            run_italic = default_italic
+            run_underline = default_underline
+
+            if run_style is not None: # Span overrides
+                if run_style.font_family is not None: run_font_family = run_style.font_family
+                if run_style.font_size is not None: run_font_size_pt = run_style.font_size
+                if run_style.color is not None: run_font_color_rgb = color(run_style.color)
+                if run_style.bold is not None: run_bold = run_style.bold
+                if run_style.italic is not None: run_italic = run_style.italic
+                if run_style.underline is not None: run_underline = run_style.underline
+            paragraph["runs"].append((text_to_add, (
+                run_font_family, run_font_size_pt, run_font_color_rgb, run_bold, run_italic, run_underline
+            )))
+
+    plan = {"type": "textbox", "id": el_data.get("id"), "geometry": geometry, "paragraphs": paragraphs}
+    return fit_textbox_plan(plan) if fit_text else plan
+
+def _compile_image(el_data, px_to_in_x, px_to_in_y, messages):
+    """Image render plan: EMU geometry plus the key of its prepared image"""
+    img_x_px = float(el_data.get("x", 0))
+    img_y_px = float(el_data.get("y", 0))
+    img_width_px = float(el_data.get("width", 100))
+    img_height_px = float(el_data.get("height", 100))
+    if img_width_px <= 0 or img_height_px <= 0:
+        messages.append(("warning", f"Skipping image with zero/negative pixel dimensions: w={img_width_px}, h={img_height_px}"))
+        return None
+    geometry = (
+        int(Inches(img_x_px * px_to_in_x)), int(Inches(img_y_px * px_to_in_y)),
+        int(Inches(img_width_px * px_to_in_x)), int(Inches(img_height_px * px_to_in_y))
+    )
+    if geometry[2] <= 0 or geometry[3] <= 0:
+        messages.append(("warning", f"Skipping image with zero/negative inch dimensions after conversion: w_emu={geometry[2]}, h_emu={geometry[3]}"))
+        return None
+    return {"type": "image", "id": el_data.get("id"), "geometry": geometry, "image_key": el_data["src"]}
+
+def compile_slide_plan(slide_item_data, px_to_in_x, px_to_in_y, fit_text=True):
+    """
+    Compile one editor slide into a render plan without touching python-pptx objects.
+
+    Runs in worker processes, so it needs no app context: problems are returned
+    as messages for the caller to log. Images must already carry an integer key
+    into the export's distinct images (see _key_image_sources) instead of a data URI.
+    With `fit_text`, textbox fonts are shrunk until the text fits its box
+    (see app.text_fit), since the exported text frames do not autofit.
+
+    Returns:
+        {"elements": [textbox or image plans in zIndex order], "messages": [(level, text)]}
+    """
+    messages = []
+    # Collect elements to be rendered based on zIndex
+    elements_to_render = []
+    for tb_data in slide_item_data.get("textboxes", []):
+        elements_to_render.append(("textbox", tb_data, int(tb_data.get("zIndex", 100)))) # Default zIndex for textboxes
+    # Only add images if NOT a references slide
+    if not is_references_slide(slide_item_data):
+        for img_data in slide_item_data.get("images", []): # Process multiple images
+            if isinstance(img_data.get("src"), int):
+                elements_to_render.append(("image", img_data, int(img_data.get("zIndex", 101)))) # Images have zIndex
+    # Sort elements by zIndex: lower zIndex elements are added first (appear "behind")
+    elements_to_render.sort(key=lambda el: el[2])
+
+    elements = []
+    for el_type, el_data, _ in elements_to_render:
+        try:
+            if el_type == "textbox":
+                element = _compile_textbox(el_data, px_to_in_x, px_to_in_y, messages, fit_text)
+            else:
+                element = _compile_image(el_data, px_to_in_x, px_to_in_y, messages)
+            if element:
+                elements.append(element)
+        except Exception as e:
+            el_id = el_data.get('id', 'N/A') if isinstance(el_data, dict) else "Unknown"
+            messages.append(("error", f"Error processing {el_type}: {el_id}. Error: {e}"))
+    return {"elements": elements, "messages": messages}
+
+def _record_phase(timings, phase, started):
+    """Add the seconds since `started` to `phase` when the caller collects timings"""
+    if timings is not None:
+        timings[phase] = timings.get(phase, 0.0) + time.perf_counter() - started
+
+def apply_slide_plan(ppt_slide, plan, export_images, image_parts, timings=None):
+    """Add a compiled slide plan's textboxes and pictures to a python-pptx slide"""
+    for level, message in plan["messages"]:
+        getattr(current_app.logger, level)(message)
+
+    for element in plan["elements"]:
+        started = time.perf_counter()
+        try:
+            if element["type"] == "image":
+                export_image = export_images.get(element["image_key"])
+                if export_image is not None:
+                    add_asset_picture(ppt_slide, export_image, *element["geometry"], image_parts)
+                _record_phase(timings, "images", started)
+                continue
+
+            shape = ppt_slide.shapes.add_textbox(*element["geometry"])
+            tf = shape.text_frame
+            tf.word_wrap = True 
+            tf.auto_size = MSO_AUTO_SIZE.NONE # Use explicit height
+            tf.margin_bottom = Inches(0.05) 
+            tf.margin_left = Inches(0.1)
+            tf.margin_right = Inches(0.1)
+            tf.margin_top = Inches(0.05)
+            tf.clear()
+
+            for paragraph in element["paragraphs"]:
+                p = tf.add_paragraph()
+                if paragraph["alignment"] is not None:
+                    p.alignment = paragraph["alignment"]
+                if paragraph["line_spacing"] is not None:
+                    p.line_spacing = paragraph["line_spacing"]
+                if paragraph["space_before"] is not None:
+                    p.space_before = Pt(paragraph["space_before"])
+                if paragraph["level"] is not None:
+                    p.level = paragraph["level"]
+                for text, font in paragraph["runs"]:
+                    run = p.add_run()
+                    if text:
+                        run.text = text
+                    if font is None:
+                        continue
+                    font_name, size_pt, rgb, bold, italic, underline = font
+                    if font_name is not None:
+                        run.font.name = font_name
+                    if size_pt is not None:
+                        run.font.size = Pt(size_pt)
+                    if rgb:
+                        run.font.color.rgb = RGBColor(*rgb)
+                    if bold is not None:
+                        run.font.bold = bold
+                    if italic is not None:
+                        run.font.italic = italic
+                    if underline is not None:
+                        run.font.underline = underline
+            _record_phase(timings, "textboxes", started)
+        except Exception as e:
+            current_app.logger.error(f"Error processing {element['type']}: {element.get('id') or 'N/A'}. Error: {e}", exc_info=True)
+
+def _key_image_sources(slides_data):
+    """
+    Replace image data URIs with integer keys so slides can be sent to workers cheaply.
+
+    Returns:
+        (keyed slides, {data URI: key})
+    """
+    sources = {}
+    keyed_slides = []
+    for slide in slides_data:
+        images = []
+        for img in slide.get("images", []) or []:
+            src = img.get("src") if isinstance(img, dict) else None
+            if isinstance(src, str) and src.startswith("data:image"):
+                img = dict(img, src=sources.setdefault(src, len(sources)))
+            elif isinstance(img, dict):
+                # Only embedded images are exported
+                img = dict(img, src=None)
+            images.append(img)
+        keyed_slides.append(dict(slide, images=images))
+    return keyed_slides, sources
+
+def _noop():
+    return None
+
+def start_render_pool(workers, start_method=None):
+    """
+    Create the process pool used to compile large exports and start its workers.
+
+    Called from create_app before routes (and the Firestore client threads) are
+    loaded, so workers can be forked from a still single-threaded process. A pool
+    created later, on first use, spawns fresh interpreters instead.
+    """
+    global _render_pool
+    with _render_pool_lock:
+        if _render_pool is None and workers > 1:
+            if start_method is None:
+                start_method = "fork" if "fork" in multiprocessing.get_all_start_methods() else "spawn"
+            _render_pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(start_method))
+            # Forked pools launch every worker on the first submit
+            _render_pool.submit(_noop).result()
+        return _render_pool
+
+def _get_render_pool(workers):
+    return _render_pool or start_render_pool(workers, "spawn")
+
+def _discard_render_pool():
+    global _render_pool
+    with _render_pool_lock:
+        if _render_pool is not None:
+            _render_pool.shutdown(wait=False, cancel_futures=True)
+            _render_pool = None
+
+def _prepare_image_job(src, box, image_dpi, image_quality):
+    return prepare_export_image(src, box, image_dpi, cache=False, quality=image_quality)
+
+def deck_image_boxes(slides_data, px_to_in_x, px_to_in_y):
+    """Largest box each distinct data URI is placed in across the deck (see collect_image_boxes)"""
+    return collect_image_boxes(
+        [img for slide in slides_data if not is_references_slide(slide) for img in slide.get("images", [])],
+        px_to_in_x, px_to_in_y
+    )
+
+def compile_render_plans(slides_data, px_to_in_x, px_to_in_y, image_dpi=DEFAULT_IMAGE_DPI, workers=1, only=None, image_boxes=None, timings=None, image_quality=JPEG_QUALITY, fit_text=True):
+    """
+    Phase 1 of an export: render plans for every slide and each distinct image, prepared once.
+
+    Slides and images do not depend on each other, so with `workers` > 1 and at
+    least PARALLEL_MIN_SLIDES slides to compile the work is spread over a process pool.
+
+    Args:
+        only: Optional set of slide indexes to compile; other slides get None
+        image_boxes: Precomputed deck_image_boxes(), so boxes always span the whole deck
+        timings: Optional dict collecting seconds per phase; pooled work is one "compile" phase
+        image_quality: JPEG quality of re-encoded images
+        fit_text: Shrink textbox fonts until their text fits (see compile_slide_plan)
+
+    Returns:
+        (list of slide plans, {image key: ExportImage})
+    """
+    keyed_slides, sources = _key_image_sources(slides_data)
+    if image_boxes is None:
+        image_boxes = deck_image_boxes(slides_data, px_to_in_x, px_to_in_y)
+    indexes = range(len(keyed_slides)) if only is None else sorted(only)
+    used_keys = {img["src"] for i in indexes for img in keyed_slides[i]["images"] if isinstance(img.get("src"), int)}
+    image_jobs = {}
+    export_images = {}
+    for src, key in sources.items():
+        box = image_boxes.get(src)
+        if box is None or key not in used_keys: # Only placed on references or skipped slides
+            continue
+        cached = cached_export_image(src, box, image_dpi, image_quality)
+        if cached is not None:
+            export_images[key] = cached
+        else:
+            image_jobs[key] = (src, box)
+
+    plans = [None] * len(keyed_slides)
+    to_compile = [keyed_slides[i] for i in indexes]
+    if workers > 1 and len(to_compile) >= PARALLEL_MIN_SLIDES:
+        started = time.perf_counter()
+        try:
+            pool = _get_render_pool(workers)
+            image_futures = {key: pool.submit(_prepare_image_job, src, box, image_dpi, image_quality) for key, (src, box) in image_jobs.items()}
+            chunksize = max(1, len(to_compile) // (workers * 4))
+            compiled = pool.map(compile_slide_plan, to_compile, repeat(px_to_in_x), repeat(px_to_in_y), repeat(fit_text), chunksize=chunksize)
+            for i, plan in zip(indexes, compiled):
+                plans[i] = plan
+            for key, future in image_futures.items():
+                try:
+                    export_images[key] = remember_export_image(future.result())
+                except Exception as e:
+                    current_app.logger.error(f"Error preparing image {key}: {e}")
+            _record_phase(timings, "compile", started)
+            return plans, export_images
+        except BrokenProcessPool as e:
+            current_app.logger.error(f"Render pool failed, compiling slides in-process: {e}")
+            _discard_render_pool()
+
+    started = time.perf_counter()
+    for i, slide in zip(indexes, to_compile):
+        plans[i] = compile_slide_plan(slide, px_to_in_x, px_to_in_y, fit_text)
+    _record_phase(timings, "textboxes", started)
+    started = time.perf_counter()
+    for key, (src, box) in image_jobs.items():
+        if key in export_images:
+            continue
+        try:
+            export_images[key] = prepare_export_image(src, box, image_dpi, quality=image_quality)
+        except Exception as e:
+            current_app.logger.error(f"Error preparing image {key}: {e}")
+    _record_phase(timings, "images", started)
+    return plans, export_images
+
+def build_presentation(slides_data, global_template_id, user_id=None, db=None, use_vector_templates=True, image_dpi=DEFAULT_IMAGE_DPI, render_workers=1, fragment_cache=True, timings=None, image_quality=JPEG_QUALITY, recompress_backgrounds=False, fit_text=True):
+    """
+    Render editor-format slides into a python-pptx presentation.
+
+    Args:
+        slides_data: Slides as saved by the slide editor (textboxes, images, background)
+        global_template_id: Template used by slides that do not set their own
+        user_id: Optional owner of custom templates, avoids resolving the owner per template
+        db: Firestore client used to resolve custom templates
+        use_vector_templates: Draw templates that have a vector version as shapes instead of images
+        image_dpi: Resolution editor images are downscaled to for their largest placement
+        render_workers: Processes used to compile slides and prepare images for large decks
+        fragment_cache: Reuse slides rendered by earlier exports when their content is unchanged
+        timings: Optional dict; seconds spent per phase (background, textboxes, images,
+            fragments, or compile when pooled) are added to it
+        image_quality: JPEG quality of resized or converted images
+        recompress_backgrounds: Shrink template background images to the slide at `image_dpi`
+            and `image_quality` as well
+        fit_text: Shrink textbox fonts until their text fits the box
+
+    Returns:
+        python-pptx Presentation
+    """
+    started = time.perf_counter()
+    recompress = (image_dpi, image_quality) if recompress_backgrounds else None
+    # Start from the global template's base deck so its slides only reference a layout
+    base_template_id = normalize_template_id(global_template_id)
+    base_deck = None
+    if base_template_id:
+        try:
+            base_definition = lookup_template(base_template_id, db=db, user_id=user_id)
+            base_deck = build_base_deck(base_definition, use_vector=use_vector_templates, recompress=recompress) if base_definition else None
+        except Exception as e:
+            current_app.logger.error(f"Error building base deck for template '{base_template_id}': {e}")
+    if base_deck:
+        base_bytes, layout_types = base_deck
+        prs = PptxPresentation(BytesIO(base_bytes))
+        layout_indexes = {"title": TITLE_LAYOUT_INDEX, "content": CONTENT_LAYOUT_INDEX}
+        layout_backgrounds = {t: prs.slide_layouts[layout_indexes[t]] for t in layout_types}
+    else:
+        prs = PptxPresentation()
+        prs.slide_width = Inches(PPTX_SLIDE_WIDTH_INCHES)
+        prs.slide_height = Inches(PPTX_SLIDE_HEIGHT_INCHES)
+        layout_backgrounds = {}
+    _record_phase(timings, "background", started)
+
+    # Image parts (template backgrounds and editor images) are inserted once and shared by every slide using them
+    image_parts = {}
+
+    # Calculate conversion factors once
+    px_to_in_x = PPTX_SLIDE_WIDTH_INCHES / EDITOR_SLIDE_WIDTH_PX
+    px_to_in_y = PPTX_SLIDE_HEIGHT_INCHES / EDITOR_SLIDE_HEIGHT_PX
+    image_boxes = deck_image_boxes(slides_data, px_to_in_x, px_to_in_y)
+
+    # Resolve each slide's template and layout up front; they are part of its fragment key
+    started = time.perf_counter()
+    slide_setups = []
+    fragments = {}
+    for slide_index, slide_item_data in enumerate(slides_data):
+        # Determine template for this slide
+        slide_template_id = slide_item_data.get("templateId") or slide_item_data.get("template") or global_template_id
+        
+        # Ensure template_id is a string, not a dict
+        if isinstance(slide_template_id, dict):
+            slide_template_id = slide_template_id.get("id") or slide_template_id.get("templateId")
+        
+        # Slide 1 = title, Slides 2+ = content for ALL templates
+        slide_type = "title" if slide_index == 0 else "content"
+
+        # Slides on the base deck's template take their background from the layout
+        background_layout = layout_backgrounds.get(slide_type) if slide_template_id == base_template_id else None
+        slide_layout = background_layout or prs.slide_layouts[BLANK_LAYOUT_INDEX]
+
+        fragment_key = None
+        if fragment_cache:
+            fragment_key = slide_fragment_key(slide_item_data, slide_template_id, slide_type, prs.slide_layouts.index(slide_layout), {
+                "base": base_template_id if background_layout is not None else None,
+                "vector": use_vector_templates,
+                "dpi": image_dpi,
+                "quality": image_quality,
+                "recompress": recompress,
+                "fit_text": TEXT_FIT_VERSION if fit_text else None,
+                # Images are sized for their largest placement anywhere in the deck
+                "boxes": [image_boxes.get(img.get("src")) for img in slide_item_data.get("images", []) if isinstance(img, dict) and isinstance(img.get("src"), str)]
+            })
+            fragment = cached_slide_fragment(fragment_key)
+            if fragment is not None:
+                fragments[slide_index] = fragment
+        slide_setups.append((slide_template_id, slide_type, background_layout, slide_layout, fragment_key))
+    _record_phase(timings, "fragments", started)
+
+    # Phase 1: compile every changed slide into a render plan and prepare each distinct image
+    plans, export_images = compile_render_plans(
+        slides_data, px_to_in_x, px_to_in_y, image_dpi, render_workers,
+        only={i for i in range(len(slides_data)) if i not in fragments}, image_boxes=image_boxes, timings=timings, image_quality=image_quality, fit_text=fit_text
+    )
+    if fragments:
+        current_app.logger.info(f"Reusing {len(fragments)}/{len(slides_data)} rendered slides")
+
+    # Phase 2: apply the plans to the presentation, one slide after another
+    for slide_index, slide_item_data in enumerate(slides_data):
+        slide_template_id, slide_type, background_layout, slide_layout, fragment_key = slide_setups[slide_index]
+        started = time.perf_counter()
+        ppt_slide = prs.slides.add_slide(slide_layout)
+
+        if slide_index in fragments:
+            restore_slide_fragment(ppt_slide, fragments[slide_index], image_parts)
+            _record_phase(timings, "fragments", started)
+            continue
+
+        current_app.logger.debug(f"Slide {slide_index}: using template '{slide_template_id}'")
+
+        # Apply template background if available
+        template_applied = background_layout is not None
+        template_failed = False
+        if template_applied:
+            current_app.logger.debug(f"Slide {slide_index} uses the '{slide_template_id}' {slide_type} layout")
+        elif slide_template_id and isinstance(slide_template_id, str):
+            # Create a simple template definition object
+            template_def = {"id": slide_template_id, "user_id": user_id}
+            current_app.logger.debug(f"Template '{slide_template_id}' - Slide {slide_index} set to type: {slide_type}")
+                
+            template_applied = draw_template_slide_background(
+                ppt_slide, template_def, slide_type, 
+                PPTX_SLIDE_WIDTH_INCHES, PPTX_SLIDE_HEIGHT_INCHES,
+                image_parts=image_parts, db=db, use_vector=use_vector_templates, recompress=recompress
+            )
+            
+            if template_applied:
+                current_app.logger.info(f"Successfully applied template '{slide_template_id}' (type: {slide_type}) to slide {slide_index}")
+            else:
+                current_app.logger.warning(f"Failed to apply template '{slide_template_id}' to slide {slide_index}")
+                template_failed = True
+        else:
+            if slide_template_id:
+                current_app.logger.warning(f"Template '{slide_template_id}' not found or invalid for slide {slide_index}")
+            else:
+                current_app.logger.debug(f"No template specified for slide {slide_index}")        # Fallback: apply simple background if no template was applied
+        if not template_applied:
+            background_data = slide_item_data.get("background", {})
+            bg_fill_hex = background_data.get("fill", "#FFFFFF")
+            if bg_fill_hex:
+                try:
+                    fill = ppt_slide.background.fill
+                    fill.solid()
+                    rgb_tuple = hex_to_rgb(bg_fill_hex)
+                    fill.fore_color.rgb = RGBColor(*rgb_tuple)
+                except Exception as e:
+                    current_app.logger.error(f"Error setting background color: {e}", exc_info=True)
+        _record_phase(timings, "background", started)
+
+        plan = plans[slide_index]
+        apply_slide_plan(ppt_slide, plan, export_images, image_parts, timings)
+        # Slides that hit an error are rendered again next time rather than cached broken
+        if fragment_key and not template_failed and not any(level == "error" for level, _ in plan["messages"]):
+            started = time.perf_counter()
+            remember_slide_fragment(fragment_key, ppt_slide, image_parts)
+            _record_phase(timings, "fragments", started)
+
+    return prs
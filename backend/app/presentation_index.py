@@ -0,0 +1,309 @@
+from datetime import datetime, timezone
+from flask import current_app
+from firebase_admin import firestore
+from app.analytics_rollups import stage_presentation_counts, stage_topic_change
+from app.slide_store import (
+    SLIDE_INDEX_FIELDS, SUBCOLLECTION_STORAGE, apply_slide_patch, can_store_slides, load_slides, slide_id,
+    stage_slide_deletes, stage_slide_order, stage_slide_writes, uses_slide_subcollection
+)
+
+# presentation_summaries/<user_id> lists a user's newest presentations for the dashboard:
+#   {'user_id', 'presentations': [entry, ...] newest first, 'truncated': older presentations exist}
+SUMMARY_COLLECTION = 'presentation_summaries'
+DEFAULT_SUMMARY_SIZE = 50
+# Presentation fields copied into summary entries
+ENTRY_FIELDS = ['title', 'template', 'presentation_type', 'slide_count', 'cover_thumbnail_key', 'created_at', 'updated_at']
+
+def _summary_size():
+    return current_app.config.get('PRESENTATION_SUMMARY_SIZE', DEFAULT_SUMMARY_SIZE)
+
+def _summary_ref(db, user_id):
+    return db.collection(SUMMARY_COLLECTION).document(str(user_id))
+
+def _newest_first(db, user_id):
+    return (
+        db.collection('presentations')
+        .where('user_id', '==', user_id)
+        .order_by('created_at', direction=firestore.Query.DESCENDING)
+        .order_by('__name__', direction=firestore.Query.DESCENDING)
+        .select(ENTRY_FIELDS)
+    )
+
+def _aware(value):
+    # Firestore returns UTC datetimes with a timezone; naive utcnow() values are made comparable with them
+    if isinstance(value, datetime) and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+def summary_entry(presentation_id, data, existing=None):
+    """Summary entry for a presentation, updating `existing` with the fields present in `data`"""
+    entry = dict(existing or {}, id=presentation_id)
+    for field in ENTRY_FIELDS:
+        if field in data:
+            entry[field] = _aware(data[field])
+    return entry
+
+def _sort_entries(entries):
+    epoch = datetime.min.replace(tzinfo=timezone.utc)
+    entries.sort(key=lambda entry: (entry.get('created_at') or epoch, entry['id']), reverse=True)
+
+class VersionConflict(Exception):
+    """A save was based on an older version of the presentation than the stored one"""
+
+    def __init__(self, current_version):
+        super().__init__(f"Presentation is at version {current_version}")
+        self.current_version = current_version
+
+def _stage_summary_entry(transaction, summary, summary_ref, user_id, presentation_id, fields, create, max_entries):
+    """Queue the summary rewrite for a written presentation; `summary` was read earlier in the transaction"""
+    if not summary.exists:
+        return
+    data = summary.to_dict()
+    entries = data.get('presentations') or []
+    existing = next((entry for entry in entries if entry.get('id') == presentation_id), None)
+    if existing is None and not create:
+        # Older than every listed presentation
+        return
+    entries = [entry for entry in entries if entry.get('id') != presentation_id]
+    entries.append(summary_entry(presentation_id, fields, existing))
+    _sort_entries(entries)
+    truncated = data.get('truncated', False) or len(entries) > max_entries
+    transaction.set(summary_ref, {'user_id': user_id, 'presentations': entries[:max_entries], 'truncated': truncated})
+
+def _check_version(snapshot, base_version):
+    version = (snapshot.to_dict() or {}).get('version', 0)
+    if base_version is not None and base_version != version:
+        raise VersionConflict(version)
+    return version
+
+def _resolve_timestamps(fields):
+    now = datetime.now(timezone.utc)
+    return {key: now if value is firestore.SERVER_TIMESTAMP else value for key, value in fields.items()}
+
+def write_presentation(db, user_id, presentation_ref, fields, create=False, base_version=None):
+    """
+    Create or update a presentation, its user's summary entry and analytics rollups in one transaction.
+
+    A 'slides' field is stored as one document per slide (see app.slide_store):
+    only slides that changed are written, and a presentation still in the
+    inline layout moves to the subcollection on its next save.
+    SERVER_TIMESTAMP values are replaced by the time of the write, so the
+    document and its entry carry the same timestamps (sentinels are not
+    allowed inside the summary's array). Users without a summary yet are
+    left alone; theirs is built from a query on the first dashboard read.
+    Every write increments the presentation's 'version'.
+
+    Args:
+        db: Firestore client
+        user_id: Owner of the presentation
+        presentation_ref: Presentation document reference
+        fields: Presentation fields to set (create) or update
+        create: Set a new document instead of updating an existing one
+        base_version: Version the caller's edit started from; None skips the check
+
+    Returns:
+        The new version, or None when the presentation to update does not exist
+
+    Raises:
+        VersionConflict: The stored version is not `base_version`
+    """
+    fields = _resolve_timestamps(fields)
+    summary_ref = _summary_ref(db, user_id)
+    max_entries = _summary_size()
+    slides = fields.pop('slides', None)
+
+    @firestore.transactional
+    def write(transaction):
+        summary = summary_ref.get(transaction=transaction)
+        document = dict(fields)
+        previous = {}
+        version = 0
+        if not create:
+            snapshot = presentation_ref.get(field_paths=['version', 'title'] + SLIDE_INDEX_FIELDS, transaction=transaction)
+            if not snapshot.exists:
+                return None
+            version = _check_version(snapshot, base_version)
+            previous = snapshot.to_dict() or {}
+        document['version'] = version + 1
+        if slides is not None:
+            if can_store_slides(slides):
+                document.update(stage_slide_writes(
+                    transaction, presentation_ref, slides,
+                    previous.get('slide_ids') if uses_slide_subcollection(previous) else None
+                ))
+                if not create:
+                    document['slides'] = firestore.DELETE_FIELD
+            else:
+                # Non-map slides cannot be documents; such decks stay inline
+                if uses_slide_subcollection(previous):
+                    stage_slide_deletes(transaction, presentation_ref, previous.get('slide_ids'))
+                document.update({'slides': slides, 'slide_ids': firestore.DELETE_FIELD, 'slide_storage': firestore.DELETE_FIELD} if not create else {'slides': slides})
+        if create:
+            transaction.set(presentation_ref, document)
+            stage_presentation_counts(transaction, db, user_id, document.get('created_at'), document.get('title'), 1)
+        else:
+            transaction.update(presentation_ref, document)
+            if 'title' in document:
+                stage_topic_change(transaction, db, user_id, previous.get('title'), document['title'])
+        _stage_summary_entry(transaction, summary, summary_ref, user_id, presentation_ref.id, fields, create, max_entries)
+        return document['version']
+
+    return write(db.transaction())
+
+def patch_presentation(db, user_id, presentation_ref, ops, base_version=None, fields=None, cover_fields=None):
+    """
+    Apply per-slide patch operations to a stored presentation in one transaction.
+
+    Only the parent document, the summary and (when the first slide changed
+    without being part of the patch) the first slide are read; only the
+    slides the patch adds are written. A deck still in the inline layout is
+    read whole once and moves to the subcollection.
+
+    Args:
+        db: Firestore client
+        user_id: Owner of the presentation
+        presentation_ref: Presentation document reference
+        ops: Operations for app.slide_store.apply_slide_patch
+        base_version: Version the patch was made against; None skips the check
+        fields: Other presentation fields to update in the same write (template, ...)
+        cover_fields: Optional callable(first slide, template id) returning fields derived
+            from the first slide (title, cover thumbnail), called when it or the template changed
+
+    Returns:
+        The new version, or None when the presentation does not exist
+
+    Raises:
+        VersionConflict: The stored version is not `base_version`
+        ValueError: The patch does not apply to the stored deck
+    """
+    fields = _resolve_timestamps(dict(fields or {}, updated_at=firestore.SERVER_TIMESTAMP))
+    summary_ref = _summary_ref(db, user_id)
+    max_entries = _summary_size()
+
+    @firestore.transactional
+    def patch(transaction):
+        summary = summary_ref.get(transaction=transaction)
+        snapshot = presentation_ref.get(field_paths=['version', 'template', 'title'] + SLIDE_INDEX_FIELDS, transaction=transaction)
+        if not snapshot.exists:
+            return None
+        version = _check_version(snapshot, base_version)
+        data = snapshot.to_dict() or {}
+        if uses_slide_subcollection(data):
+            previous_ids = data.get('slide_ids') or []
+            known = {}
+        else:
+            stored = load_slides(db, presentation_ref, data, transaction=transaction)
+            if not can_store_slides(stored):
+                raise ValueError("This presentation's slides cannot be patched; save the whole deck instead")
+            known = {slide_id(slide): slide for slide in stored}
+            previous_ids = [slide_id(slide) for slide in stored]
+        slide_ids, added = apply_slide_patch(previous_ids, ops)
+
+        document = dict(fields, version=version + 1, slide_count=len(slide_ids))
+        template_id = fields.get('template', data.get('template'))
+        cover_changed = slide_ids[:1] != previous_ids[:1] or template_id != data.get('template')
+        if cover_fields and slide_ids and cover_changed:
+            cover = added.get(slide_ids[0]) or known.get(slide_ids[0])
+            if cover is None:
+                cover = load_slides(db, presentation_ref, {'slide_ids': slide_ids[:1], 'slide_storage': SUBCOLLECTION_STORAGE}, [0], transaction=transaction)[0]
+            if cover is not None:
+                document.update(cover_fields(cover, template_id))
+
+        # Writes only after every read of the transaction
+        if uses_slide_subcollection(data):
+            document.update(stage_slide_order(transaction, presentation_ref, slide_ids, added, previous_ids))
+        else:
+            kept = set(slide_ids)
+            slides_by_id = {key: slide for key, slide in known.items() if key in kept}
+            slides_by_id.update(added)
+            document.update(stage_slide_order(transaction, presentation_ref, slide_ids, slides_by_id, None))
+            document['slides'] = firestore.DELETE_FIELD
+        transaction.update(presentation_ref, document)
+        if 'title' in document:
+            stage_topic_change(transaction, db, user_id, data.get('title'), document['title'])
+        _stage_summary_entry(transaction, summary, summary_ref, user_id, presentation_ref.id, document, False, max_entries)
+        return document['version']
+
+    return patch(db.transaction())
+
+def delete_presentation(db, presentation_ref):
+    """
+    Delete a presentation, its slide documents, its user's summary entry and
+    analytics counts in one transaction.
+
+    When the summary was full, the next older presentation moves up into it.
+
+    Returns:
+        False when the presentation did not exist
+    """
+    @firestore.transactional
+    def delete(transaction):
+        snapshot = presentation_ref.get(transaction=transaction, field_paths=['user_id', 'created_at', 'title'] + SLIDE_INDEX_FIELDS)
+        if not snapshot.exists:
+            return False
+        data = snapshot.to_dict()
+        user_id = data.get('user_id')
+        summary_ref = _summary_ref(db, user_id)
+        summary = summary_ref.get(transaction=transaction) if user_id else None
+        if summary is None or not summary.exists:
+            stage_slide_deletes(transaction, presentation_ref, data.get('slide_ids') if uses_slide_subcollection(data) else None)
+            transaction.delete(presentation_ref)
+            stage_presentation_counts(transaction, db, user_id, data.get('created_at'), data.get('title'), -1)
+            return True
+
+        summary_data = summary.to_dict()
+        entries = summary_data.get('presentations') or []
+        remaining = [entry for entry in entries if entry.get('id') != presentation_ref.id]
+        listed = len(remaining) < len(entries)
+        truncated = summary_data.get('truncated', False)
+        if listed and truncated:
+            query = _newest_first(db, user_id)
+            if remaining and remaining[-1].get('created_at'):
+                query = query.start_after({'created_at': remaining[-1]['created_at'], '__name__': remaining[-1]['id']})
+            # The deleted presentation itself comes first when it was the oldest listed; a third
+            # document tells whether more remain beyond the one moving up
+            older = [doc for doc in transaction.get(query.limit(3)) if doc.id != presentation_ref.id]
+            if older:
+                remaining.append(summary_entry(older[0].id, older[0].to_dict()))
+            truncated = len(older) > 1
+        # Writes only after every read of the transaction
+        stage_slide_deletes(transaction, presentation_ref, data.get('slide_ids') if uses_slide_subcollection(data) else None)
+        transaction.delete(presentation_ref)
+        stage_presentation_counts(transaction, db, user_id, data.get('created_at'), data.get('title'), -1)
+        if listed:
+            transaction.set(summary_ref, {'user_id': user_id, 'presentations': remaining, 'truncated': truncated})
+        return True
+
+    return delete(db.transaction())
+
+def presentation_summary(db, user_id):
+    """
+    A user's summary document: their newest presentations, newest first.
+
+    Normally a single document read; a missing summary is built from a
+    presentations query in a transaction, so concurrent saves cannot be lost.
+
+    Returns:
+        (list of entries, True when older presentations exist beyond them)
+    """
+    summary_ref = _summary_ref(db, user_id)
+    summary = summary_ref.get()
+    if summary.exists:
+        data = summary.to_dict()
+        return data.get('presentations') or [], data.get('truncated', False)
+
+    max_entries = _summary_size()
+
+    @firestore.transactional
+    def build(transaction):
+        snapshot = summary_ref.get(transaction=transaction)
+        if snapshot.exists:
+            data = snapshot.to_dict()
+            return data.get('presentations') or [], data.get('truncated', False)
+        docs = list(transaction.get(_newest_first(db, user_id).limit(max_entries + 1)))
+        entries = [summary_entry(doc.id, doc.to_dict()) for doc in docs[:max_entries]]
+        truncated = len(docs) > max_entries
+        transaction.set(summary_ref, {'user_id': user_id, 'presentations': entries, 'truncated': truncated})
+        return entries, truncated
+
+    return build(db.transaction())
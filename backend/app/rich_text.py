@@ -0,0 +1,93 @@
+import re
+import html
+from collections import namedtuple
+from functools import lru_cache
+from bs4 import BeautifulSoup
+
+# One run of a textbox paragraph; style is None for text outside a span
+Run = namedtuple("Run", ["text", "style"])
+# Span overrides; None means "use the textbox default". color is the raw CSS value.
+RunStyle = namedtuple("RunStyle", ["font_family", "font_size", "color", "bold", "italic", "underline"])
+
+# The editor only emits plain text and flat <span style="..."> runs. Anything else
+# (nested tags, stray "<", other elements) matches the last alternative and is
+# handed to BeautifulSoup.
+_TOKEN_RE = re.compile(r"<span(\s[^<>]*)?>([^<]*)</span\s*>|([^<]+)|(<)", re.IGNORECASE)
+_STYLE_ATTR_RE = re.compile(r"""(?:^|\s)style\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'>]+))""", re.IGNORECASE)
+
+def parse_span_style(style_str):
+    styles = {}
+    if not style_str:
+        return styles
+    for part in style_str.split(';'):
+        if ':' in part:
+            key, value = part.split(':', 1)
+            key = key.strip().replace('-', '').lower()
+            value = value.strip()
+            styles[key] = value
+    return styles
+
+def _flag(styles, key):
+    return str(styles[key]).lower() == 'true' if key in styles else None
+
+@lru_cache(maxsize=1024)
+def parse_run_style(style_str):
+    """Parse a span style string into a RunStyle; memoized since decks repeat the same few styles"""
+    styles = parse_span_style(style_str)
+    font_size = None
+    if 'fontsize' in styles:
+        try:
+            font_size = float(str(styles['fontsize']).replace('pt', '').replace('px', ''))
+        except ValueError:
+            pass
+    return RunStyle(
+        styles.get('fontfamily'),
+        font_size,
+        styles.get('color'),
+        _flag(styles, 'bold'),
+        _flag(styles, 'italic'),
+        _flag(styles, 'underline')
+    )
+
+def _span_style_attr(attrs):
+    match = _STYLE_ATTR_RE.search(attrs or "")
+    if not match:
+        return ""
+    value = next(group for group in match.groups() if group is not None)
+    return html.unescape(value)
+
+def _parse_runs_with_soup(html_text):
+    """Reference parser for markup the tokenizer does not handle"""
+    soup = BeautifulSoup(f"<div>{html_text}</div>", "html.parser")
+    runs = []
+    for content_node in soup.div.contents:
+        if content_node.name == 'span':
+            runs.append(Run(content_node.get_text(), parse_run_style(content_node.get('style', ''))))
+        elif content_node.name is None:
+            runs.append(Run(str(content_node), None))
+        else:
+            # Other elements still produce an (empty) run, as the export always did
+            runs.append(Run("", None))
+    return tuple(runs)
+
+@lru_cache(maxsize=2048)
+def parse_runs(html_text):
+    """
+    Split one paragraph of editor markup into runs in a single pass.
+
+    Args:
+        html_text: Paragraph text, plain or with <span style="..."> runs
+
+    Returns:
+        Tuple of Run(text, style) with entities decoded; empty for an empty paragraph
+    """
+    runs = []
+    for match in _TOKEN_RE.finditer(html_text):
+        span_attrs, span_text, text, stray = match.groups()
+        if stray is not None:
+            return _parse_runs_with_soup(html_text)
+        if text is not None:
+            runs.append(Run(html.unescape(text), None))
+        else:
+            runs.append(Run(html.unescape(span_text), parse_run_style(_span_style_attr(span_attrs))))
+    return tuple(runs)
@@ -19,24 +19,36 @@ import firebase_admin
 from firebase_admin import credentials, firestore, auth
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime, timedelta, timezone
-from flask import Blueprint, request, jsonify, current_app, send_from_directory, send_file # Added send_file
+from flask import Blueprint, request, jsonify, current_app, send_from_directory, send_file, url_for # Added send_file
 from dotenv import load_dotenv
 from flask_cors import CORS
 from werkzeug.utils import secure_filename
-from io import BytesIO
-from app.image_service import generate_slide_image
-from pptx import Presentation as PptxPresentation
-from pptx.util import Pt, Inches
+from app.image_service import generate_slide_image, generate_slide_image_with_deadline
+from app.image_planner import plan_slide_images, build_slide_image_prompt
+from app.image_enrichment import start_image_enrichment, attach_late_images
+from app.smart_crop import smart_crop
+from app.template_assets import forget_template_asset
+from app.template_registry import register_custom_template, forget_custom_template
+from app.pptx_export import build_presentation, forget_base_decks
+from app.export_streaming import PPTX_MIMETYPE, DOCX_MIMETYPE
+from app.artifact_cache import artifact_key, send_artifact, prewarm_artifact
+from app.export_profiles import resolve_export_profile
+from app.text_fit import fit_font_size
+from app.analytics_rollups import delete_item, positive_counts, save_item, user_analytics
+from app.autosave_buffer import autosave_metrics, buffer_autosave, flush_autosave, record_saved_state, slides_state_hash
+from app.presentation_index import VersionConflict, delete_presentation, patch_presentation, presentation_summary, write_presentation
+from app.slide_store import SLIDE_INDEX_FIELDS, load_slides
+from app.thumbnails import get_or_render_thumbnail, prewarm_thumbnail, thumbnail_format, thumbnail_key, thumbnail_path
+from pptx.util import Pt
 from pptx.dml.color import RGBColor
 from PIL import Image, ImageDraw
-from pptx.enum.text import PP_ALIGN, MSO_ANCHOR, MSO_AUTO_SIZE # Ensure MSO_AUTO_SIZE is imported
+from pptx.enum.text import MSO_ANCHOR
 from pdf2image import convert_from_path
 from pptx.dml.color import RGBColor
 from pptx.enum.shapes import MSO_SHAPE
 from google.oauth2 import service_account
 from googleapiclient.discovery import build
 from docx import Document # Added for Word export
-from bs4 import BeautifulSoup
 from collections import Counter # Added import for Counter
 import smtplib
 from email.mime.text import MIMEText
@@ -53,186 +65,43 @@ firestore_db = firestore.client()
 
 def update_analytics_on_slide(user_id, topic=None):
     """Update analytics for a user when a slide is generated."""
-    analytics_ref = firestore_db.collection('analytics').document(user_id)
-    analytics_doc = analytics_ref.get()
-    if analytics_doc.exists:
-        analytics_ref.update({
-            'slides_created': firestore.Increment(1),
-            'last_topic': topic,
-            'last_generated_at': firestore.SERVER_TIMESTAMP
-        })
-    else:
-        analytics_ref.set({
-            'user_id': user_id,
-            'slides_created': 1,
-            'last_topic': topic,
-            'last_generated_at': firestore.SERVER_TIMESTAMP
-        })
-
-def hex_to_rgb(hex_color, default_color="bfdbfe"):
-    """Convert hex color to RGB tuple. Expands 3-digit hex, defaults to the provided default_color if invalid."""
-    if not hex_color:
-        current_app.logger.warning(f"Empty hex color, using default {default_color}")
-        hex_color = default_color
-    if hex_color.startswith('#'):
-        hex_color = hex_color[1:]
-    if len(hex_color) == 3:
-        hex_color = ''.join([c*2 for c in hex_color])
-    if len(hex_color) != 6:
-        current_app.logger.warning(f"Invalid hex color length: '{hex_color}', using default {default_color}")
-        hex_color = default_color
-    try:
-        return tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
-    except ValueError as e:
-        current_app.logger.warning(f"Invalid hex color: '{hex_color}', using default {default_color}. Error: {e}")
-        return tuple(int(default_color[i:i+2], 16) for i in (0, 2, 4))
-
-def calculate_position(shape_def, position_type, slide_width_inches, slide_height_inches):
-    """Calculate position (left/top) based on shape definition"""
-    # Check for direct inch values first
-    inch_key = f"{position_type}_in"
-    if inch_key in shape_def:
-        return Inches(shape_def[inch_key])
-        
-    # Check for ratio-based positioning
-    ratio_key = f"{position_type}_ratio"
-    if ratio_key in shape_def:
-        ratio = shape_def[ratio_key]
-        if position_type == "left":
-            return Inches(ratio * slide_width_inches)
-        else:  # top
-            return Inches(ratio * slide_height_inches)
-            
-    # Default to 0
-    return Inches(0)
-
-def calculate_dimension(shape_def, dimension_type, slide_width_inches, slide_height_inches):
-    """Calculate dimension (width/height) based on shape definition"""
-    # Check for direct inch values first
-    inch_key = f"{dimension_type}_in"
-    if inch_key in shape_def:
-        return Inches(shape_def[inch_key])
-        
-    # Check for ratio-based sizing
-    ratio_key = f"{dimension_type}_ratio"
-    if ratio_key in shape_def:
-        ratio = shape_def[ratio_key]
-        if dimension_type == "width":
-            return Inches(ratio * slide_width_inches)
-        else:  # height
-            return Inches(ratio * slide_height_inches)
-            
-    # Check for slide-height-based sizing
-    height_ratio_key = f"{dimension_type}_as_ratio_of_slide_height"
-    if height_ratio_key in shape_def:
-        ratio = shape_def[height_ratio_key]
-        return Inches(ratio * slide_height_inches)
-        
-    # Default to 1 inch
-    return Inches(1)
-
-def draw_template_shape(slide, shape_def, slide_width_inches, slide_height_inches):
-    """
-    Draw a shape on the slide based on shape definition
-    
-    Args:
-        slide: PowerPoint slide object
-        shape_def: Shape definition from template
-        slide_width_inches: Slide width in inches
-        slide_height_inches: Slide height in inches
-    
-    Returns:
-        bool: True if shape was drawn successfully, False otherwise
-    """
-    try:
-        if not shape_def:
-            current_app.logger.warning("Empty shape definition provided")
-            return False
-            
-        shape_type = shape_def.get("type", "rectangle")
-        current_app.logger.debug(f"Drawing template shape: type={shape_type}, def={shape_def}")
-        
-        # Calculate position and size with validation
-        left = calculate_position(shape_def, "left", slide_width_inches, slide_height_inches)
-        top = calculate_position(shape_def, "top", slide_width_inches, slide_height_inches)
-        width = calculate_dimension(shape_def, "width", slide_width_inches, slide_height_inches)
-        height = calculate_dimension(shape_def, "height", slide_width_inches, slide_height_inches)
-        
-        # Validate dimensions
-        if width <= 0 or height <= 0:
-            current_app.logger.warning(f"Invalid shape dimensions: width={width}, height={height}")
-            return False
-        
-        from pptx.enum.shapes import MSO_SHAPE
-        
-        # Use rounded rectangle for content box if specified
-        is_content_box = shape_def.get("comment", "") == "content_box"
-        if shape_type == "rectangle" and is_content_box:
-            shape = slide.shapes.add_shape(MSO_SHAPE.ROUNDED_RECTANGLE, left, top, width, height)
-            # Set rounding if radius is specified (python-pptx uses adjustment values 0-1)
-            radius = shape_def.get("radius")
-            if radius is not None:
-                try:
-                    # Adjustment 0 is corner rounding, 0.0 (square) to 1.0 (fully round)
-                    shape.adjustments[0] = float(radius)
-                except Exception as radius_error:
-                    current_app.logger.warning(f"Failed to set shape radius: {radius_error}")
-        elif shape_type == "rectangle":
-            shape = slide.shapes.add_shape(MSO_SHAPE.RECTANGLE, left, top, width, height)
-        elif shape_type == "oval":
-            shape = slide.shapes.add_shape(MSO_SHAPE.OVAL, left, top, width, height)
+    # A merged increment creates the document when needed, without reading it first
+    firestore_db.collection('analytics').document(user_id).set({
+        'user_id': user_id,
+        'slides_created': firestore.Increment(1),
+        'last_topic': topic,
+        'last_generated_at': firestore.SERVER_TIMESTAMP
+    }, merge=True)
+
+def get_remaining_image_budget(user_id):
+    """Return how many more images the user may generate today."""
+    daily_budget = current_app.config.get('IMAGE_BUDGET_PER_USER_DAILY', 60)
+    analytics_doc = firestore_db.collection('analytics').document(str(user_id)).get()
+    if not analytics_doc.exists:
+        return daily_budget
+    analytics_data = analytics_doc.to_dict()
+    if analytics_data.get('image_budget_date') != datetime.utcnow().strftime('%Y-%m-%d'):
+        return daily_budget
+    return max(0, daily_budget - analytics_data.get('images_generated_today', 0))
+
+def record_image_usage(user_id, count):
+    """Add generated images to the user's daily image budget usage."""
+    analytics_ref = firestore_db.collection('analytics').document(str(user_id))
+    today = datetime.utcnow().strftime('%Y-%m-%d')
+
+    # Read and write in one transaction so concurrent requests on a new day cannot reset each other's count
+    @firestore.transactional
+    def record(transaction):
+        analytics_doc = analytics_ref.get(field_paths=['image_budget_date'], transaction=transaction)
+        if analytics_doc.exists and analytics_doc.to_dict().get('image_budget_date') == today:
+            transaction.update(analytics_ref, {'images_generated_today': firestore.Increment(count)})
         else:
-            current_app.logger.warning(f"Unsupported shape type: {shape_type}")
-            return False
-            
-        # Apply fill
-        fill_style = shape_def.get("fill_style", "solid")
-        try:
-            if fill_style == "none":
-                shape.fill.background()
-            else:
-                fill_color_hex = shape_def.get("fill_color_hex", "FFFFFF")
-                fill_transparency = shape_def.get("fill_transparency", 0.0)
-                
-                shape.fill.solid()
-                shape.fill.fore_color.rgb = RGBColor(*hex_to_rgb(fill_color_hex))
-                if fill_transparency > 0:
-                    shape.fill.transparency = fill_transparency
-        except Exception as fill_error:
-            current_app.logger.warning(f"Failed to apply shape fill: {fill_error}")
-                
-        # Apply line/border
-        line_style = shape_def.get("line_style", "solid")
-        try:
-            if line_style == "none":
-                shape.line.fill.background()
-            else:
-                line_color_hex = shape_def.get("line_color_hex", "000000")
-                line_width_pt = shape_def.get("line_width_pt", 1)
-                line_transparency = shape_def.get("line_transparency", 0.0)
-                
-                shape.line.color.rgb = RGBColor(*hex_to_rgb(line_color_hex))
-                shape.line.width = Pt(line_width_pt)
-                if line_transparency > 0:
-                    shape.line.transparency = line_transparency
-        except Exception as line_error:
-            current_app.logger.warning(f"Failed to apply shape line: {line_error}")
-                
-        # Apply rotation if specified
-        rotation = shape_def.get("rotation", 0)
-        if rotation != 0:
-            try:
-                shape.rotation = rotation
-            except Exception as rotation_error:
-                current_app.logger.warning(f"Failed to apply shape rotation: {rotation_error}")
-        
-        current_app.logger.debug(f"Successfully drew template shape: {shape_type}")
-        return True
-            
-    except Exception as e:
-        current_app.logger.error(f"Error drawing template shape: {e}")
-        return False
+            transaction.set(analytics_ref, {
+                'image_budget_date': today,
+                'images_generated_today': count
+            }, merge=True)
 
+    record(firestore_db.transaction())
 
 load_dotenv()
 GOOGLE_CREDENTIALS_FILE = os.path.join(os.path.dirname(__file__), '..', 'credentials.json')
@@ -400,6 +269,13 @@ main = Blueprint("main", __name__)
 def health_check():
     return jsonify({'status': 'ok', 'message': 'Backend is running'}), 200
 
+# Autosave buffer counters of this worker, including autosaves received per Firestore write
+@main.route('/metrics/autosave', methods=['GET', 'OPTIONS'])
+def get_autosave_metrics():
+    if request.method == 'OPTIONS':
+        return jsonify({'status': 'ok'}), 200
+    return jsonify(autosave_metrics()), 200
+
 # --- FIREBASE USER REGISTRATION ---
 @main.route('/register', methods=['POST', 'OPTIONS'])
 def register():
@@ -576,47 +452,102 @@ def save_presentation():
     try:
         now = datetime.utcnow()
         doc = firestore_db.collection('presentations').document()
-        doc.set({
+        write_presentation(firestore_db, user_id, doc, {
             'user_id': user_id,
             'title': title,
             'slides': slides,
             'template': template,
             'presentation_type': presentation_type,
+            'slide_count': len(slides),
             'created_at': firestore.SERVER_TIMESTAMP,
             'updated_at': firestore.SERVER_TIMESTAMP
-        })
+        }, create=True)
         return jsonify({'message': 'Presentation saved successfully', 'presentationId': doc.id}), 201
     except Exception as e:
         current_app.logger.error(f"Error saving presentation: {e}", exc_info=True)
         return jsonify({'error': 'Failed to save presentation'}), 500
 
 # --- FIREBASE GET PRESENTATIONS FOR USER ---
+# Fields the dashboard list reads; slides stay in Firestore
+PRESENTATION_LIST_FIELDS = ['title', 'template', 'presentation_type', 'created_at', 'updated_at']
+PRESENTATION_SUMMARY_FIELDS = ['slide_count', 'cover_thumbnail_key']
+
 @main.route('/presentations/<user_id>', methods=['GET', 'OPTIONS'])
 def get_presentations(user_id):
-    """Return the 10 most recent presentations for a user, with ISO-formatted timestamps."""
+    """
+    Return a page of a user's presentations, newest first, with ISO-formatted timestamps.
+
+    The first page comes from the user's presentation_summaries document, a
+    single read. Later pages query only the listed fields, never the slides;
+    open a presentation through /presentation/<id> for those. The query needs
+    the (user_id ASC, created_at DESC) composite index in firestore.indexes.json.
+
+    Query args:
+        limit: Page size (default 10, at most PRESENTATION_LIST_MAX_LIMIT)
+        cursor: next_cursor of the previous page
+        view: "summary" adds slide_count and a cover thumbnail_url
+
+    Returns:
+        {'presentations': [...], 'next_cursor': cursor of the next page or None}
+    """
     if request.method == 'OPTIONS':
         return jsonify({'status': 'ok'}), 200
         
+    summary = request.args.get('view') == 'summary'
+    try:
+        limit = min(max(int(request.args.get('limit', 10)), 1), current_app.config.get('PRESENTATION_LIST_MAX_LIMIT', 50))
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
     try:
         current_app.logger.info(f"Fetching presentations for user_id: {user_id}")
-        presentations_ref = firestore_db.collection('presentations')
-        query = presentations_ref.where('user_id', '==', user_id)
-        docs = query.stream()
+        cursor = request.args.get('cursor')
+        if not cursor and limit <= current_app.config.get('PRESENTATION_SUMMARY_SIZE', 50):
+            entries, truncated = presentation_summary(firestore_db, user_id)
+            has_more = truncated or len(entries) > limit
+            rows = [(entry['id'], {k: v for k, v in entry.items() if k != 'id'}) for entry in entries[:limit]]
+        else:
+            fields = PRESENTATION_LIST_FIELDS + PRESENTATION_SUMMARY_FIELDS
+            query = (
+                firestore_db.collection('presentations')
+                .where('user_id', '==', user_id)
+                .order_by('created_at', direction=firestore.Query.DESCENDING)
+                .order_by('__name__', direction=firestore.Query.DESCENDING)
+                .select(fields)
+            )
+            if cursor:
+                try:
+                    created_at, last_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+                    query = query.start_after({'created_at': datetime.fromisoformat(created_at), '__name__': last_id})
+                except (ValueError, TypeError):
+                    return jsonify({'error': 'Invalid cursor'}), 400
+            # One extra document tells whether another page follows
+            docs = list(query.limit(limit + 1).stream())
+            has_more = len(docs) > limit
+            rows = [(doc.id, doc.to_dict()) for doc in docs[:limit]]
+        next_cursor = None
+        if has_more and rows and rows[-1][1].get('created_at'):
+            last_id, last = rows[-1]
+            next_cursor = base64.urlsafe_b64encode(json.dumps([last['created_at'].isoformat(), last_id]).encode('ascii')).decode('ascii')
+
         presentations = []
-        for doc in docs:
-            data = doc.to_dict()
-            data['id'] = doc.id
+        for presentation_id, data in rows:
+            data['id'] = presentation_id
             for ts_field in ['created_at', 'updated_at']:
                 if ts_field in data and data[ts_field] is not None:
                     try:
                         data[ts_field] = data[ts_field].isoformat()
                     except Exception:
                         data[ts_field] = str(data[ts_field])
+            cover_key = data.pop('cover_thumbnail_key', None)
+            slide_count = data.pop('slide_count', None)
+            if summary:
+                # Decks saved before cover keys existed render their thumbnail on first request
+                url_args = {'v': cover_key} if cover_key else {}
+                data['slide_count'] = slide_count
+                data['thumbnail_url'] = url_for('main.get_slide_thumbnail', presentation_id=presentation_id, slide_index=0, **url_args)
             presentations.append(data)
-        presentations.sort(key=lambda x: x.get('created_at', ''), reverse=True)
-        presentations = presentations[:10]
         current_app.logger.info(f"Returning {len(presentations)} presentations for user_id: {user_id}")
-        return jsonify({'presentations': presentations}), 200
+        return jsonify({'presentations': presentations, 'next_cursor': next_cursor}), 200
     except Exception as e:
         current_app.logger.error(f"Error fetching presentations for user_id {user_id}: {e}")
         return jsonify({'presentations': [], 'error': str(e)}), 200
@@ -632,9 +563,8 @@ def save_quiz():
     content = data.get('content')
     if not user_id or not name or not content:
         return jsonify({'error': 'Missing required fields'}), 400
-    quizzes_ref = firestore_db.collection('saved_quizzes')
-    doc = quizzes_ref.document()
-    doc.set({
+    # Also counted in the user's analytics
+    doc = save_item(firestore_db, 'saved_quizzes', {
         'user_id': user_id,
         'name': name,
         'content': content,
@@ -653,9 +583,8 @@ def save_script():
     content = data.get('content')
     if not user_id or not name or not content:
         return jsonify({'error': 'Missing required fields'}), 400
-    scripts_ref = firestore_db.collection('saved_scripts')
-    doc = scripts_ref.document()
-    doc.set({
+    # Also counted in the user's analytics
+    doc = save_item(firestore_db, 'saved_scripts', {
         'user_id': user_id,
         'name': name,
         'content': content,
@@ -685,7 +614,7 @@ def get_saved_items(user_id):
 def delete_saved_quiz(quiz_id):
     if request.method == 'OPTIONS':
         return jsonify({'status': 'ok'}), 200
-    firestore_db.collection('saved_quizzes').document(quiz_id).delete()
+    delete_item(firestore_db, 'saved_quizzes', quiz_id)
     return jsonify({'message': 'Quiz deleted successfully'}), 200
 
 # --- FIREBASE DELETE SCRIPT ---
@@ -693,7 +622,7 @@ def delete_saved_quiz(quiz_id):
 def delete_saved_script(script_id):
     if request.method == 'OPTIONS':
         return jsonify({'status': 'ok'}), 200
-    firestore_db.collection('saved_scripts').document(script_id).delete()
+    delete_item(firestore_db, 'saved_scripts', script_id)
     return jsonify({'message': 'Script deleted successfully'}), 200
 
 @main.route('/generate-quiz', methods=['POST', 'OPTIONS'])
@@ -909,6 +838,44 @@ def generate_script_route():
 #     return jsonify({'presentations': presentations})
 
 
+# Small rendered preview of one slide; URLs carrying the slide's content key (?v=) never change
+@main.route('/presentation/<presentation_id>/thumbnail/<int:slide_index>', methods=['GET', 'OPTIONS'])
+def get_slide_thumbnail(presentation_id, slide_index):
+    if request.method == 'OPTIONS':
+        return jsonify({'status': 'ok'}), 200
+
+    mimetype = f"image/{thumbnail_format().lower()}"
+    version = request.args.get('v', '')
+    # A cached thumbnail named by the requested key is served without reading the deck
+    if re.fullmatch(r'[0-9a-f]{64}', version) and os.path.exists(thumbnail_path(version)):
+        response = send_file(thumbnail_path(version), mimetype=mimetype, etag=version, max_age=31536000)
+        response.cache_control.immutable = True
+        return response
+
+    try:
+        presentation_ref = firestore_db.collection('presentations').document(str(presentation_id))
+        presentation_doc = presentation_ref.get(field_paths=['template', 'user_id'] + SLIDE_INDEX_FIELDS)
+        if not presentation_doc.exists:
+            return jsonify({'error': 'Presentation not found'}), 404
+        pres_data = presentation_doc.to_dict()
+        # Only this slide's document is read
+        slide = load_slides(firestore_db, presentation_ref, pres_data, [slide_index])[0]
+        if not isinstance(slide, dict):
+            return jsonify({'error': 'Slide not found'}), 404
+        slide_type = "title" if slide_index == 0 else "content"
+        key = thumbnail_key(slide, pres_data.get('template'), slide_type)
+        path = get_or_render_thumbnail(
+            key, slide, pres_data.get('template'), slide_type,
+            db=firestore_db, user_id=pres_data.get('user_id')
+        )
+        response = send_file(path, mimetype=mimetype, etag=key, max_age=31536000 if version == key else 0)
+        if version == key:
+            response.cache_control.immutable = True
+        return response
+    except Exception as e:
+        current_app.logger.error(f"Error rendering thumbnail {slide_index} of presentation {presentation_id}: {e}", exc_info=True)
+        return jsonify({'error': 'Failed to render thumbnail'}), 500
+
 # --- FIREBASE GET/DELETE SINGLE PRESENTATION ---
 @main.route('/presentation/<presentation_id>', methods=['GET', 'DELETE', 'OPTIONS'])
 def manage_presentation(presentation_id):
@@ -919,31 +886,59 @@ def manage_presentation(presentation_id):
 
     if request.method == 'GET':
         try:
+            # A reopened editor sees its last autosave even while it is still buffered
+            _, autosave_error = flush_autosave(str(presentation_id))
             presentation_doc = presentation_ref.get()
             if not presentation_doc.exists:
                 return jsonify({'error': 'Presentation not found'}), 404
             pres_data = presentation_doc.to_dict()
-            slides_data = pres_data.get('slides', [])
-            return jsonify({
+            slides_data = load_slides(firestore_db, presentation_ref, pres_data)
+            response = {
                 'id': presentation_doc.id,
                 'title': pres_data.get('title'),
                 'slides': slides_data,
                 'template': pres_data.get('template'),
                 'presentation_type': pres_data.get('presentation_type'),
                 'created_at': pres_data.get('created_at')
-            })
+            }
+            if autosave_error:
+                # The editor already got a 202 for the lost autosave
+                response['autosave_error'] = autosave_error
+            return jsonify(response)
         except Exception as e:
             current_app.logger.error(f"Error retrieving presentation {presentation_id}: {e}")
             return jsonify({'error': 'Failed to retrieve presentation'}), 500
 
     elif request.method == 'DELETE':
         try:
-            presentation_ref.delete()
+            # Also drops it from the owner's dashboard summary
+            delete_presentation(firestore_db, presentation_ref)
             return jsonify({'message': 'Presentation deleted successfully'}), 200
         except Exception as e:
             current_app.logger.error(f"Error deleting presentation {presentation_id}: {e}")
             return jsonify({'error': 'Failed to delete presentation'}), 500
 
+# Lightweight poll for images attached in the background after /generate-slides
+@main.route('/presentation/<presentation_id>/images', methods=['GET', 'OPTIONS'])
+def get_presentation_images(presentation_id):
+    if request.method == 'OPTIONS':
+        return jsonify({'status': 'ok'}), 200
+
+    try:
+        presentation_ref = firestore_db.collection('presentations').document(str(presentation_id))
+        presentation_doc = presentation_ref.get(field_paths=['slide_images', 'image_enrichment'])
+        if not presentation_doc.exists:
+            return jsonify({'error': 'Presentation not found'}), 404
+        pres_data = presentation_doc.to_dict() or {}
+        return jsonify({
+            'id': presentation_id,
+            'image_status': pres_data.get('image_enrichment') or 'done',
+            'images': pres_data.get('slide_images', {})
+        }), 200
+    except Exception as e:
+        current_app.logger.error(f"Error retrieving images for presentation {presentation_id}: {e}")
+        return jsonify({'error': 'Failed to retrieve presentation images'}), 500
+
 # Route to save or update slide editor state
 @main.route('/api/save-slides-state', methods=['POST', 'OPTIONS'])
 def save_slides_state():
@@ -960,44 +955,72 @@ def save_slides_state():
         template_id = data.get("templateId") or data.get("template")
         presentation_type = data.get("presentationType", "Default")
         presentation_id = data.get("presentationId") or data.get("presentation_id")
+        # Version the client's edits are based on; stale saves get a 409
+        base_version = data.get("baseVersion")
+        if base_version is not None and (not isinstance(base_version, int) or isinstance(base_version, bool)):
+            return jsonify({"error": "baseVersion must be an integer"}), 400
+
+        if data.get("patch") is not None:
+            if not user_id or not presentation_id:
+                return jsonify({"error": "Missing required fields (user_id, presentation_id)"}), 400
+            return save_slides_patch(user_id, presentation_id, data, base_version)
 
         if not user_id or not slides or not template_id:
             return jsonify({"error": "Missing required fields (user_id, slides, template_id)"}), 400
 
         slides_json_str = json.dumps(slides)
         now = datetime.utcnow()        
+        # Content key of the cover: a saved edit points the dashboard at a new thumbnail
+        cover = deck_cover_fields(slides[0], template_id) if isinstance(slides, list) and isinstance(slides[0], dict) else {}
         
         if presentation_id:
-            # Update existing presentation
+            # Update existing presentation; the title from the slides goes into the same write
             presentation_ref = firestore_db.collection('presentations').document(str(presentation_id))
-            presentation_doc = presentation_ref.get()
-            if not presentation_doc.exists:
-                return jsonify({"error": "Presentation not found"}), 404
-            
-            # Update the title from the slides if it has changed
-            if slides and isinstance(slides, list) and len(slides) > 0:
-                first_slide = slides[0]
-                new_title = None
-                
-                # Check if it's editor format (with textboxes)
-                if isinstance(first_slide, dict) and 'textboxes' in first_slide:
-                    title_textbox = next((tb for tb in first_slide['textboxes'] if tb.get('type') == 'title'), None)
-                    if title_textbox and title_textbox.get('text'):
-                        new_title = title_textbox['text']
-                # Check if it's simple format (with title field)
-                elif isinstance(first_slide, dict) and 'title' in first_slide:
-                    new_title = first_slide['title']
-                
-                if new_title and new_title.strip() and new_title != "Title":
-                    presentation_ref.update({'title': new_title.strip()})
-            
-            presentation_ref.update({
+            fields = {
                 'slides': slides,
                 'template': template_id,
                 'presentation_type': presentation_type,
+                'slide_count': len(slides),
                 'updated_at': now
-            })
-            return jsonify({"message": "Presentation updated successfully", "presentationId": presentation_id}), 200
+            }
+            fields.update(cover)
+
+            def write(version_base):
+                version = write_presentation(firestore_db, user_id, presentation_ref, fields, base_version=version_base)
+                if version is not None:
+                    prewarm_presentation_export(slides, template_id, user_id)
+                    prewarm_cover_thumbnail(slides, template_id, cover.get('cover_thumbnail_key'), user_id)
+                return version
+
+            key = str(presentation_id)
+            state_hash = slides_state_hash(slides, template_id, presentation_type)
+            window = current_app.config.get('AUTOSAVE_COALESCE_SECONDS', 2.0)
+            if data.get("autosave") and window > 0:
+                # Editor autosaves are coalesced; only the last of a burst is written
+                status, version = buffer_autosave(
+                    current_app._get_current_object(), key, state_hash, base_version, write,
+                    window, current_app.config.get('AUTOSAVE_MAX_DELAY_SECONDS', 10.0)
+                )
+                if status == 'conflict':
+                    return jsonify({"error": "Presentation was changed elsewhere", "currentVersion": version}), 409
+                if status == 'unchanged':
+                    return jsonify({"message": "No changes to save", "presentationId": presentation_id, "version": version}), 200
+                if status == 'buffered':
+                    return jsonify({"message": "Autosave queued", "presentationId": presentation_id, "version": version}), 202
+            try:
+                # An explicit save first writes whatever autosave is still buffered
+                base_version, autosave_error = flush_autosave(key, base_version)
+                version = write(base_version)
+            except VersionConflict as e:
+                return jsonify({"error": "Presentation was changed elsewhere", "currentVersion": e.current_version}), 409
+            if version is None:
+                return jsonify({"error": "Presentation not found"}), 404
+            record_saved_state(key, state_hash, version)
+            response = {"message": "Presentation updated successfully", "presentationId": presentation_id, "version": version}
+            if autosave_error:
+                # This save holds the whole deck, so it also stored what the failed autosave lost
+                response["autosaveError"] = autosave_error
+            return jsonify(response), 200
         else:
             # Create new presentation
             title = "Untitled Presentation"
@@ -1014,16 +1037,20 @@ def save_slides_state():
                     title = first_slide['title'].strip()
             
             doc = firestore_db.collection('presentations').document()
-            doc.set({
+            version = write_presentation(firestore_db, user_id, doc, {
                 'user_id': user_id,
                 'title': title,
                 'slides': slides,
                 'template': template_id,
                 'presentation_type': presentation_type,
+                'cover_thumbnail_key': cover.get('cover_thumbnail_key'),
+                'slide_count': len(slides),
                 'created_at': now,
                 'updated_at': now
-            })
-            return jsonify({"message": "Presentation created successfully", "presentationId": doc.id}), 201
+            }, create=True)
+            prewarm_presentation_export(slides, template_id, user_id)
+            prewarm_cover_thumbnail(slides, template_id, cover.get('cover_thumbnail_key'), user_id)
+            return jsonify({"message": "Presentation created successfully", "presentationId": doc.id, "version": version}), 201
     except Exception as e:
         current_app.logger.error(f"Error in /api/save-slides-state: {e}", exc_info=True)
         return jsonify({"error": "An error occurred while saving the presentation."}), 500
@@ -1136,6 +1163,8 @@ def generate_slides():
     template = data.get("template")
     generate_images = data.get("generate_images", False)  # ✅ NEW: Get image generation flag
     image_style = data.get("image_style", "professional")  # ✅ NEW: Get image style preference
+    # Return text slides right away and attach images in the background (needs user_id to store them)
+    defer_images = bool(data.get("defer_images", False)) and bool(user_id)
 
     try:
         num_slides = int(data.get("numSlides", 5))
@@ -1358,76 +1387,106 @@ Generate exactly {num_slides} slides now with professional, educational content:
                     "Strategic implications and recommendations"
                 ])
 
-        # ✅ Smart image generation - only generate if slide needs it
+        # ✅ Smart image generation - plan a per-deck budget, generate only the top-ranked slides
+        deferred_image_jobs = []
+        late_images = []
+        template_id = template.get("id") if isinstance(template, dict) else template
         if generate_images: 
-            current_app.logger.info(f"🎨 Analyzing slides for image generation...")
+            current_app.logger.info(f"🎨 Planning image generation...")
             
-            for i, slide in enumerate(slides_data):
+            deck_budget = current_app.config.get('IMAGE_BUDGET_PER_DECK', 6)
+            user_budget = get_remaining_image_budget(user_id) if user_id else None
+            scheduled, lazy = plan_slide_images(slides_data, deck_budget, user_budget)
+            current_app.logger.info(f"🗓️ Image plan: generating {scheduled}, deferring {lazy} (budget {deck_budget}/{user_budget})")
+            
+            # Eligible slides over budget are generated on demand via /generate-slide-image
+            for i in lazy:
+                slides_data[i]["image_status"] = "lazy"
+                slides_data[i]["image_prompt"] = build_slide_image_prompt(slides_data[i])
+            
+            if defer_images:
+                for i in scheduled:
+                    slides_data[i]["image_status"] = "pending"
+                    deferred_image_jobs.append((i, build_slide_image_prompt(slides_data[i])))
+                scheduled = []
+            
+            # Remote images that miss the deadline get a local placeholder; they can upgrade it later
+            deadline = current_app.config.get('IMAGE_DEADLINE_SECONDS', 8.0)
+            generated_count = 0
+            for i in scheduled:
+                slide = slides_data[i]
                 try: 
-                    # Check if slide explicitly says it needs an image
-                    needs_image = slide.get("needs_image", False)
-                    
-                    # Skip title slide and references
-                    slide_title = slide.get('title', '').lower()
-                    is_title = i == 0
-                    is_references = any(keyword in slide_title for keyword in ["reference", "source", "bibliography"])
-                    
-                    if is_title or is_references:
-                        current_app.logger.info(f"⏭️ Skipping image for slide {i+1} (title/references)")
-                        continue
-                    
-                    # Only generate if AI determined slide needs image
-                    if not needs_image:
-                        current_app.logger.info(f"⏭️ Slide {i+1} doesn't need image (content-based)")
-                        continue
-                    
-                    # Generate image for slides that need visual representation
-                    title = slide.get('title', 'presentation topic')
-                    title = str(title).replace('"', '').replace("'", '').replace('\\', '')
-                    
-                    content = slide.get('content', [])
-                    first_content = ''
-                    if isinstance(content, list) and len(content) > 0:
-                        first_content = str(content[0])[:100]
-                        first_content = first_content.replace('"', '').replace("'", '')
-                    
-                    # Create descriptive image prompt
-                    image_prompt = f"{title}. {first_content}"
-                    image_prompt = image_prompt.strip()[:200]
-                    image_prompt = ''.join(char for char in image_prompt if ord(char) < 127 or char.isalpha())
-                    
+                    image_prompt = build_slide_image_prompt(slide)
                     current_app.logger.info(f"🖼️ Generating image {i+1}: {image_prompt[:60]}...")
                     
-                    image_url = generate_slide_image(
+                    image_url, is_placeholder, pending_future = generate_slide_image_with_deadline(
                         prompt=image_prompt,
+                        title=slide.get('title'),
+                        template_id=template_id,
+                        deadline=deadline,
                         width=1024,
                         height=576,
                         style=image_style
                     )
                     
-                    if image_url:
-                        slide["image_url"] = image_url
+                    slide["image_url"] = image_url
+                    if is_placeholder:
+                        slide["image_status"] = "placeholder"
+                        if pending_future is not None:
+                            late_images.append((i, pending_future))
+                        current_app.logger.info(f"🧩 Using placeholder image for slide {i+1}")
+                    else:
+                        slide["image_status"] = "ready"
+                        generated_count += 1
                         current_app.logger.info(f"✅ Generated image for slide {i+1}")
                     
                 except Exception as img_error: 
                     current_app.logger.error(f"❌ Error with image for slide {i+1}: {img_error}")
                     continue
+            
+            if user_id and generated_count:
+                record_image_usage(user_id, generated_count)
+
+        # Late remote images replace their placeholders in the stored deck; the client polls for them
+        upgrade_placeholders = bool(late_images) and current_app.config.get('IMAGE_PLACEHOLDER_UPGRADE', True)
 
         # After successful slide generation, store presentation metadata and slides in Firestore
+        presentation_id = None
         if user_id: 
             doc = firestore_db. collection('presentations').document()
-            doc.set({
+            write_presentation(firestore_db, user_id, doc, {
                 'user_id': user_id,
                 'title': prompt_topic,
                 'template': template,
                 'slides': slides_data,
+                'slide_count': len(slides_data),
+                'image_enrichment': 'pending' if deferred_image_jobs or upgrade_placeholders else None,
                 'created_at': firestore.SERVER_TIMESTAMP,
                 'updated_at': firestore.SERVER_TIMESTAMP
-            })
+            }, create=True)
+            presentation_id = doc.id
             # Update analytics after successful slide generation and saving
             update_analytics_on_slide(user_id, topic=prompt_topic)
 
-        return jsonify({"slides":  slides_data})
+        if deferred_image_jobs:
+            app = current_app._get_current_object()
+            start_image_enrichment(
+                app, firestore_db, presentation_id, deferred_image_jobs, style=image_style, template_id=template_id,
+                on_complete=lambda count: record_image_usage(user_id, count) if count else None
+            )
+            current_app.logger.info(f"⏳ Deferred {len(deferred_image_jobs)} images for presentation {presentation_id}")
+
+        if presentation_id and upgrade_placeholders:
+            app = current_app._get_current_object()
+            attach_late_images(
+                app, firestore_db, presentation_id, late_images,
+                on_complete=lambda count: record_image_usage(user_id, count) if count else None
+            )
+
+        response_data = {"slides":  slides_data, "presentation_id": presentation_id}
+        if deferred_image_jobs or (presentation_id and upgrade_placeholders):
+            response_data["image_status"] = "pending"
+        return jsonify(response_data)
     
     except requests.exceptions.Timeout:
         current_app.logger.error("Request to Groq API timed out")
@@ -1445,6 +1504,39 @@ Generate exactly {num_slides} slides now with professional, educational content:
         return jsonify({"error": "Internal server error."}), 500
 
 
+# --- ON-DEMAND IMAGE FOR SLIDES DEFERRED BY THE IMAGE PLANNER ---
+@main.route("/generate-slide-image", methods=["POST", "OPTIONS"])
+def generate_slide_image_on_demand():
+    if request.method == 'OPTIONS':
+        return jsonify({'status': 'ok'}), 200
+
+    data = request.get_json()
+    if not data:
+        return jsonify({"error": "No data provided"}), 400
+
+    user_id = data.get("user_id")
+    image_style = data.get("image_style", "professional")
+    image_prompt = data.get("image_prompt")
+    if not image_prompt and isinstance(data.get("slide"), dict):
+        image_prompt = build_slide_image_prompt(data["slide"])
+    if not image_prompt:
+        return jsonify({"error": "image_prompt or slide is required"}), 400
+
+    try:
+        if user_id and get_remaining_image_budget(user_id) <= 0:
+            return jsonify({"error": "Daily image budget exhausted"}), 429
+
+        image_url = generate_slide_image(prompt=image_prompt, width=1024, height=576, style=image_style)
+        if not image_url:
+            return jsonify({"error": "Failed to generate image"}), 502
+
+        if user_id:
+            record_image_usage(user_id, 1)
+        return jsonify({"image_url": image_url, "image_status": "ready"}), 200
+    except Exception as e:
+        current_app.logger.error(f"Error generating on-demand slide image: {e}", exc_info=True)
+        return jsonify({"error": "Failed to generate image"}), 500
+
 def apply_markdown_formatting(run, text):
     import re
     # Bold
@@ -1498,16 +1590,12 @@ def apply_template_to_slide(slide, template, slide_data, ppt=None):
         base_font_size = template["content_font"]["size"]
         font_size = base_font_size
         if template.get("auto_font_size", False):
-            # Reduce font size if content is long (e.g. > 6 lines)
-            n_items = len(content_list) if isinstance(content_list, list) else 1
-            if n_items > 12:
-                font_size = max(14, base_font_size - 8)
-            elif n_items > 9:
-                font_size = max(16, base_font_size - 6)
-            elif n_items > 6:
-                font_size = max(18, base_font_size - 4)
-            else:
-                font_size = base_font_size
+            # Largest size at which the wrapped content fits the placeholder
+            font_size = fit_font_size(
+                content_list if isinstance(content_list, list) else [content_list],
+                template["content_font"]["name"], base_font_size, content_shape.width, content_shape.height,
+                bold=template.get("content_bold", False)
+            )
 
         for idx, item in enumerate(content_list):
             p = content_shape.text_frame.add_paragraph()
@@ -1531,15 +1619,11 @@ def apply_template_to_slide(slide, template, slide_data, ppt=None):
         base_font_size = template["content_font"]["size"]
         font_size = base_font_size
         if template.get("auto_font_size", False):
-            n_items = len(content_list) if isinstance(content_list, list) else 1
-            if n_items > 12:
-                font_size = max(14, base_font_size - 8)
-            elif n_items > 9:
-                font_size = max(16, base_font_size - 6)
-            elif n_items > 6:
-                font_size = max(18, base_font_size - 4)
-            else:
-                font_size = base_font_size
+            font_size = fit_font_size(
+                content_list if isinstance(content_list, list) else [content_list],
+                template["content_font"]["name"], base_font_size, width, height,
+                bold=template.get("content_bold", False)
+            )
         for item in content_list:
             p = tf.add_paragraph()
             p.text = item
@@ -1567,22 +1651,9 @@ def apply_template_to_slide(slide, template, slide_data, ppt=None):
                 height = slide_height
                 # Open image and crop/resize to fit right half
                 with Image.open(img_path) as im:
-                    # Calculate aspect ratios
+                    # Crop image to match target aspect ratio around its most salient region
                     target_ratio = width / height
-                    img_ratio = im.width / im.height
-                    # Crop image to match target aspect ratio (center crop)
-                    if img_ratio > target_ratio:
-                        # Image is wider than target: crop sides
-                        new_width = int(im.height * target_ratio)
-                        offset = (im.width - new_width) // 2
-                        box = (offset, 0, offset + new_width, im.height)
-                        im_cropped = im.crop(box)
-                    else:
-                        # Image is taller than target: crop top/bottom
-                        new_height = int(im.width / target_ratio)
-                        offset = (im.height - new_height) // 2
-                        box = (0, offset, im.width, offset + new_height)
-                        im_cropped = im.crop(box)
+                    im_cropped = smart_crop(im, target_ratio, image_bytes=img_data)
                     # Save cropped image
                     im_cropped.save(img_path)
                 slide.shapes.add_picture(img_path, left, top, width, height)
@@ -1607,12 +1678,6 @@ def generate_presentation():
         response.headers.add('Access-Control-Allow-Methods', 'GET,PUT,POST,DELETE,OPTIONS')
         return response
         
-    # Define slide and editor dimensions (in inches and pixels)
-    PPTX_SLIDE_WIDTH_INCHES = 13.33
-    PPTX_SLIDE_HEIGHT_INCHES = 7.5
-    EDITOR_SLIDE_WIDTH_PX = 1280 # Assuming this is the canvas width in the frontend editor
-    EDITOR_SLIDE_HEIGHT_PX = 720 # Assuming this is the canvas height in the frontend editor
-
     data = request.json
     if not data:
         return jsonify({"error": "No data provided"}), 400
@@ -1622,6 +1687,8 @@ def generate_presentation():
         return jsonify({"error": "Invalid slides data"}), 400
     
     global_template_id = data.get("templateId") or data.get("template")
+    # Lets custom templates resolve from the owner's cached set without a lookup
+    export_user_id = data.get("userId") or data.get("user_id")
     
     # Ensure global template ID is a string
     if isinstance(global_template_id, dict):
@@ -1629,391 +1696,137 @@ def generate_presentation():
     
     current_app.logger.info(f"Using global template ID: {global_template_id}")
 
-    prs = PptxPresentation()
-    prs.slide_width = Inches(PPTX_SLIDE_WIDTH_INCHES)
-    prs.slide_height = Inches(PPTX_SLIDE_HEIGHT_INCHES)
-
-    # Calculate conversion factors once
-    px_to_in_x = PPTX_SLIDE_WIDTH_INCHES / EDITOR_SLIDE_WIDTH_PX
-    px_to_in_y = PPTX_SLIDE_HEIGHT_INCHES / EDITOR_SLIDE_HEIGHT_PX
-
-    # Helper function (can be outside or nested if only used here)
-    def parse_span_style(style_str):
-        styles = {}
-        if not style_str:
-            return styles
-        for part in style_str.split(';'):
-            if ':' in part:
-                key, value = part.split(':', 1)
-                key = key.strip().replace('-', '').lower()
-                value = value.strip()
-                styles[key] = value
-        return styles    
-    for slide_index, slide_item_data in enumerate(slides_data):
-        slide_layout = prs.slide_layouts[6]  # BLANK layout
-        ppt_slide = prs.slides.add_slide(slide_layout)        # Determine template for this slide
-        slide_template_id = slide_item_data.get("templateId") or slide_item_data.get("template") or global_template_id
-        
-        # Ensure template_id is a string, not a dict
-        if isinstance(slide_template_id, dict):
-            slide_template_id = slide_template_id.get("id") or slide_template_id.get("templateId")
-        
-        current_app.logger.debug(f"Slide {slide_index}: using template '{slide_template_id}'")
-          # Apply template background if available
-        template_applied = False
-        if slide_template_id and isinstance(slide_template_id, str):
-            # Create a simple template definition object
-            template_def = {"id": slide_template_id}
-              # Determine slide type based on slide position
-            # Slide 1 = title, Slides 2+ = content for ALL templates
-            slide_type = "title" if slide_index == 0 else "content"
-            current_app.logger.debug(f"Template '{slide_template_id}' - Slide {slide_index} set to type: {slide_type}")
-                
-            template_applied = draw_template_slide_background(
-                ppt_slide, template_def, slide_type, 
-                PPTX_SLIDE_WIDTH_INCHES, PPTX_SLIDE_HEIGHT_INCHES
-            )
-            
-            if template_applied:
-                current_app.logger.info(f"Successfully applied template '{slide_template_id}' (type: {slide_type}) to slide {slide_index}")
-            else:
-                current_app.logger.warning(f"Failed to apply template '{slide_template_id}' to slide {slide_index}")
-        else:
-            if slide_template_id:
-                current_app.logger.warning(f"Template '{slide_template_id}' not found or invalid for slide {slide_index}")
-            else:
-                current_app.logger.debug(f"No template specified for slide {slide_index}")        # Fallback: apply simple background if no template was applied
-        if not template_applied:
-            background_data = slide_item_data.get("background", {})
-            bg_fill_hex = background_data.get("fill", "#FFFFFF")
-            if bg_fill_hex:
-                try:
-                    fill = ppt_slide.background.fill
-                    fill.solid()
-                    rgb_tuple = hex_to_rgb(bg_fill_hex)
-                    fill.fore_color.rgb = RGBColor(*rgb_tuple)
-                except Exception as e:
-                    current_app.logger.error(f"Error setting background color: {e}", exc_info=True)
-
-
-        # Collect elements to be rendered based on zIndex
-        elements_to_render = []
-        
-        # Check if this is a references/sources slide
-        is_references_slide = False
-        slide_title = slide_item_data.get("title", "").lower()
-        if any(keyword in slide_title for keyword in ["reference", "source", "bibliography", "citation"]):
-            is_references_slide = True
-
-        textboxes_data = slide_item_data.get("textboxes", [])
-        for tb_data in textboxes_data:
-            elements_to_render.append({
-                "type": "textbox",
-                "data": tb_data,
-                "zIndex": int(tb_data.get("zIndex", 100)) # Default zIndex for textboxes
-            })
+    # draft, standard or print: image resolution, JPEG quality and zip compression
+    profile = resolve_export_profile(data.get("profile"))
+    key, build_document = presentation_artifact(slides_data, global_template_id, export_user_id, profile)
+    return send_artifact(key, "pptx", build_document, "smartslide_presentation.pptx", PPTX_MIMETYPE, profile.zip_level)
+
+def slide_deck_title(first_slide):
+    """Title of a deck taken from its first slide, or None when the slide has no usable title"""
+    new_title = None
+    # Check if it's editor format (with textboxes)
+    if isinstance(first_slide, dict) and 'textboxes' in first_slide:
+        title_textbox = next((tb for tb in first_slide['textboxes'] if tb.get('type') == 'title'), None)
+        if title_textbox and title_textbox.get('text'):
+            new_title = title_textbox['text']
+    # Check if it's simple format (with title field)
+    elif isinstance(first_slide, dict) and 'title' in first_slide:
+        new_title = first_slide['title']
+    if new_title and new_title.strip() and new_title != "Title":
+        return new_title.strip()
+    return None
 
-        images_data = slide_item_data.get("images", []) # Process multiple images
-        # Only add image if NOT a references slide
-        if not is_references_slide:
-            for img_data in images_data:
-                elements_to_render.append({
-                    "type": "image",
-                    "data": img_data,
-                    "zIndex": int(img_data.get("zIndex", 101)) # Images have zIndex
-                })
-          # Sort elements by zIndex: lower zIndex elements are added first (appear "behind")
-        elements_to_render.sort(key=lambda el: el["zIndex"])
-          # Render elements in sorted order
-        for element in elements_to_render:
-            el_data = element["data"]
-            el_type = element["type"]
-            
-            if el_type == "textbox":
-                try:
-                    x_px = float(el_data.get("x", 0))
-                    y_px = float(el_data.get("y", 0))
-                    width_px = float(el_data.get("width", 100))
-                    height_px = float(el_data.get("height", 50))
-                    left = Inches(x_px * px_to_in_x)
-                    top = Inches(y_px * px_to_in_y)
-                    width = Inches(width_px * px_to_in_x)
-                    height = Inches(height_px * px_to_in_y)                  
-                    if width <= Inches(0) or height <= Inches(0):
-                        current_app.logger.warning(f"Skipping textbox with invalid dimensions: w_px={width_px}, h_px={height_px}")
-                        continue
-
-                    shape = ppt_slide.shapes.add_textbox(left, top, width, height)
-                    tf = shape.text_frame
-                    tf.word_wrap = True 
-                    tf.auto_size = MSO_AUTO_SIZE.NONE # Use explicit height
-                    tf.margin_bottom = Inches(0.05) 
-                    tf.margin_left = Inches(0.1)
-                    tf.margin_right = Inches(0.1)
-                    tf.margin_top = Inches(0.05)
-                    tf.clear()
-
-                    text_content = el_data.get("text", "")
-                    default_font_family = el_data.get("fontFamily", "Lexend")  # Changed from Arial to Lexend
-                    default_font_size_pt = float(el_data.get("fontSize", 16))  # Changed from 18 to 16
-                    default_font_color_hex = el_data.get("fill", "#000000")
-                    default_font_color_rgb = hex_to_rgb(default_font_color_hex)
-                    
-                    default_font_style_data = el_data.get("fontStyle", {})
-                    default_bold = default_font_style_data.get("bold", False)
-                    default_italic = default_font_style_data.get("italic", False)
-                    default_underline = default_font_style_data.get("underline", False)
-                    
-                    default_align_str = el_data.get("align", "left").upper()
-                    align_map = {
-                        "LEFT": PP_ALIGN.LEFT, "CENTER": PP_ALIGN.CENTER,
-                        "RIGHT": PP_ALIGN.RIGHT, "JUSTIFY": PP_ALIGN.JUSTIFY,
-                    }
-                    default_alignment = align_map.get(default_align_str, PP_ALIGN.LEFT)
-                    
-                    default_line_height_multiplier = el_data.get("lineHeight") # e.g., 1, 1.15, 1.5
-                    default_paragraph_spacing_pt = float(el_data.get("paragraphSpacing", 0))
-                    is_bulleted = el_data.get("bullets", False)
+def deck_cover_fields(first_slide, template_id):
+    """Presentation fields that follow the first slide: its cover thumbnail key and the title"""
+    fields = {'cover_thumbnail_key': thumbnail_key(first_slide, template_id, "title")}
+    title = slide_deck_title(first_slide)
+    if title:
+        fields['title'] = title
+    return fields
 
-                    paragraphs_text = text_content.split('\\\\n') # Split by literal \\n from JSON
-                    
-                    if not paragraphs_text and not text_content.strip(): # Handle completely empty textbox or textbox with only &nbsp;
-                        p = tf.add_paragraph()
-                        run = p.add_run()
-                        run.text = " " # Add a space to make it selectable and visible if it has dimensions
-                        run.font.size = Pt(1)
-                        continue # Move to next element
-
-                    for para_idx, para_text_html in enumerate(paragraphs_text):
-                        p = tf.add_paragraph()
-                        p.alignment = default_alignment
-                        if default_line_height_multiplier and isinstance(default_line_height_multiplier, (int, float)):
-                            try:
-                                p.line_spacing = float(default_line_height_multiplier)
-                            except ValueError:
-                                current_app.logger.warning(f"Invalid line height value: {default_line_height_multiplier}")
-                        
-                        if para_idx > 0 and default_paragraph_spacing_pt > 0:
-                             p.space_before = Pt(default_paragraph_spacing_pt)
-                        
-                        if is_bulleted and para_text_html.strip(): # Add bullet only if line has content
-                            p.level = 0
-
-                        # Parse HTML-like content (spans) for rich text
-                        # Replace &nbsp; with space for BeautifulSoup processing
-                        soup = BeautifulSoup(f"<div>{para_text_html.replace('&nbsp;', ' ')}</div>", "html.parser")
-                        
-                        if not soup.div.contents: # Handle paragraph that becomes empty after parsing (e.g. only &nbsp;)
-                            if is_bulleted: # If it was supposed to be a bullet, keep the paragraph for the bullet point
-                                pass # The paragraph is already added, bullet will show if level is set
-                            elif len(paragraphs_text) > 1 or para_text_html: # Preserve empty line if it's not a truly empty single-line textbox
-                                run = p.add_run()
-                                run.text = " " # Add a space to make the line take height
-                            continue # Next content_node or next paragraph
-
-                        for content_node in soup.div.contents:
-                            run = p.add_run()
-                            text_to_add = ""
-                            
-                            run_font_family = default_font_family
-                            run_font_size_pt = default_font_size_pt
-                            run_font_color_rgb = default_font_color_rgb
-                            run_bold = default_bold
-                            run_italic = default_italic
-                            run_underline = default_underline
-
-                            if content_node.name == 'span':
-                                text_to_add = content_node.get_text()
-                                span_style_str = content_node.get('style', '')
-                                span_styles = parse_span_style(span_style_str)
-                                if 'fontfamily' in span_styles: run_font_family = span_styles['fontfamily']
-                                if 'fontsize' in span_styles:
-                                    try: run_font_size_pt = float(str(span_styles['fontsize']).replace('pt','').replace('px',''))
-                                    except ValueError: pass
-                                if 'color' in span_styles: 
-                                    try: run_font_color_rgb = hex_to_rgb(span_styles['color'])
-                                    except: pass # Ignore invalid color
-                                if 'bold' in span_styles: run_bold = str(span_styles['bold']).lower() == 'true'
-                                if 'italic' in span_styles: run_italic = str(span_styles['italic']).lower() == 'true'
-                                if 'underline' in span_styles: run_underline = str(span_styles['underline']).lower() == 'true'
-                            
-                            elif content_node.name is None: # Plain text node
-                                text_to_add = str(content_node)
-                            
-                            if text_to_add:
-                                run.text = text_to_add
-                                # Try Lexend first with Arial fallback
-                                try:
-                                    run.font.name = run_font_family if run_font_family != "Lexend" else "Lexend"
-                                except:
-                                    run.font.name = "Arial"  # Fallback
-                                run.font.size = Pt(run_font_size_pt)
-                                if run_font_color_rgb: 
-                                    try:
-                                        run.font.color.rgb = RGBColor(*run_font_color_rgb)
-                                    except Exception as color_error:
-                                        current_app.logger.warning(f"Failed to set font color: {color_error}")
-                                run.font.bold = run_bold
-                                run.font.italic = run_italic
-                                run.font.underline = run_underline
-                        
-                        if not p.runs and not (is_bulleted and para_text_html.strip()): 
-                             if len(paragraphs_text) > 1 or para_text_html: 
-                                 run = p.add_run()
-                                 run.text = " " 
-
-                    if not tf.paragraphs: # Final check if textbox ended up with no paragraphs at all
-                        p = tf.add_paragraph()
-                        run = p.add_run()
-                        run.text = " " 
-                        run.font.size = Pt(1)
-                except Exception as e:
-                    tb_id_log = "Unknown Textbox"
-                    if isinstance(el_data, dict):
-                        tb_id_log = el_data.get('id', 'N/A')
-                    current_app.logger.error(f"Error processing textbox: {tb_id_log}. Error: {e}", exc_info=True)
-
-            elif el_type == "image":
-                try:
-                    img_src_base64 = el_data.get("src")
-                    if img_src_base64 and img_src_base64.startswith('data:image'):
-                        header, encoded = img_src_base64.split(',', 1)
-                        img_bytes = base64.b64decode(encoded)
-                        img_stream = BytesIO(img_bytes)
-
-                        img_x_px = float(el_data.get("x", 0))
-                        img_y_px = float(el_data.get("y", 0))
-                        img_width_px = float(el_data.get("width", 100))
-                        img_height_px = float(el_data.get("height", 100))
-                        if img_width_px <= 0 or img_height_px <= 0:
-                            current_app.logger.warning(f"Skipping image with zero/negative pixel dimensions: w={img_width_px}, h={img_height_px}")
-                            continue                       
-                        img_left = Inches(img_x_px * px_to_in_x)
-                        img_top = Inches(img_y_px * px_to_in_y)
-                        img_width = Inches(img_width_px * px_to_in_x)
-                        img_height = Inches(img_height_px * px_to_in_y)
-                        
-                        if img_width <= Inches(0) or img_height <= Inches(0):
-                            current_app.logger.warning(f"Skipping image with zero/negative inch dimensions after conversion: w_in={img_width}, h_in={img_height}")
-                            continue
-
-                        ppt_slide.shapes.add_picture(img_stream, img_left, img_top, width=img_width, height=img_height)
-                except Exception as e:
-                    img_id_log = "Unknown Image"
-                    if isinstance(el_data, dict):
-                        img_id_log = el_data.get('id', 'N/A')
-                    current_app.logger.error(f"Error processing image: {img_id_log}. Error: {e}", exc_info=True)
-
-    file_stream = BytesIO()
-    prs.save(file_stream)
-    file_stream.seek(0)
-
-    return send_file(
-        file_stream,
-        as_attachment=True,
-        download_name="smartslide_presentation.pptx", # Changed name slightly
-        mimetype="application/vnd.openxmlformats-officedocument.presentationml.presentation"
-    )
+def save_slides_patch(user_id, presentation_id, data, base_version):
+    """
+    Delta save for /api/save-slides-state: apply data["patch"] (per-slide operations,
+    see app.slide_store.apply_slide_patch) in a single transaction.
+    """
+    fields = {}
+    if data.get("templateId") or data.get("template"):
+        fields['template'] = data.get("templateId") or data.get("template")
+    if data.get("presentationType"):
+        fields['presentation_type'] = data["presentationType"]
+    presentation_ref = firestore_db.collection('presentations').document(str(presentation_id))
+    try:
+        # The patch applies on top of any autosave still buffered
+        base_version, autosave_error = flush_autosave(str(presentation_id), base_version)
+        version = patch_presentation(
+            firestore_db, user_id, presentation_ref, data["patch"], base_version, fields,
+            cover_fields=deck_cover_fields
+        )
+    except VersionConflict as e:
+        return jsonify({"error": "Presentation was changed elsewhere", "currentVersion": e.current_version}), 409
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if version is None:
+        return jsonify({"error": "Presentation not found"}), 404
+    record_saved_state(str(presentation_id), None, version)
+    response = {"message": "Presentation updated successfully", "presentationId": presentation_id, "version": version}
+    if autosave_error:
+        # A patch only carries its own changes; the client has to resend what the failed autosave lost
+        response["autosaveError"] = autosave_error
+    return jsonify(response), 200
+
+def prewarm_cover_thumbnail(slides_data, template_id, cover_key, user_id=None):
+    """Render a just-saved deck's cover thumbnail in the background, for the dashboard"""
+    if cover_key:
+        prewarm_thumbnail(
+            current_app._get_current_object(), cover_key, slides_data[0], template_id, "title",
+            db=firestore_db, user_id=user_id
+        )
+
+def prewarm_presentation_export(slides_data, template_id, user_id=None):
+    """Build the export of a just-saved deck in the background so its download is a cache hit"""
+    if isinstance(template_id, dict):
+        template_id = template_id.get("id") or template_id.get("templateId")
+    profile = resolve_export_profile()
+    key, build_document = presentation_artifact(slides_data, template_id, user_id, profile)
+    prewarm_artifact(current_app._get_current_object(), key, "pptx", build_document, profile.zip_level)
+
+def presentation_artifact(slides_data, template_id, user_id=None, profile=None):
+    """
+    Cache key and builder for a deck export, shared by downloads and pre-warming.
+
+    Args:
+        slides_data: Editor slides
+        template_id: Global template id
+        user_id: Owner, lets custom templates resolve without a lookup
+        profile: ExportProfile; defaults to EXPORT_DEFAULT_PROFILE
+
+    Returns:
+        Tuple of (artifact key, callable building the Presentation)
+    """
+    if profile is None:
+        profile = resolve_export_profile()
+    options = {
+        "vector_templates": current_app.config.get('EXPORT_VECTOR_TEMPLATES', True),
+        "image_dpi": profile.image_dpi,
+        "jpeg_quality": profile.jpeg_quality,
+        "recompress_backgrounds": profile.recompress_backgrounds,
+        "zip_level": profile.zip_level
+    }
+    render_workers = current_app.config.get('EXPORT_RENDER_WORKERS', 1)
+
+    def build_document():
+        return build_presentation(
+            slides_data, template_id, user_id=user_id, db=firestore_db,
+            use_vector_templates=options["vector_templates"],
+            image_dpi=options["image_dpi"],
+            image_quality=options["jpeg_quality"],
+            recompress_backgrounds=options["recompress_backgrounds"],
+            render_workers=render_workers
+        )
+
+    return artifact_key("pptx", slides_data, template_id, options), build_document
     
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def draw_template_slide_background(slide, template_def, slide_type="default", slide_width_inches=13.33, slide_height_inches=7.5):
-    try:
-        from pptx.util import Inches
-        slide_width = Inches(slide_width_inches)
-        slide_height = Inches(slide_height_inches)
-        template_id = template_def.get("id") or template_def.get("name", "").lower()
-
-        # --- BUSINESS TEMPLATE ---
-        if template_id == "tailwind-business":
-            img_path = os.path.join(
-                os.path.dirname(__file__),
-                "static", "template_backgrounds",
-                "tailwind-business_title.png" if slide_type == "title" else "tailwind-business_content.png"
-            )
-            if os.path.exists(img_path):
-                slide.shapes.add_picture(img_path, 0, 0, width=slide_width, height=slide_height)
-                return True        # --- CREATIVE TEMPLATE ---
-        elif template_id == "tailwind-creative":
-            img_path = os.path.join(
-                os.path.dirname(__file__),
-                "static", "template_backgrounds",
-                "tailwind-creative_title.png" if slide_type == "title" else "tailwind-creative_content.png"
-            )
-            if os.path.exists(img_path):
-                slide.shapes.add_picture(img_path, 0, 0, width=slide_width, height=slide_height)
-                return True
-
-        # --- EDUCATION TEMPLATE ---
-        elif template_id == "tailwind-education":
-            img_path = os.path.join(
-                os.path.dirname(__file__),
-                "static", "template_backgrounds",
-                "tailwind-education_title.png" if slide_type == "title" else "tailwind-education_content.png"
-            )
-            if os.path.exists(img_path):
-                slide.shapes.add_picture(img_path, 0, 0, width=slide_width, height=slide_height)
-                return True        # --- ABSTRACT GRADIENT TEMPLATE ---
-        elif template_id == "tailwind-abstract-gradient":
-            img_path = os.path.join(
-                os.path.dirname(__file__),
-                "static", "template_backgrounds",
-                "tailwind-abstract-gradient_title.png" if slide_type == "title" else "tailwind-abstract-gradient_content.png"
-            )
-            if os.path.exists(img_path):
-                slide.shapes.add_picture(img_path, 0, 0, width=slide_width, height=slide_height)
-                return True
-
-        # No fallback: only use image backgrounds for all templates
-        return False
-    except Exception as e:
-        current_app.logger.error(f"Error drawing template background: {e}")
-        return False
-
 # --- FIREBASE ANALYTICS ENDPOINT ---
 @main.route('/analytics/<user_id>', methods=['GET', 'OPTIONS'])
 def get_user_analytics(user_id):
     if request.method == 'OPTIONS':
         return jsonify({'status': 'ok'}), 200
 
-    # Get analytics document for the user
-    analytics_doc = firestore_db.collection('analytics').document(str(user_id)).get()
-    analytics_data = analytics_doc.to_dict() if analytics_doc.exists else {}
-
-    # Get presentations for user
-    presentations_ref = firestore_db.collection('presentations')
-    presentations = [doc.to_dict() for doc in presentations_ref.where('user_id', '==', user_id).stream()]
-
-    # Slides created over time (monthly)
-    from collections import Counter
-    monthly_slides_counter = Counter()
-    for p in presentations:
-        created_at = p.get('created_at')
-        if created_at:
-            # Firestore timestamp to ISO string, then to YYYY-MM
-            if hasattr(created_at, 'isoformat'):
-                month_year = created_at.isoformat()[:7]
-            else:
-                month_year = str(created_at)[:7]
-            monthly_slides_counter[month_year] += 1
-
-    # Most common topics (using presentation titles)
-    topic_counts_counter = Counter()
-    for p in presentations:
-        title = p.get('title')
-        if title:
-            topic_counts_counter[title.lower()] += 1
-
+    # Counters are kept up to date by every save and delete, so this is a single document read
+    analytics_data = user_analytics(firestore_db, user_id)
     slides_generated = analytics_data.get('slides_created', 0)
-    quizzes_generated = len(list(firestore_db.collection('saved_quizzes').where('user_id', '==', user_id).stream()))
-    scripts_generated = len(list(firestore_db.collection('saved_scripts').where('user_id', '==', user_id).stream()))
+    quizzes_generated = analytics_data.get('quizzes_generated', 0)
+    scripts_generated = analytics_data.get('scripts_generated', 0)
     last_active = analytics_data.get('last_generated_at')
     last_active_iso = last_active.isoformat() if last_active and hasattr(last_active, 'isoformat') else None
 
     return jsonify({
-        "monthly": dict(monthly_slides_counter),
-        "topics": dict(topic_counts_counter),
+        "monthly": positive_counts(analytics_data.get('monthly')),
+        "topics": positive_counts(analytics_data.get('topics')),
         "slides_generated": slides_generated,
         "quizzes_generated": quizzes_generated,
         "scripts_generated": scripts_generated,
@@ -2180,33 +1993,27 @@ def export_quiz_word():
         if not quiz:
             return jsonify({'error': 'No quiz data provided'}), 400
             
-        doc = Document()
-        doc.add_heading('Generated Quiz', 0)
-        
-        for idx, q in enumerate(quiz, 1):
-            question = q.get('question', '')
-            choices = q.get('choices', [])
-            answer = q.get('answer', '')
-            
-            doc.add_paragraph(f"{idx}. {question}", style='List Number')
-            
-            if choices:
-                for cidx, choice in enumerate(choices, 1):
-                    doc.add_paragraph(f"    {chr(64+cidx)}. {choice}")
+        def build_document():
+            doc = Document()
+            doc.add_heading('Generated Quiz', 0)
             
-            doc.add_paragraph(f"    Answer: {answer}")
-            doc.add_paragraph("")  # Add spacing
-        
-        f = BytesIO()
-        doc.save(f)
-        f.seek(0)
+            for idx, q in enumerate(quiz, 1):
+                question = q.get('question', '')
+                choices = q.get('choices', [])
+                answer = q.get('answer', '')
+                
+                doc.add_paragraph(f"{idx}. {question}", style='List Number')
+                
+                if choices:
+                    for cidx, choice in enumerate(choices, 1):
+                        doc.add_paragraph(f"    {chr(64+cidx)}. {choice}")
+                
+                doc.add_paragraph(f"    Answer: {answer}")
+                doc.add_paragraph("")  # Add spacing
+            return doc
         
-        return send_file(
-            f, 
-            as_attachment=True, 
-            download_name="generated_quiz.docx", 
-            mimetype="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-        )
+        key = artifact_key("quiz-docx", quiz)
+        return send_artifact(key, "docx", build_document, "generated_quiz.docx", DOCX_MIMETYPE)
         
     except Exception as e:
         current_app.logger.error(f"Error in export-quiz-word: {e}", exc_info=True)
@@ -2219,13 +2026,13 @@ def export_script_word():
     script = data.get('script')
     if not script:
         return jsonify({'error': 'No script data provided'}), 400
-    doc = Document()
-    doc.add_heading('Speaker Script', 0)
-    doc.add_paragraph(script)
-    f = BytesIO()
-    doc.save(f)
-    f.seek(0)
-    return send_file(f, as_attachment=True, download_name="script.docx", mimetype="application/vnd.openxmlformats-officedocument.wordprocessingml.document")
+    def build_document():
+        doc = Document()
+        doc.add_heading('Speaker Script', 0)
+        doc.add_paragraph(script)
+        return doc
+    key = artifact_key("script-docx", script)
+    return send_artifact(key, "docx", build_document, "script.docx", DOCX_MIMETYPE)
 
 @main.route('/export-quiz/<quiz_id>/word', methods=['GET', 'OPTIONS'])
 def export_quiz_by_id_word(quiz_id):
@@ -2244,21 +2051,21 @@ def export_quiz_by_id_word(quiz_id):
             pass
     if not quiz or not isinstance(quiz, list):
         return jsonify({'error': 'Quiz data missing or invalid'}), 400
-    doc = Document()
-    doc.add_heading('Quiz', 0)
-    for idx, q in enumerate(quiz, 1):
-        question = q.get('question', '')
-        choices = q.get('choices', [])
-        answer = q.get('answer', '')
-        doc.add_paragraph(f"{idx}. {question}", style='List Number')
-        if choices:
-            for cidx, choice in enumerate(choices, 1):
-                doc.add_paragraph(f"    {chr(64+cidx)}. {choice}")
-        doc.add_paragraph(f"    Answer: {answer}")
-    f = BytesIO()
-    doc.save(f)
-    f.seek(0)
-    return send_file(f, as_attachment=True, download_name=f"quiz_{quiz_id}.docx", mimetype="application/vnd.openxmlformats-officedocument.wordprocessingml.document")
+    def build_document():
+        doc = Document()
+        doc.add_heading('Quiz', 0)
+        for idx, q in enumerate(quiz, 1):
+            question = q.get('question', '')
+            choices = q.get('choices', [])
+            answer = q.get('answer', '')
+            doc.add_paragraph(f"{idx}. {question}", style='List Number')
+            if choices:
+                for cidx, choice in enumerate(choices, 1):
+                    doc.add_paragraph(f"    {chr(64+cidx)}. {choice}")
+            doc.add_paragraph(f"    Answer: {answer}")
+        return doc
+    key = artifact_key("saved-quiz-docx", quiz)
+    return send_artifact(key, "docx", build_document, f"quiz_{quiz_id}.docx", DOCX_MIMETYPE)
 
 @main.route('/export-script/<script_id>/word', methods=['GET', 'OPTIONS'])
 def export_script_by_id_word(script_id):
@@ -2274,13 +2081,13 @@ def export_script_by_id_word(script_id):
         script = script['content']
     if not script or not isinstance(script, str):
         return jsonify({'error': 'Script data missing or invalid'}), 400
-    doc = Document()
-    doc.add_heading('Speaker Script', 0)
-    doc.add_paragraph(script)
-    f = BytesIO()
-    doc.save(f)
-    f.seek(0)
-    return send_file(f, as_attachment=True, download_name=f"script_{script_id}.docx", mimetype="application/vnd.openxmlformats-officedocument.wordprocessingml.document")
+    def build_document():
+        doc = Document()
+        doc.add_heading('Speaker Script', 0)
+        doc.add_paragraph(script)
+        return doc
+    key = artifact_key("script-docx", script)
+    return send_artifact(key, "docx", build_document, f"script_{script_id}.docx", DOCX_MIMETYPE)
 
 # --- FORGOT PASSWORD ENDPOINTS ---
 @main.route('/forgot-password/send-verification', methods=['POST', 'OPTIONS'])
@@ -2628,6 +2435,7 @@ def upload_template():
             'file_size': file_size
         }
         template_ref.set(template_data)
+        register_custom_template(user_id, template_ref.id, template_data)
         
         return jsonify({
             'message': 'Template uploaded successfully',
@@ -2696,9 +2504,12 @@ def delete_template(template_id):
             file_path = os.path.join(current_app.root_path, 'static', 'custom_templates', filename)
             if os.path.exists(file_path):
                 os.remove(file_path)
+            forget_template_asset(filename)
         
         # Delete document from Firestore
         template_ref.delete()
+        forget_custom_template(template_id)
+        forget_base_decks(f"custom-{template_id}")
         
         return jsonify({'message': 'Template deleted successfully'}), 200
         
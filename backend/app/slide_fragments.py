@@ -0,0 +1,121 @@
+import hashlib
+import threading
+from collections import OrderedDict, namedtuple
+from functools import lru_cache
+from io import BytesIO
+from lxml import etree
+from pptx.opc.constants import RELATIONSHIP_TYPE as RT
+from pptx.oxml import parse_xml
+from pptx.oxml.ns import qn
+from app.artifact_cache import artifact_key
+
+# A rendered slide: its <p:sld> XML and the image each r:embed id in it points to
+SlideFragment = namedtuple("SlideFragment", ["xml", "images"])
+# One embedded picture of a fragment; part_key is the export's image_parts key for it
+FragmentImage = namedtuple("FragmentImage", ["rId", "part_key", "blob"])
+
+# Rendered slides keyed by slide_fragment_key, shared across exports
+_fragments = OrderedDict()
+_FRAGMENTS_MAX = 512
+_fragments_lock = threading.Lock()
+
+def slide_fragment_key(slide_item_data, template_id, slide_type, layout_index, options):
+    """
+    Content hash of everything that decides how one slide renders.
+
+    Args:
+        slide_item_data: Editor slide
+        template_id: Template applied to the slide
+        slide_type: "title" or "content"
+        layout_index: Index of the slide layout the slide is added from
+        options: Dict of export-wide settings and per-slide facts (DPI, image boxes, ...)
+
+    Returns:
+        Hex sha256 key
+    """
+    return artifact_key("slide", digest_image_sources(slide_item_data), template_id, dict(options, slide_type=slide_type, layout=layout_index))
+
+def digest_image_sources(slide_item_data):
+    """
+    Copy of a slide with each image src replaced by its sha1, for hashing.
+
+    JSON-encoding megabytes of base64 per slide would otherwise dominate any
+    content key built from the slide.
+    """
+    images = [
+        dict(img, src=_source_digest(img["src"])) if isinstance(img, dict) and isinstance(img.get("src"), str) else img
+        for img in slide_item_data.get("images", []) or []
+    ]
+    return dict(slide_item_data, images=images)
+
+@lru_cache(maxsize=256)
+def _source_digest(src):
+    return hashlib.sha1(src.encode("utf-8", "surrogatepass")).hexdigest()
+
+def cached_slide_fragment(key):
+    """Previously rendered fragment for `key`, or None"""
+    with _fragments_lock:
+        fragment = _fragments.get(key)
+        if fragment is not None:
+            _fragments.move_to_end(key)
+        return fragment
+
+def remember_slide_fragment(key, slide, image_parts):
+    """
+    Capture a fully rendered slide so later exports can reuse it.
+
+    Args:
+        key: slide_fragment_key() of the slide
+        slide: python-pptx slide after every shape was added
+        image_parts: The export's {key: image part} dict, used to name the slide's pictures
+
+    Returns:
+        The SlideFragment stored
+    """
+    keys_by_part = {id(part): part_key for part_key, part in image_parts.items()}
+    images = []
+    for blip in slide._element.xpath(".//a:blip[@r:embed]"):
+        rId = blip.get(qn("r:embed"))
+        part = slide.part.related_part(rId)
+        images.append(FragmentImage(rId, keys_by_part.get(id(part), part.sha1), part.blob))
+    fragment = SlideFragment(etree.tostring(slide._element), tuple(images))
+    with _fragments_lock:
+        _fragments[key] = fragment
+        _fragments.move_to_end(key)
+        if len(_fragments) > _FRAGMENTS_MAX:
+            _fragments.popitem(last=False)
+    return fragment
+
+def restore_slide_fragment(slide, fragment, image_parts):
+    """
+    Replace the content of a freshly added slide with a cached fragment.
+
+    The slide must have been added from the same layout the fragment was
+    rendered on. Image parts already in the package are related again instead
+    of being re-added, and r:embed ids are rewritten to the new relationships.
+
+    Args:
+        slide: python-pptx slide just returned by add_slide
+        fragment: SlideFragment to restore
+        image_parts: The export's {key: image part} dict, updated with parts added here
+    """
+    rIds = {}
+    for image in fragment.images:
+        if image.rId in rIds:
+            continue
+        part = image_parts.get(image.part_key)
+        if part is None:
+            part, rIds[image.rId] = slide.part.get_or_add_image_part(BytesIO(image.blob))
+            image_parts[image.part_key] = part
+        else:
+            rIds[image.rId] = slide.part.relate_to(part, RT.IMAGE)
+
+    cached = parse_xml(fragment.xml)
+    for blip in cached.xpath(".//a:blip[@r:embed]"):
+        blip.set(qn("r:embed"), rIds[blip.get(qn("r:embed"))])
+    sld = slide._element
+    for child in list(sld):
+        sld.remove(child)
+    sld.attrib.update(cached.attrib)
+    for child in list(cached):
+        sld.append(child)
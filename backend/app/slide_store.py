@@ -0,0 +1,186 @@
+import hashlib
+import json
+from app.slide_fragments import digest_image_sources
+
+# presentations/<id>/slides/<slide id> holds one slide each; the parent lists them in
+# order in 'slide_ids' and sets 'slide_storage' to SUBCOLLECTION_STORAGE. Presentations
+# without it still keep the whole deck in their 'slides' array.
+SLIDES_SUBCOLLECTION = 'slides'
+SUBCOLLECTION_STORAGE = 'subcollection'
+# Parent fields needed to find a presentation's slides in either layout (plus 'slides' for the old one)
+SLIDE_INDEX_FIELDS = ['slide_ids', 'slide_storage']
+
+def slide_id(slide_item_data):
+    """
+    Content hash naming a slide's document.
+
+    An edited slide gets a new document and unchanged slides keep theirs
+    wherever they move in the deck; identical slides share one.
+    """
+    payload = json.dumps(digest_image_sources(slide_item_data), sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha1(payload.encode("utf-8", "surrogatepass")).hexdigest()
+
+def can_store_slides(slides):
+    """Whether a deck fits the subcollection layout (every slide must be a map to become a document)"""
+    return isinstance(slides, list) and all(isinstance(slide, dict) for slide in slides)
+
+def uses_slide_subcollection(data):
+    return (data or {}).get('slide_storage') == SUBCOLLECTION_STORAGE
+
+def slide_ref(presentation_ref, slide_doc_id):
+    return presentation_ref.collection(SLIDES_SUBCOLLECTION).document(slide_doc_id)
+
+def stage_slide_order(writer, presentation_ref, slide_ids, slides_by_id, previous_ids):
+    """
+    Queue the writes that give a presentation the slide order `slide_ids`.
+
+    Args:
+        writer: Transaction or WriteBatch the writes are added to
+        presentation_ref: Presentation document reference
+        slide_ids: New order of slide document ids
+        slides_by_id: Content of every id in the order that may not be stored yet
+        previous_ids: The parent's current 'slide_ids' (None when nothing is stored)
+
+    Returns:
+        Fields to write to the parent document
+    """
+    previous = set(previous_ids or [])
+    for slide_doc_id, slide in slides_by_id.items():
+        if slide_doc_id not in previous:
+            writer.set(slide_ref(presentation_ref, slide_doc_id), slide)
+    for slide_doc_id in previous - set(slide_ids):
+        writer.delete(slide_ref(presentation_ref, slide_doc_id))
+    return {'slide_ids': slide_ids, 'slide_storage': SUBCOLLECTION_STORAGE}
+
+def stage_slide_writes(writer, presentation_ref, slides, previous_ids=None):
+    """
+    Queue the writes that make a presentation's subcollection hold `slides`.
+
+    Only slides not stored yet are written, and only documents no slide uses
+    any more are deleted; unchanged slides are not touched.
+
+    Args:
+        writer: Transaction or WriteBatch the writes are added to
+        presentation_ref: Presentation document reference
+        slides: The whole deck, in order
+        previous_ids: The parent's current 'slide_ids', if any
+
+    Returns:
+        Fields to write to the parent document
+    """
+    slides_by_id = {}
+    slide_ids = []
+    for slide in slides:
+        slide_doc_id = slide_id(slide)
+        slides_by_id.setdefault(slide_doc_id, slide)
+        slide_ids.append(slide_doc_id)
+    return stage_slide_order(writer, presentation_ref, slide_ids, slides_by_id, previous_ids)
+
+def stage_slide_updates(writer, presentation_ref, previous_ids, changes):
+    """
+    Queue the writes replacing some slides of a stored deck.
+
+    Args:
+        writer: Transaction or WriteBatch the writes are added to
+        presentation_ref: Presentation document reference
+        previous_ids: The parent's current 'slide_ids'
+        changes: Dict of slide index to its new content
+
+    Returns:
+        Fields to write to the parent document
+    """
+    slide_ids = list(previous_ids)
+    slides_by_id = {}
+    for index, slide in changes.items():
+        slide_ids[index] = slide_id(slide)
+        slides_by_id[slide_ids[index]] = slide
+    return stage_slide_order(writer, presentation_ref, slide_ids, slides_by_id, previous_ids)
+
+def apply_slide_patch(slide_ids, ops):
+    """
+    Apply per-slide patch operations to a deck's slide order.
+
+    Operations, applied in order, with indexes into the deck as it is at that point:
+        {"op": "upsert", "index": i, "slide": {...}}  replace slide i (i == length appends)
+        {"op": "insert", "index": i, "slide": {...}}  insert before slide i
+        {"op": "delete", "index": i}
+        {"op": "move", "from": i, "to": j}
+
+    Args:
+        slide_ids: Current order of slide document ids
+        ops: List of operations
+
+    Returns:
+        (new order of slide ids, {slide id: content} of the slides the patch added)
+
+    Raises:
+        ValueError: For an unknown operation, a missing slide or an index out of range
+    """
+    if not isinstance(ops, list):
+        raise ValueError("Slide patch must be a list of operations")
+    slide_ids = list(slide_ids)
+    added = {}
+
+    def index_of(op, name, extra=0):
+        index = op.get(name)
+        if not isinstance(index, int) or isinstance(index, bool) or not 0 <= index < len(slide_ids) + extra:
+            raise ValueError(f"Slide patch '{op.get('op')}' has an invalid {name}: {index!r}")
+        return index
+
+    for op in ops:
+        kind = op.get('op') if isinstance(op, dict) else None
+        if kind in ('upsert', 'insert'):
+            slide = op.get('slide')
+            if not isinstance(slide, dict):
+                raise ValueError(f"Slide patch '{kind}' needs a slide object")
+            index = index_of(op, 'index', extra=1)
+            slide_doc_id = slide_id(slide)
+            added[slide_doc_id] = slide
+            if kind == 'insert' or index == len(slide_ids):
+                slide_ids.insert(index, slide_doc_id)
+            else:
+                slide_ids[index] = slide_doc_id
+        elif kind == 'delete':
+            slide_ids.pop(index_of(op, 'index'))
+        elif kind == 'move':
+            source = index_of(op, 'from')
+            slide_ids.insert(index_of(op, 'to'), slide_ids.pop(source))
+        else:
+            raise ValueError(f"Unknown slide patch operation: {kind!r}")
+    kept = set(slide_ids)
+    return slide_ids, {slide_doc_id: slide for slide_doc_id, slide in added.items() if slide_doc_id in kept}
+
+def stage_slide_deletes(writer, presentation_ref, slide_ids):
+    """Queue deletes of every slide document of a presentation"""
+    for slide_doc_id in set(slide_ids or []):
+        writer.delete(slide_ref(presentation_ref, slide_doc_id))
+
+def load_slides(db, presentation_ref, data, indexes=None, transaction=None):
+    """
+    Read a presentation's slides in either layout, only fetching the ones asked for.
+
+    Args:
+        db: Firestore client
+        presentation_ref: Presentation document reference
+        data: Parent fields already read; at least SLIDE_INDEX_FIELDS. The old
+            layout's 'slides' is fetched when it was left out of a projection.
+        indexes: Optional slide positions to load instead of the whole deck
+        transaction: Optional transaction to read in
+
+    Returns:
+        List of slides, one per requested position (None when out of range)
+    """
+    data = data or {}
+    if not uses_slide_subcollection(data):
+        slides = data.get('slides')
+        if slides is None:
+            snapshot = presentation_ref.get(field_paths=['slides'], transaction=transaction)
+            slides = (snapshot.to_dict() or {}).get('slides') if snapshot.exists else None
+        slides = slides or []
+        return list(slides) if indexes is None else [slides[i] if 0 <= i < len(slides) else None for i in indexes]
+
+    slide_ids = data.get('slide_ids') or []
+    wanted = slide_ids if indexes is None else [slide_ids[i] if 0 <= i < len(slide_ids) else None for i in indexes]
+    refs = [slide_ref(presentation_ref, slide_doc_id) for slide_doc_id in dict.fromkeys(w for w in wanted if w)]
+    found = {snapshot.id: snapshot.to_dict() for snapshot in db.get_all(refs, transaction=transaction) if snapshot.exists} if refs else {}
+    return [found.get(slide_doc_id) if slide_doc_id else None for slide_doc_id in wanted]
@@ -0,0 +1,133 @@
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+from PIL import Image
+
+# Longest side of the downscaled copy the saliency map is computed on
+ANALYSIS_SIZE = 160
+# Images larger than this multiple of ANALYSIS_SIZE are point-sampled down first
+PRESAMPLE_FACTOR = 4
+# Block size and grey levels for the local entropy term
+ENTROPY_BLOCK = 8
+ENTROPY_LEVELS = 16
+# Weight of the mild centre prior that breaks ties on flat images
+CENTER_PRIOR_WEIGHT = 0.15
+
+# Crop boxes keyed by (image hash, rounded target ratio)
+_crop_box_cache = OrderedDict()
+_crop_box_cache_lock = threading.Lock()
+_CROP_BOX_CACHE_MAX = 1024
+
+def _normalize(values):
+    low, high = values.min(), values.max()
+    if high - low < 1e-9:
+        return np.zeros_like(values)
+    return (values - low) / (high - low)
+
+def saliency_map(gray):
+    """
+    Edge + local entropy saliency for a 2-D float array of grey levels in [0, 1].
+
+    Edges are the absolute forward differences along both axes; entropy is the
+    Shannon entropy of a quantized histogram over ENTROPY_BLOCK-sized blocks,
+    expanded back to pixel resolution. Both are normalized before being summed.
+    """
+    height, width = gray.shape
+    gx = np.abs(np.diff(gray, axis=1, append=gray[:, -1:]))
+    gy = np.abs(np.diff(gray, axis=0, append=gray[-1:, :]))
+    edges = _normalize(gx + gy)
+
+    b = ENTROPY_BLOCK
+    if height < b or width < b:
+        return edges
+    bh, bw = height // b, width // b
+    levels = np.minimum((gray[:bh * b, :bw * b] * ENTROPY_LEVELS).astype(np.intp), ENTROPY_LEVELS - 1)
+    blocks = levels.reshape(bh, b, bw, b).transpose(0, 2, 1, 3).reshape(bh, bw, b * b)
+    # Per-block histograms via offsets into one flat bincount
+    offsets = (np.arange(bh * bw) * ENTROPY_LEVELS).reshape(bh, bw, 1)
+    counts = np.bincount((blocks + offsets).ravel(), minlength=bh * bw * ENTROPY_LEVELS)
+    probs = counts.reshape(bh, bw, ENTROPY_LEVELS) / float(b * b)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        entropy = -np.nansum(np.where(probs > 0, probs * np.log2(probs), 0.0), axis=2)
+    entropy = np.repeat(np.repeat(entropy, b, axis=0), b, axis=1)
+    entropy = np.pad(entropy, ((0, height - entropy.shape[0]), (0, width - entropy.shape[1])), mode="edge")
+
+    yy = np.linspace(-1.0, 1.0, height)[:, None]
+    xx = np.linspace(-1.0, 1.0, width)[None, :]
+    center = 1.0 - np.sqrt(xx ** 2 + yy ** 2) / np.sqrt(2.0)
+
+    return edges + _normalize(entropy) + CENTER_PRIOR_WEIGHT * center
+
+def best_window(saliency, window_height, window_width):
+    """
+    Top-left corner of the window with the highest total saliency.
+
+    Window sums for every position come from one summed-area table, so the
+    search is a handful of vectorized slices instead of a Python loop.
+    """
+    table = np.zeros((saliency.shape[0] + 1, saliency.shape[1] + 1), dtype=np.float64)
+    table[1:, 1:] = saliency.cumsum(axis=0).cumsum(axis=1)
+    h, w = window_height, window_width
+    sums = table[h:, w:] - table[:-h, w:] - table[h:, :-w] + table[:-h, :-w]
+    top, left = np.unravel_index(np.argmax(sums), sums.shape)
+    return int(top), int(left)
+
+def smart_crop_box(image, target_ratio, image_bytes=None):
+    """
+    Crop box (left, top, right, bottom) matching `target_ratio` around the salient region.
+
+    Args:
+        image: PIL image
+        target_ratio: Target width / height
+        image_bytes: Encoded image, used as the cache key; falls back to the pixel data
+
+    Returns:
+        Box in the original image's pixel coordinates
+    """
+    digest = hashlib.sha1(image_bytes if image_bytes is not None else image.tobytes()).hexdigest()
+    cache_key = (digest, round(target_ratio, 4))
+    with _crop_box_cache_lock:
+        cached_box = _crop_box_cache.get(cache_key)
+        if cached_box is not None:
+            _crop_box_cache.move_to_end(cache_key)
+            return cached_box
+
+    img_width, img_height = image.size
+    if img_width / img_height > target_ratio:
+        crop_width, crop_height = int(img_height * target_ratio), img_height
+    else:
+        crop_width, crop_height = img_width, int(img_width / target_ratio)
+
+    if (crop_width, crop_height) == (img_width, img_height):
+        box = (0, 0, img_width, img_height)
+    else:
+        scale = ANALYSIS_SIZE / max(img_width, img_height)
+        small_size = (max(1, round(img_width * scale)), max(1, round(img_height * scale)))
+        source = image if image.mode in ("RGB", "L") else image.convert("RGB")
+        # Very large images are first point-sampled to an intermediate size; a full
+        # filtered pass over every source pixel would dominate the crop time
+        if max(img_width, img_height) > PRESAMPLE_FACTOR * ANALYSIS_SIZE:
+            presample_size = (small_size[0] * PRESAMPLE_FACTOR, small_size[1] * PRESAMPLE_FACTOR)
+            source = source.resize(presample_size, Image.Resampling.NEAREST)
+        small = source.resize(small_size, Image.Resampling.BOX).convert("L")
+        gray = np.asarray(small, dtype=np.float32) / 255.0
+
+        window_width = min(small_size[0], max(1, round(crop_width * scale)))
+        window_height = min(small_size[1], max(1, round(crop_height * scale)))
+        top, left = best_window(saliency_map(gray), window_height, window_width)
+
+        # Map back to full resolution and keep the exact crop size inside the image
+        left = min(int(round(left / scale)), img_width - crop_width)
+        top = min(int(round(top / scale)), img_height - crop_height)
+        box = (left, top, left + crop_width, top + crop_height)
+
+    with _crop_box_cache_lock:
+        _crop_box_cache[cache_key] = box
+        if len(_crop_box_cache) > _CROP_BOX_CACHE_MAX:
+            _crop_box_cache.popitem(last=False)
+    return box
+
+def smart_crop(image, target_ratio, image_bytes=None):
+    """Crop `image` to `target_ratio`, keeping the most salient region"""
+    return image.crop(smart_crop_box(image, target_ratio, image_bytes))
@@ -0,0 +1,116 @@
+import os
+import hashlib
+from collections import namedtuple
+from io import BytesIO
+from PIL import Image
+from pptx.opc.constants import RELATIONSHIP_TYPE as RT
+from pptx.shapes.shapetree import SlideShapes
+
+TEMPLATE_BACKGROUNDS_DIR = os.path.join(os.path.dirname(__file__), "static", "template_backgrounds")
+
+# A background image held in memory with everything add_picture would otherwise recompute
+TemplateAsset = namedtuple("TemplateAsset", ["name", "blob", "sha1", "px_size"])
+
+# python-pptx has no public way to place a picture on an image part the package already
+# holds. These two private SlideShapes methods are the only internals used; requirements.txt
+# pins python-pptx to the version they were written against, and any other version without
+# them falls back to add_picture.
+_PIC_FROM_IMAGE_PART = all(hasattr(SlideShapes, name) for name in ("_add_pic_from_image_part", "_shape_factory"))
+
+_assets = {}
+# Smaller copies made for low-quality export profiles, keyed by (name, sha1, max size, quality)
+_recompressed = {}
+
+def _load_asset(name, path):
+    with open(path, "rb") as f:
+        blob = f.read()
+    with Image.open(BytesIO(blob)) as im:
+        px_size = im.size
+    return TemplateAsset(name, blob, hashlib.sha1(blob).hexdigest(), px_size)
+
+def load_template_assets(directory=TEMPLATE_BACKGROUNDS_DIR):
+    """Read every template background into memory once; called at app startup."""
+    if not os.path.isdir(directory):
+        return _assets
+    for name in sorted(os.listdir(directory)):
+        if name.lower().endswith(".png"):
+            _assets[name] = _load_asset(name, os.path.join(directory, name))
+    return _assets
+
+def get_template_asset(name, directory=TEMPLATE_BACKGROUNDS_DIR):
+    """Return the registered asset for a background file name, loading it on first use."""
+    asset = _assets.get(name)
+    if asset is None:
+        path = os.path.join(directory, name)
+        if not os.path.exists(path):
+            return None
+        asset = _assets[name] = _load_asset(name, path)
+    return asset
+
+def forget_template_asset(name):
+    """Drop an asset from the registry, e.g. when its custom template is deleted."""
+    _assets.pop(name, None)
+    for key in [k for k in _recompressed if k[0] == name]:
+        del _recompressed[key]
+
+def recompress_template_asset(asset, max_px_size, quality):
+    """
+    A smaller copy of a background: at most `max_px_size`, re-encoded as JPEG when opaque.
+
+    Args:
+        asset: TemplateAsset to shrink
+        max_px_size: (width, height) the background never needs to exceed
+        quality: JPEG quality
+
+    Returns:
+        TemplateAsset, the original one when re-encoding would not make it smaller
+    """
+    key = (asset.name, asset.sha1, tuple(max_px_size), quality)
+    cached = _recompressed.get(key)
+    if cached is not None:
+        return cached
+    with Image.open(BytesIO(asset.blob)) as im:
+        im.draft("RGB", max_px_size)
+        working = im if im.mode in ("RGB", "RGBA", "L", "LA") else im.convert("RGBA")
+        if working.width > max_px_size[0] or working.height > max_px_size[1]:
+            working = working.resize(
+                (min(working.width, max_px_size[0]), min(working.height, max_px_size[1])),
+                Image.Resampling.BICUBIC, reducing_gap=2.0
+            )
+        output = BytesIO()
+        if working.mode in ("RGBA", "LA") and working.getchannel("A").getextrema()[0] < 255:
+            working.save(output, format="PNG", optimize=True)
+        else:
+            working.convert("RGB").save(output, format="JPEG", quality=quality, optimize=True)
+        blob = output.getvalue()
+        px_size = working.size
+    result = asset if len(blob) >= len(asset.blob) else TemplateAsset(asset.name, blob, hashlib.sha1(blob).hexdigest(), px_size)
+    _recompressed[key] = result
+    return result
+
+def add_asset_picture(slide, asset, left, top, width, height, image_parts):
+    """
+    Add a picture of `asset` to `slide`, inserting its image part once per package.
+
+    Args:
+        slide: python-pptx slide
+        asset: TemplateAsset to place
+        left, top, width, height: Picture geometry in EMU
+        image_parts: Dict shared across one export, mapping asset sha1 to its image part
+
+    Returns:
+        The picture shape
+    """
+    if not _PIC_FROM_IMAGE_PART:
+        # add_picture still finds the package's existing part by SHA1, just after re-hashing the blob
+        return slide.shapes.add_picture(BytesIO(asset.blob), left, top, width, height)
+
+    image_part = image_parts.get(asset.sha1)
+    if image_part is None:
+        image_part, rId = slide.part.get_or_add_image_part(BytesIO(asset.blob))
+        image_parts[asset.sha1] = image_part
+    else:
+        # Reuse the package's image part; skips re-reading and re-hashing the blob
+        rId = slide.part.relate_to(image_part, RT.IMAGE)
+    pic = slide.shapes._add_pic_from_image_part(image_part, rId, left, top, width, height)
+    return slide.shapes._shape_factory(pic)
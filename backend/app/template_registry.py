@@ -0,0 +1,201 @@
+import os
+import time
+import threading
+from app.template_assets import TEMPLATE_BACKGROUNDS_DIR, get_template_asset
+
+CUSTOM_TEMPLATES_DIR = os.path.join(os.path.dirname(__file__), "static", "custom_templates")
+CUSTOM_TEMPLATE_PREFIX = "custom-"
+# Seconds before a user's custom templates are fully reloaded (catches deletes made by other workers)
+CUSTOM_TEMPLATES_TTL = 600
+
+def _builtin(template_id, title_color, content_color, palette):
+    return {
+        "id": template_id,
+        "type": "builtin",
+        "background_dir": TEMPLATE_BACKGROUNDS_DIR,
+        "title_background": f"{template_id}_title.png",
+        "content_background": f"{template_id}_content.png",
+        "title_font": {"name": "Lexend", "color": title_color},
+        "content_font": {"name": "Lexend", "color": content_color},
+        # Gradient start, gradient end, accent, text on dark backgrounds
+        "palette": palette
+    }
+
+BUILTIN_TEMPLATES = {
+    "tailwind-business": _builtin("tailwind-business", "1E3A8A", "1F2937", ["1E3A8A", "3B82F6", "F59E0B", "FFFFFF"]),
+    "tailwind-education": _builtin("tailwind-education", "065F46", "1F2937", ["065F46", "34D399", "FBBF24", "FFFFFF"]),
+    "tailwind-creative": _builtin("tailwind-creative", "9D174D", "374151", ["9D174D", "F472B6", "FDE68A", "FFFFFF"]),
+    "tailwind-abstract-gradient": _builtin("tailwind-abstract-gradient", "4C1D95", "1F2937", ["4C1D95", "06B6D4", "F0ABFC", "FFFFFF"])
+}
+DEFAULT_PALETTE = ["334155", "94A3B8", "38BDF8", "FFFFFF"]
+
+# user_id -> {"templates": {template_id: definition}, "loaded_at": float, "last_created_at": timestamp}
+_custom_templates = {}
+# custom template id -> owning user_id, so exports without a user id still resolve in O(1)
+_custom_owners = {}
+# (user_id, custom template id) -> time a lookup found no such template; repeated lookups of
+# a deleted or foreign template skip Firestore until CUSTOM_TEMPLATES_TTL passes
+_custom_misses = {}
+MAX_CUSTOM_MISSES = 4096
+_lock = threading.Lock()
+
+def normalize_template_id(template):
+    """Template ids arrive as strings or as the editor's template object"""
+    if isinstance(template, dict):
+        template = template.get("id") or template.get("templateId")
+    return template if isinstance(template, str) and template else None
+
+def custom_template_definition(template_doc_id, data):
+    """Registry definition for a custom template document; one image serves both slide types"""
+    return {
+        "id": f"{CUSTOM_TEMPLATE_PREFIX}{template_doc_id}",
+        "type": "custom",
+        "user_id": data.get("user_id"),
+        "name": data.get("name"),
+        "background_dir": CUSTOM_TEMPLATES_DIR,
+        "title_background": data.get("filename"),
+        "content_background": data.get("filename"),
+        "title_font": {"name": "Lexend", "color": "000000"},
+        "content_font": {"name": "Lexend", "color": "000000"},
+        "palette": DEFAULT_PALETTE,
+        "created_at": data.get("created_at")
+    }
+
+def register_custom_template(user_id, template_doc_id, data):
+    """Add or replace a custom template in the cache, e.g. right after an upload"""
+    definition = custom_template_definition(template_doc_id, dict(data, user_id=user_id))
+    with _lock:
+        entry = _custom_templates.get(user_id)
+        if entry is not None:
+            entry["templates"][definition["id"]] = definition
+        _custom_owners[definition["id"]] = user_id
+        _forget_misses(definition["id"])
+
+def forget_custom_template(template_doc_id):
+    """Drop a deleted custom template from the cache"""
+    template_id = f"{CUSTOM_TEMPLATE_PREFIX}{template_doc_id}"
+    with _lock:
+        user_id = _custom_owners.pop(template_id, None)
+        entry = _custom_templates.get(user_id)
+        if entry is not None:
+            entry["templates"].pop(template_id, None)
+        _forget_misses(template_id)
+
+def _forget_misses(template_id):
+    # Called with _lock held
+    for key in [key for key in _custom_misses if key[1] == template_id]:
+        del _custom_misses[key]
+
+def _known_miss(user_id, template_id):
+    with _lock:
+        missed_at = _custom_misses.get((user_id, template_id))
+    return missed_at is not None and time.monotonic() - missed_at <= CUSTOM_TEMPLATES_TTL
+
+def _record_miss(user_id, template_id):
+    now = time.monotonic()
+    with _lock:
+        if len(_custom_misses) >= MAX_CUSTOM_MISSES:
+            for key in [key for key, missed_at in _custom_misses.items() if now - missed_at > CUSTOM_TEMPLATES_TTL]:
+                del _custom_misses[key]
+            if len(_custom_misses) >= MAX_CUSTOM_MISSES:
+                _custom_misses.clear()
+        _custom_misses[(user_id, template_id)] = now
+
+def refresh_custom_templates(db, user_id, full=False):
+    """
+    Load a user's custom templates from Firestore into the cache.
+
+    A full reload replaces the cached set; otherwise only templates created after
+    the newest cached one are fetched.
+    """
+    with _lock:
+        entry = _custom_templates.get(user_id)
+    query = db.collection('custom_templates').where('user_id', '==', user_id)
+    incremental = entry is not None and not full and entry.get("last_created_at") is not None
+    if incremental:
+        query = query.where('created_at', '>', entry["last_created_at"])
+
+    templates = dict(entry["templates"]) if incremental else {}
+    last_created_at = entry.get("last_created_at") if incremental else None
+    for doc in query.stream():
+        definition = custom_template_definition(doc.id, doc.to_dict())
+        templates[definition["id"]] = definition
+        created_at = definition.get("created_at")
+        if created_at is not None and (last_created_at is None or created_at > last_created_at):
+            last_created_at = created_at
+
+    with _lock:
+        _custom_templates[user_id] = {
+            "templates": templates,
+            "loaded_at": time.monotonic() if not incremental else entry["loaded_at"],
+            "last_created_at": last_created_at
+        }
+        for template_id in templates:
+            _custom_owners[template_id] = user_id
+    return templates
+
+def get_user_templates(db, user_id):
+    """All custom template definitions for a user, reloading once the cache expires"""
+    with _lock:
+        entry = _custom_templates.get(user_id)
+    if entry is None or time.monotonic() - entry["loaded_at"] > CUSTOM_TEMPLATES_TTL:
+        return refresh_custom_templates(db, user_id, full=True)
+    return entry["templates"]
+
+def lookup_template(template, db=None, user_id=None):
+    """
+    Resolve a template id (or editor template object) to its registry definition.
+
+    Built-in templates are a dict lookup. Custom templates ("custom-<doc id>") are
+    served from the per-user cache; an unknown id triggers one incremental refresh
+    for its owner (or a single document read if the owner is unknown). An id that
+    is still not found is remembered as missing for CUSTOM_TEMPLATES_TTL, so a deck
+    using a deleted template does not query Firestore again for every slide.
+
+    Returns:
+        Definition dict, or None if the template does not exist
+    """
+    template_id = normalize_template_id(template)
+    if not template_id:
+        return None
+    definition = BUILTIN_TEMPLATES.get(template_id)
+    if definition is not None or not template_id.startswith(CUSTOM_TEMPLATE_PREFIX):
+        return definition
+
+    if user_id is None:
+        user_id = _custom_owners.get(template_id)
+    if user_id is None and db is not None:
+        if _known_miss(None, template_id):
+            return None
+        doc = db.collection('custom_templates').document(template_id[len(CUSTOM_TEMPLATE_PREFIX):]).get()
+        if not doc.exists:
+            _record_miss(None, template_id)
+            return None
+        user_id = doc.to_dict().get('user_id')
+    if user_id is None or db is None:
+        with _lock:
+            entry = _custom_templates.get(user_id)
+        return entry["templates"].get(template_id) if entry else None
+
+    templates = get_user_templates(db, user_id)
+    if template_id not in templates:
+        if _known_miss(user_id, template_id):
+            return None
+        templates = refresh_custom_templates(db, user_id)
+        if template_id not in templates:
+            _record_miss(user_id, template_id)
+    return templates.get(template_id)
+
+def template_background(definition, slide_type):
+    """TemplateAsset for a definition's title or content background, or None"""
+    if not definition:
+        return None
+    name = definition["title_background"] if slide_type == "title" else definition["content_background"]
+    if not name:
+        return None
+    return get_template_asset(name, definition["background_dir"])
+
+def template_palette(template):
+    """Palette for a template id or definition, falling back to a neutral one"""
+    definition = template if isinstance(template, dict) and "palette" in template else BUILTIN_TEMPLATES.get(normalize_template_id(template))
+    return definition["palette"] if definition else DEFAULT_PALETTE
@@ -0,0 +1,217 @@
+import math
+from functools import lru_cache
+from PIL import ImageFont
+
+# Bump whenever a change here alters the font sizes picked for the same text
+TEXT_FIT_VERSION = "1"
+
+EMU_PER_POINT = 12700
+# Line box of a font relative to its size, close to PowerPoint's single spacing
+LINE_HEIGHT = 1.2
+# Fitted text is never shrunk below this size
+MIN_FONT_PT = 8
+# Glyphs are measured once at this size and scaled; large enough that hinting does not skew them
+REFERENCE_SIZE_PX = 256
+# Same 0.1in / 0.05in insets as the exported text frame
+INSET_X_EMU = 91440
+INSET_Y_EMU = 45720
+# Bundled with Pillow's usual system installs; the bitmap default font is the last resort
+FALLBACK_FONTS = {False: "DejaVuSans.ttf", True: "DejaVuSans-Bold.ttf"}
+
+@lru_cache(maxsize=64)
+def load_font(family, size_px, bold):
+    """Truetype font for a run, falling back to DejaVu Sans, then Pillow's default"""
+    for name in (f"{family}-Bold.ttf" if bold else None, f"{family}.ttf", FALLBACK_FONTS[bool(bold)]):
+        if not name:
+            continue
+        try:
+            return ImageFont.truetype(name, size_px)
+        except OSError:
+            continue
+    return ImageFont.load_default(size=size_px)
+
+class _Advances(dict):
+    """Glyph advances in points, measured the first time each character is looked up"""
+
+    def __init__(self, measure, scale):
+        super().__init__()
+        self._measure = measure
+        self._scale = scale
+
+    def __missing__(self, char):
+        advance = self[char] = self._measure(char) * self._scale
+        return advance
+
+@lru_cache(maxsize=32)
+def _unit_advances(family, bold):
+    # Advances of a 1pt font, shared by every size of the same font
+    return _Advances(load_font(family, REFERENCE_SIZE_PX, bold).getlength, 1 / REFERENCE_SIZE_PX)
+
+@lru_cache(maxsize=512)
+def advance_table(family, size_pt, bold):
+    """
+    Glyph advance table of one font at one size.
+
+    Returns:
+        Dict of character to advance width in points; missing characters are measured on lookup
+    """
+    return _Advances(_unit_advances(family or "Lexend", bool(bold)).__getitem__, size_pt)
+
+class _WordWidths(dict):
+    """Widths of whole words in points, summed from an advance table on first lookup"""
+    MAX_WORDS = 8192
+
+    def __init__(self, table):
+        super().__init__()
+        self._table = table
+
+    def __missing__(self, word):
+        if len(self) >= self.MAX_WORDS:
+            self.clear()
+        width = self[word] = sum(map(self._table.__getitem__, word))
+        return width
+
+@lru_cache(maxsize=512)
+def _word_widths(family, size_pt, bold):
+    return _WordWidths(advance_table(family, size_pt, bold))
+
+def text_width(text, family, size_pt, bold=False):
+    """Width of a single line of text in points, ignoring kerning"""
+    table = advance_table(family, size_pt, bold)
+    return sum(map(table.__getitem__, text))
+
+def _measure_paragraph(runs):
+    """(width, size) of each word-wrapping piece of a paragraph, trailing space included"""
+    pieces = []
+    for text, family, size_pt, bold in runs:
+        widths = _word_widths(family, size_pt, bool(bold))
+        words = text.split(" ")
+        last = len(words) - 1
+        for i, word in enumerate(words):
+            piece = word if i == last else word + " "
+            if piece:
+                pieces.append((widths[piece], size_pt))
+    return pieces
+
+def _lines_height(paragraphs, width_pt):
+    """Height of the wrapped lines of measured paragraphs, at their measured sizes"""
+    total = 0.0
+    for pieces, line_spacing, empty_size in paragraphs:
+        line_width = line_size = 0.0
+        for width, size in pieces:
+            if line_width and line_width + width > width_pt:
+                total += line_size * line_spacing
+                line_width = line_size = 0.0
+            if width > width_pt:
+                # A word longer than the line breaks across lines
+                overflow_lines = int(width // width_pt)
+                total += overflow_lines * size * line_spacing
+                width -= overflow_lines * width_pt
+            line_width += width
+            if size > line_size:
+                line_size = size
+        total += (line_size or empty_size) * line_spacing
+    return total * LINE_HEIGHT
+
+def fit_scale(paragraphs, width_pt, height_pt, max_size_pt, min_size_pt=MIN_FONT_PT, fixed_height_pt=0.0):
+    """
+    Largest factor fonts can be scaled by so wrapped text fits a box.
+
+    Scaling every font by s wraps like the unscaled text in a box s times
+    narrower, so the text is measured once and each candidate size only
+    re-runs the line breaking. Candidates step the largest font down a point
+    at a time, bisected.
+
+    Args:
+        paragraphs: List of (pieces from _measure_paragraph, line spacing, size of an empty line)
+        width_pt: Width available to the text
+        height_pt: Height available to the text
+        max_size_pt: Largest font size in the text
+        min_size_pt: Smallest size the largest font may be scaled to
+        fixed_height_pt: Height that does not scale with the fonts (paragraph spacing)
+
+    Returns:
+        Scale factor <= 1; 1 when the text already fits
+    """
+    if width_pt <= 0 or height_pt <= 0 or not max_size_pt:
+        return 1.0
+
+    def fits(scale):
+        return _lines_height(paragraphs, width_pt / scale) * scale + fixed_height_pt <= height_pt
+
+    if fits(1.0):
+        return 1.0
+    low, high = math.ceil(min(min_size_pt, max_size_pt)), math.floor(max_size_pt) - 1
+    if high < low or not fits(low / max_size_pt):
+        return min(1.0, low / max_size_pt)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if fits(middle / max_size_pt):
+            low = middle
+        else:
+            high = middle - 1
+    return low / max_size_pt
+
+def _scaled_size(size_pt, scale):
+    # Half points, rounded down so the fitted text never grows past the box
+    return max(1.0, math.floor(size_pt * scale * 2) / 2)
+
+def fit_textbox_plan(element, min_size_pt=MIN_FONT_PT):
+    """
+    Shrink the fonts of a compiled textbox plan until its text fits the box.
+
+    Relative sizes between runs are kept; text that fits is returned as is.
+
+    Args:
+        element: Textbox render plan from compile_slide_plan
+        min_size_pt: Smallest size the largest run may be shrunk to
+
+    Returns:
+        The plan, or a copy with smaller run sizes
+    """
+    width_pt = (element["geometry"][2] - 2 * INSET_X_EMU) / EMU_PER_POINT
+    height_pt = (element["geometry"][3] - 2 * INSET_Y_EMU) / EMU_PER_POINT
+    measured = []
+    fixed_height = 0.0
+    max_size = 0.0
+    for paragraph in element["paragraphs"]:
+        runs = [(text, font[0], font[1], font[3]) for text, font in paragraph["runs"] if font is not None and font[1]]
+        sizes = [size for _, _, size, _ in runs]
+        max_size = max([max_size] + sizes)
+        fixed_height += paragraph["space_before"] or 0.0
+        measured.append((_measure_paragraph(runs), paragraph["line_spacing"] or 1.0, sizes[-1] if sizes else max_size))
+
+    scale = fit_scale(measured, width_pt, height_pt, max_size, min_size_pt, fixed_height)
+    if scale >= 1.0:
+        return element
+    paragraphs = [
+        dict(paragraph, runs=[
+            (text, font if font is None or not font[1] else (font[0], _scaled_size(font[1], scale)) + tuple(font[2:]))
+            for text, font in paragraph["runs"]
+        ])
+        for paragraph in element["paragraphs"]
+    ]
+    return dict(element, paragraphs=paragraphs)
+
+def fit_font_size(lines, family, size_pt, width_emu, height_emu, bold=False, min_size_pt=MIN_FONT_PT):
+    """
+    Largest font size up to `size_pt` at which plain lines of text fit a box.
+
+    Args:
+        lines: One string per paragraph
+        family: Font family name
+        size_pt: Preferred font size
+        width_emu: Box width, insets included
+        height_emu: Box height, insets included
+        bold: Whether the text is bold
+        min_size_pt: Smallest size returned
+
+    Returns:
+        Font size in points
+    """
+    measured = [(_measure_paragraph([(str(line), family, size_pt, bold)]), 1.0, size_pt) for line in lines]
+    scale = fit_scale(
+        measured, (width_emu - 2 * INSET_X_EMU) / EMU_PER_POINT, (height_emu - 2 * INSET_Y_EMU) / EMU_PER_POINT,
+        size_pt, min_size_pt
+    )
+    return size_pt if scale >= 1.0 else _scaled_size(size_pt, scale)
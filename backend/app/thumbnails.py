@@ -0,0 +1,217 @@
+import base64
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from io import BytesIO
+from PIL import Image, ImageDraw, features
+from flask import current_app
+from pptx.enum.text import PP_ALIGN
+from app.artifact_cache import artifact_key, evict_artifacts, key_lock
+from app.pptx_export import (
+    EDITOR_SLIDE_HEIGHT_PX, EDITOR_SLIDE_WIDTH_PX, PPTX_SLIDE_HEIGHT_INCHES, PPTX_SLIDE_WIDTH_INCHES,
+    _key_image_sources, compile_slide_plan, hex_to_rgb
+)
+from app.slide_fragments import digest_image_sources
+from app.template_registry import lookup_template, normalize_template_id, template_background
+from app.text_fit import load_font
+
+# Bump whenever a change to the renderer alters its output for the same slide
+THUMBNAIL_RENDERER_VERSION = "2"
+DEFAULT_THUMBNAIL_WIDTH = 320
+DEFAULT_THUMBNAIL_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+EMU_PER_INCH = 914400
+POINTS_PER_INCH = 72
+BULLET = "• "
+
+# Background renders after saves; one thread keeps them off the request path without hogging a core
+_thumbnail_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="thumbnails")
+_render_locks = {}
+_render_locks_lock = threading.Lock()
+
+def thumbnail_format():
+    """WEBP when this Pillow build can write it, PNG otherwise"""
+    preferred = current_app.config.get('THUMBNAIL_FORMAT', 'WEBP').upper()
+    if preferred == "WEBP" and not features.check("webp"):
+        return "PNG"
+    return preferred
+
+def thumbnail_key(slide_item_data, template_id, slide_type, width=None):
+    """
+    Content hash naming a slide's thumbnail; a saved edit to the slide changes it.
+
+    Returns:
+        Hex sha256 key
+    """
+    width = width or current_app.config.get('THUMBNAIL_WIDTH', DEFAULT_THUMBNAIL_WIDTH)
+    return artifact_key("thumbnail", digest_image_sources(slide_item_data), normalize_template_id(template_id), {
+        "slide_type": slide_type, "width": width, "format": thumbnail_format(), "renderer": THUMBNAIL_RENDERER_VERSION
+    })
+
+@lru_cache(maxsize=32)
+def _scaled_background(blob, size):
+    with Image.open(BytesIO(blob)) as im:
+        im.draft("RGB", size)
+        return im.convert("RGB").resize(size, Image.Resampling.BILINEAR, reducing_gap=2.0)
+
+def _decode_image(src, size):
+    header, encoded = src.split(",", 1)
+    with Image.open(BytesIO(base64.b64decode(encoded))) as im:
+        im.draft("RGB", size)
+        # Pictures are stretched to their box in the export as well
+        return im.convert("RGBA").resize(size, Image.Resampling.BILINEAR, reducing_gap=2.0)
+
+def _box(geometry, scale):
+    left, top, width, height = (int(round(v * scale)) for v in geometry)
+    return left, top, max(1, width), max(1, height)
+
+def _layout_lines(paragraph, width_px, pt_to_px):
+    """Greedy word wrap of a paragraph's runs into lines of (text, font, fill, width) pieces"""
+    lines, line, line_width = [], [], 0.0
+    prefix = BULLET if paragraph["level"] is not None else ""
+    for text, font_spec in paragraph["runs"]:
+        family, size_pt, rgb, bold = (font_spec or (None, None, None, None))[:4]
+        font = load_font(family or "Lexend", max(4, int(round((size_pt or 16) * pt_to_px))), bool(bold))
+        fill = tuple(rgb) if rgb else (0, 0, 0)
+        words = (prefix + (text or "")).split(" ")
+        prefix = ""
+        for i, word in enumerate(words):
+            piece = word if i == len(words) - 1 else word + " "
+            if not piece:
+                continue
+            piece_width = font.getlength(piece)
+            if line and line_width + piece_width > width_px:
+                lines.append(line)
+                line, line_width = [], 0.0
+            line.append((piece, font, fill, piece_width))
+            line_width += piece_width
+    lines.append(line)
+    return lines
+
+def _draw_textbox(draw, element, scale, pt_to_px):
+    left, top, width, height = _box(element["geometry"], scale)
+    # Same 0.1in / 0.05in insets as the exported text frame
+    inset_x, inset_y = int(0.1 * EMU_PER_INCH * scale), int(0.05 * EMU_PER_INCH * scale)
+    y = top + inset_y
+    for paragraph in element["paragraphs"]:
+        spacing = paragraph["line_spacing"] or 1.0
+        if paragraph["space_before"]:
+            y += paragraph["space_before"] * pt_to_px
+        for line in _layout_lines(paragraph, width - 2 * inset_x, pt_to_px):
+            line_height = max((piece[1].size for piece in line), default=int(16 * pt_to_px)) * 1.2 * spacing
+            if y + line_height > top + height:
+                return
+            line_width = sum(piece[3] for piece in line)
+            x = left + inset_x
+            if paragraph["alignment"] == PP_ALIGN.CENTER:
+                x += (width - 2 * inset_x - line_width) / 2
+            elif paragraph["alignment"] == PP_ALIGN.RIGHT:
+                x += width - 2 * inset_x - line_width
+            for piece, font, fill, piece_width in line:
+                draw.text((x, y), piece, font=font, fill=fill)
+                x += piece_width
+            y += line_height
+
+def render_slide_thumbnail(slide_item_data, template_id, slide_type, width=None, db=None, user_id=None):
+    """
+    Draw a slide's template background, text and images into a small image.
+
+    Text is laid out from the same render plan the PPTX export uses, with
+    DejaVu Sans standing in for fonts the server does not have.
+
+    Args:
+        slide_item_data: Editor slide
+        template_id: Template of the slide (the slide's own templateId wins)
+        slide_type: "title" or "content"
+        width: Thumbnail width in pixels; height follows the 16:9 slide
+        db: Firestore client, to resolve custom templates
+        user_id: Owner of custom templates
+
+    Returns:
+        Encoded image bytes in thumbnail_format()
+    """
+    width = width or current_app.config.get('THUMBNAIL_WIDTH', DEFAULT_THUMBNAIL_WIDTH)
+    height = int(round(width * PPTX_SLIDE_HEIGHT_INCHES / PPTX_SLIDE_WIDTH_INCHES))
+    scale = width / (PPTX_SLIDE_WIDTH_INCHES * EMU_PER_INCH)
+    pt_to_px = width / (PPTX_SLIDE_WIDTH_INCHES * POINTS_PER_INCH)
+
+    slide_template_id = normalize_template_id(slide_item_data.get("templateId") or slide_item_data.get("template") or template_id)
+    asset = None
+    if slide_template_id:
+        try:
+            asset = template_background(lookup_template(slide_template_id, db=db, user_id=user_id), slide_type)
+        except Exception as e:
+            current_app.logger.error(f"Thumbnail background for template '{slide_template_id}' failed: {e}")
+    if asset:
+        image = _scaled_background(asset.blob, (width, height)).copy()
+    else:
+        fill = (slide_item_data.get("background") or {}).get("fill") or "#FFFFFF"
+        image = Image.new("RGB", (width, height), hex_to_rgb(fill))
+
+    keyed = _key_image_sources([slide_item_data])
+    sources = {key: src for src, key in keyed[1].items()}
+    plan = compile_slide_plan(keyed[0][0], PPTX_SLIDE_WIDTH_INCHES / EDITOR_SLIDE_WIDTH_PX, PPTX_SLIDE_HEIGHT_INCHES / EDITOR_SLIDE_HEIGHT_PX)
+    draw = ImageDraw.Draw(image)
+    for element in plan["elements"]:
+        try:
+            if element["type"] == "image":
+                left, top, box_width, box_height = _box(element["geometry"], scale)
+                picture = _decode_image(sources[element["image_key"]], (box_width, box_height))
+                image.paste(picture, (left, top), picture)
+            else:
+                _draw_textbox(draw, element, scale, pt_to_px)
+        except Exception as e:
+            current_app.logger.warning(f"Thumbnail skipped {element['type']} {element.get('id') or 'N/A'}: {e}")
+
+    output = BytesIO()
+    image_format = thumbnail_format()
+    image.save(output, format=image_format, **({"quality": 80, "method": 4} if image_format == "WEBP" else {"optimize": True}))
+    return output.getvalue()
+
+def _thumbnail_dir():
+    directory = current_app.config.get('THUMBNAIL_CACHE_DIR') or os.path.join(tempfile.gettempdir(), "smartslide-thumbnails")
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+def thumbnail_path(key):
+    return os.path.join(_thumbnail_dir(), f"{key}.{thumbnail_format().lower()}")
+
+def get_or_render_thumbnail(key, slide_item_data, template_id, slide_type, db=None, user_id=None):
+    """
+    Path of a slide's cached thumbnail, rendering it on a miss.
+
+    Returns:
+        Path to the thumbnail file
+    """
+    path = thumbnail_path(key)
+    with key_lock(key, _render_locks, _render_locks_lock):
+        if os.path.exists(path):
+            os.utime(path)
+            return path
+        data = render_slide_thumbnail(slide_item_data, template_id, slide_type, db=db, user_id=user_id)
+        handle, temp_path = tempfile.mkstemp(suffix=".partial", dir=os.path.dirname(path))
+        with os.fdopen(handle, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+    evict_artifacts(current_app.config.get('THUMBNAIL_CACHE_MAX_BYTES', DEFAULT_THUMBNAIL_CACHE_MAX_BYTES), _thumbnail_dir())
+    return path
+
+def slide_thumbnail_keys(slides, template_id):
+    """Thumbnail key of every slide of a deck, in order (slide 1 is the title slide); None for malformed slides"""
+    return [
+        thumbnail_key(slide, template_id, "title" if index == 0 else "content") if isinstance(slide, dict) else None
+        for index, slide in enumerate(slides or [])
+    ]
+
+def prewarm_thumbnail(app, key, slide_item_data, template_id, slide_type, db=None, user_id=None):
+    """Render a thumbnail in the background, e.g. a deck's cover right after it is saved"""
+    def run():
+        with app.app_context():
+            try:
+                get_or_render_thumbnail(key, slide_item_data, template_id, slide_type, db=db, user_id=user_id)
+            except Exception as e:
+                app.logger.error(f"Pre-rendering thumbnail {key[:12]} failed: {e}")
+
+    _thumbnail_executor.submit(run)
@@ -0,0 +1,207 @@
+import os
+import json
+from io import BytesIO
+from PIL import Image
+from app.template_registry import BUILTIN_TEMPLATES, template_background
+
+VECTOR_TEMPLATES_DIR = os.path.join(os.path.dirname(__file__), "static", "vector_templates")
+VECTOR_TEMPLATE_VERSION = 1
+SLIDE_TYPES = ("title", "content")
+SHAPE_TYPES = ("rectangle", "oval")
+
+# Vector template format, one JSON file per template id:
+# {
+#     "id": "tailwind-business",
+#     "version": 1,
+#     "slides": {"title": [shape, ...], "content": [shape, ...]}
+# }
+# Each shape is a draw_template_shape definition: "type" (rectangle/oval), geometry as
+# left/top/width/height "_ratio" of the slide (or "_in" in inches), "fill_color_hex",
+# "fill_transparency", "fill_style" ("none" for outlines), "line_style", "line_color_hex",
+# "line_width_pt", "rotation", and "comment": "content_box" plus "radius" for rounded boxes.
+# Shapes are drawn in list order, so the first one is usually the full-bleed background.
+
+# template id -> parsed vector definition
+_vector_templates = {}
+
+def validate_vector_template(data):
+    """
+    Check a parsed vector template and return it.
+
+    Raises:
+        ValueError: If the structure or a shape definition is invalid
+    """
+    if not isinstance(data, dict) or not data.get("id"):
+        raise ValueError("Vector template needs an id")
+    slides = data.get("slides")
+    if not isinstance(slides, dict) or not any(slides.get(t) for t in SLIDE_TYPES):
+        raise ValueError(f"Vector template '{data['id']}' has no title or content shapes")
+    for slide_type, shapes in slides.items():
+        if slide_type not in SLIDE_TYPES or not isinstance(shapes, list):
+            raise ValueError(f"Vector template '{data['id']}' has an invalid '{slide_type}' shape list")
+        for shape_def in shapes:
+            if not isinstance(shape_def, dict) or shape_def.get("type", "rectangle") not in SHAPE_TYPES:
+                raise ValueError(f"Vector template '{data['id']}' has an unsupported shape: {shape_def}")
+    return data
+
+def load_vector_templates(directory=VECTOR_TEMPLATES_DIR):
+    """Read every vector template into memory once; called at app startup."""
+    if not os.path.isdir(directory):
+        return _vector_templates
+    for name in sorted(os.listdir(directory)):
+        if name.lower().endswith(".json"):
+            with open(os.path.join(directory, name), "r", encoding="utf-8") as f:
+                data = validate_vector_template(json.load(f))
+            _vector_templates[data["id"]] = data
+    return _vector_templates
+
+def get_vector_template(template_id):
+    """Vector definition for a template id, or None if the template only has images"""
+    return _vector_templates.get(template_id)
+
+def vector_shapes(template_id, slide_type):
+    """Shape definitions of a template for a slide type, or None"""
+    data = get_vector_template(template_id)
+    if not data:
+        return None
+    return data["slides"].get("title" if slide_type == "title" else "content") or None
+
+# --- Converters for the PNG template looks ---------------------------------
+
+def _hex(rgb):
+    return "".join(f"{c:02X}" for c in rgb[:3])
+
+def _sampler(asset):
+    """Colour picker over a template background, sampling a smoothed copy at slide ratios"""
+    with Image.open(BytesIO(asset.blob)) as im:
+        small = im.convert("RGB").resize((64, 36), Image.Resampling.BOX)
+    def sample(x_ratio, y_ratio):
+        x = min(63, max(0, int(x_ratio * 64)))
+        y = min(35, max(0, int(y_ratio * 36)))
+        return _hex(small.getpixel((x, y)))
+    return sample
+
+def _rect(left, top, width, height, color, **extra):
+    shape = {"type": "rectangle", "left_ratio": left, "top_ratio": top, "width_ratio": width,
+             "height_ratio": height, "fill_color_hex": color, "line_style": "none"}
+    shape.update(extra)
+    return shape
+
+def _oval(left, top, width, height, color, **extra):
+    shape = _rect(left, top, width, height, color, **extra)
+    shape["type"] = "oval"
+    return shape
+
+def _box(left, top, width, height, color, radius=0.06, **extra):
+    return _rect(left, top, width, height, color, comment="content_box", radius=radius, **extra)
+
+def _business_look(title, content):
+    return {
+        "title": [
+            _rect(0, 0, 1, 1, title(0.6, 0.5)),
+            _rect(0.04, 0, 0.02, 1, title(0.05, 0.5)),
+            _rect(0.07, 0, 0.16, 1, title(0.15, 0.5)),
+            _rect(0.26, 0, 0.03, 1, title(0.275, 0.5)),
+            _oval(0.3, 0.2, 0.75, 0.5, "FFFFFF", fill_style="none", line_style="solid",
+                  line_color_hex="FFFFFF", line_width_pt=0.75, line_transparency=0.7, rotation=-12)
+        ],
+        "content": [
+            _rect(0, 0, 1, 1, content(0.5, 0.1)),
+            _rect(0.055, 0.22, 0.89, 0.67, content(0.5, 0.55))
+        ]
+    }
+
+def _education_look(title, content):
+    return {
+        "title": [
+            _rect(0, 0, 1, 1, title(0.75, 0.5)),
+            _rect(0.5, 0, 0.5, 1, title(0.95, 0.9), fill_transparency=0.4),
+            _oval(-0.3, -0.35, 0.77, 1.7, title(0.1, 0.5)),
+            _oval(0.77, 0.07, 0.07, 0.13, "FFFFFF", fill_transparency=0.5),
+            _oval(0.87, 0.02, 0.11, 0.2, "FFFFFF", fill_transparency=0.5),
+            _oval(0.86, 0.68, 0.08, 0.14, "FFFFFF", fill_transparency=0.5),
+            _oval(0.93, 0.85, 0.05, 0.09, "FFFFFF", fill_transparency=0.5)
+        ],
+        "content": [
+            _rect(0, 0, 1, 1, content(0.02, 0.1)),
+            _rect(0.5, 0, 0.5, 1, content(0.98, 0.9), fill_transparency=0.3),
+            _oval(0.07, -0.45, 0.86, 1.9, content(0.5, 0.5))
+        ]
+    }
+
+def _creative_look(title, content):
+    def framed(sample):
+        return [
+            _rect(0, 0, 1, 1, sample(0.005, 0.01)),
+            _box(0.025, 0.04, 0.95, 0.92, sample(0.5, 0.06), radius=0.05),
+            _box(0.075, 0.12, 0.85, 0.76, sample(0.5, 0.5), radius=0.05)
+        ]
+    return {
+        "title": framed(title) + [
+            _rect(0.75, 0.22, 0.03, 0.09, "FFFFFF", rotation=-30, line_style="solid",
+                  line_color_hex=title(0.5, 0.06), line_width_pt=0.75),
+            _rect(0.79, 0.27, 0.03, 0.09, "FFFFFF", rotation=-55, line_style="solid",
+                  line_color_hex=title(0.5, 0.06), line_width_pt=0.75),
+            _rect(0.19, 0.53, 0.03, 0.09, "FFFFFF", rotation=60, line_style="solid",
+                  line_color_hex=title(0.5, 0.06), line_width_pt=0.75)
+        ],
+        "content": framed(content)
+    }
+
+def _abstract_look(title, content):
+    return {
+        "title": [
+            _rect(0, 0, 1, 1, title(0.8, 0.5)),
+            _rect(0, 0, 0.59, 1, title(0.3, 0.5)),
+            _rect(0.05, -0.08, 0.22, 0.38, "FFFFFF", fill_transparency=0.6, rotation=45),
+            _rect(0.22, 0.05, 0.18, 0.3, "FFFFFF", fill_transparency=0.6, rotation=45),
+            _rect(-0.05, 0.28, 0.16, 0.28, "FFFFFF", fill_transparency=0.6, rotation=45),
+            _oval(0.76, 0.62, 0.36, 0.64, "FFFFFF", fill_style="none", line_style="solid",
+                  line_color_hex=title(0.3, 0.9), line_width_pt=1.5, line_transparency=0.3),
+            _oval(0.66, 0.78, 0.28, 0.5, "FFFFFF", fill_style="none", line_style="solid",
+                  line_color_hex=title(0.5, 0.5), line_width_pt=1.5, line_transparency=0.3)
+        ],
+        "content": [
+            _rect(0, 0, 1, 1, content(0.02, 0.5)),
+            _box(0.05, 0.075, 0.9, 0.85, content(0.5, 0.5), radius=0.07)
+        ]
+    }
+
+LOOK_CONVERTERS = {
+    "tailwind-business": _business_look,
+    "tailwind-education": _education_look,
+    "tailwind-creative": _creative_look,
+    "tailwind-abstract-gradient": _abstract_look
+}
+
+def convert_png_template(template_id):
+    """
+    Build a vector template approximating a built-in PNG template.
+
+    The layout of each look is fixed; its colours are sampled from the template's
+    title and content backgrounds so the vector version keeps the same palette.
+
+    Returns:
+        Vector template dict, or None if the template has no converter or images
+    """
+    converter = LOOK_CONVERTERS.get(template_id)
+    definition = BUILTIN_TEMPLATES.get(template_id)
+    title_asset = template_background(definition, "title")
+    content_asset = template_background(definition, "content")
+    if not converter or not title_asset or not content_asset:
+        return None
+    return validate_vector_template({
+        "id": template_id,
+        "version": VECTOR_TEMPLATE_VERSION,
+        "slides": converter(_sampler(title_asset), _sampler(content_asset))
+    })
+
+def write_vector_template(data, directory=VECTOR_TEMPLATES_DIR):
+    """Write a vector template to `<directory>/<id>.json` and return the path"""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{data['id']}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+        f.write("\n")
+    _vector_templates[data["id"]] = data
+    return path
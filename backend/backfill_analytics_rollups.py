@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Build the analytics rollups (monthly and topic counts, saved quiz and script
+counters, see app/analytics_rollups.py) of existing users, so their first
+visit to the analytics page is already a single document read.
+
+Each user is counted in its own transaction, so saves made meanwhile are
+never lost. Safe to re-run: users whose rollups exist are skipped unless
+--force is given.
+
+Usage (from the backend directory):
+    python backfill_analytics_rollups.py [--force] [<user_id> ...]
+"""
+
+import sys
+import firebase_admin
+from firebase_admin import credentials, firestore
+from app.analytics_rollups import ROLLUP_VERSION, build_rollups
+
+# Initialize Firebase (same as in routes.py)
+cred = credentials.Certificate("firebase_key.json")
+if not firebase_admin._apps:
+    firebase_admin.initialize_app(cred)
+firestore_db = firestore.client()
+
+def all_user_ids():
+    """Registered users plus any user that already has an analytics document"""
+    user_ids = {doc.id for doc in firestore_db.collection('users').select(['email']).stream()}
+    built = set()
+    for doc in firestore_db.collection('analytics').select(['rollup_version']).stream():
+        user_ids.add(doc.id)
+        if (doc.to_dict() or {}).get('rollup_version') == ROLLUP_VERSION:
+            built.add(doc.id)
+    return sorted(user_ids), built
+
+def backfill_rollups(user_ids=None, force=False):
+    print(f"Starting analytics rollup backfill{' (recounting all)' if force else ''}...")
+    if user_ids:
+        built = set()
+    else:
+        user_ids, built = all_user_ids()
+
+    counts = {'built': 0, 'skipped': 0, 'failed': 0}
+    for user_id in user_ids:
+        if user_id in built and not force:
+            counts['skipped'] += 1
+            continue
+        try:
+            data = build_rollups(firestore_db, user_id, force=force)
+        except Exception as e:
+            counts['failed'] += 1
+            print(f"Failed to build rollups of user {user_id}: {e}")
+            continue
+        counts['built'] += 1
+        print(
+            f"Built rollups of user {user_id}: {sum((data.get('monthly') or {}).values())} presentations, "
+            f"{data.get('quizzes_generated', 0)} quizzes, {data.get('scripts_generated', 0)} scripts"
+        )
+
+    print(f"Backfill completed! Built {counts['built']}, skipped {counts['skipped']}, failed {counts['failed']}.")
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    backfill_rollups([arg for arg in args if arg != "--force"], force="--force" in args)
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Benchmark editor image embedding at export: decoding every data URI as it is
+placed against decoding each distinct image once and sizing it for its box.
+
+Run from the backend directory:
+    python benchmarks/bench_export_images.py
+"""
+
+import os
+import sys
+import time
+import base64
+import statistics
+from io import BytesIO
+import numpy as np
+from flask import Flask
+from PIL import Image
+from pptx import Presentation
+from pptx.util import Inches
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from app import export_images
+from app.pptx_export import build_presentation
+
+SLIDE_COUNT = 20
+RUNS = 5
+
+def data_uri(image, image_format):
+    output = BytesIO()
+    image.save(output, format=image_format)
+    mime = "jpeg" if image_format == "JPEG" else image_format.lower()
+    return f"data:image/{mime};base64," + base64.b64encode(output.getvalue()).decode("ascii")
+
+def make_deck(slide_count):
+    """A 2000x1200 opaque PNG logo repeated on every slide plus one 3000x2000 photo per slide"""
+    rng = np.random.default_rng(0)
+    yy, xx = np.mgrid[:1200, :2000]
+    logo = np.stack([(xx // 8) % 256, (yy // 5) % 256, ((xx + yy) // 9) % 256], axis=2).astype(np.uint8)
+    logo_src = data_uri(Image.fromarray(logo, "RGB"), "PNG")
+    slides = []
+    for i in range(slide_count):
+        photo = (rng.random((200, 300, 3)) * 255).astype(np.uint8)
+        photo_image = Image.fromarray(photo, "RGB").resize((3000, 2000), Image.Resampling.BICUBIC)
+        slides.append({
+            "textboxes": [],
+            "images": [
+                {"id": "logo", "src": logo_src, "x": 1060, "y": 20, "width": 200, "height": 120},
+                {"id": f"photo-{i}", "src": data_uri(photo_image, "JPEG"), "x": 640, "y": 160, "width": 600, "height": 400}
+            ]
+        })
+    return slides
+
+def previous_export(slides):
+    """The previous image path: decode each data URI per use and embed it at full size"""
+    prs = Presentation()
+    prs.slide_width, prs.slide_height = Inches(13.33), Inches(7.5)
+    px_to_in_x, px_to_in_y = 13.33 / 1280, 7.5 / 720
+    for slide_data in slides:
+        slide = prs.slides.add_slide(prs.slide_layouts[6])
+        for img in slide_data["images"]:
+            header, encoded = img["src"].split(",", 1)
+            slide.shapes.add_picture(
+                BytesIO(base64.b64decode(encoded)),
+                Inches(img["x"] * px_to_in_x), Inches(img["y"] * px_to_in_y),
+                width=Inches(img["width"] * px_to_in_x), height=Inches(img["height"] * px_to_in_y)
+            )
+    return prs
+
+def measure(build, slides, clear_cache=False):
+    timings, size = [], 0
+    for _ in range(RUNS):
+        if clear_cache:
+            export_images._prepared.clear()
+        start = time.perf_counter()
+        output = BytesIO()
+        build(slides).save(output)
+        timings.append((time.perf_counter() - start) * 1000)
+        size = len(output.getvalue())
+    return timings, size
+
+def main():
+    slides = make_deck(SLIDE_COUNT)
+    rows = (
+        ("decode per use", *measure(previous_export, slides)),
+        ("dedup + downscale", *measure(lambda s: build_presentation(s, None), slides, clear_cache=True)),
+        ("prepared, cached", *measure(lambda s: build_presentation(s, None), slides))
+    )
+    print(f"{SLIDE_COUNT} slides, 1 shared logo + 1 photo each, {RUNS} runs")
+    print(f"{'path':>18} {'ms (mean)':>10} {'bytes':>10}")
+    for name, timings, size in rows:
+        print(f"{name:>18} {statistics.mean(timings):>10.1f} {size:>10}")
+
+if __name__ == "__main__":
+    with Flask("bench").app_context():
+        main()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Benchmark the draft, standard and print export profiles: output size and
+cold export time (build plus save) on an image-heavy deck with a picture
+template background and on a text-heavy deck.
+
+Run from the backend directory:
+    python benchmarks/bench_export_profiles.py
+"""
+
+import os
+import sys
+import time
+from io import BytesIO
+from flask import Flask
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, BACKEND_DIR)
+from app.export_profiles import EXPORT_PROFILES
+from app.export_streaming import save_package
+from app.pptx_export import build_presentation
+from app.template_assets import load_template_assets
+from export_suite import _clear_caches, make_deck
+
+SLIDE_COUNT = 20
+TEMPLATE_ID = "tailwind-business"
+RUNS = 3
+
+def export(slides, profile):
+    prs = build_presentation(
+        slides, TEMPLATE_ID, use_vector_templates=False,
+        image_dpi=profile.image_dpi, image_quality=profile.jpeg_quality,
+        recompress_backgrounds=profile.recompress_backgrounds
+    )
+    output = BytesIO()
+    save_package(prs, output, profile.zip_level)
+    return len(output.getvalue())
+
+def main():
+    load_template_assets()
+    decks = {"image": make_deck(SLIDE_COUNT, "image"), "text": make_deck(SLIDE_COUNT, "text")}
+    print(f"{SLIDE_COUNT} slides, picture background template '{TEMPLATE_ID}', caches cleared per run, {RUNS} runs")
+    print(f"{'deck':>6} {'profile':>9} {'dpi':>4} {'jpeg q':>6} {'zip':>5} {'KB':>8} {'ms (min)':>9}")
+    for deck_name, slides in decks.items():
+        for profile in EXPORT_PROFILES.values():
+            timings = []
+            for _ in range(RUNS):
+                _clear_caches()
+                start = time.perf_counter()
+                size = export(slides, profile)
+                timings.append((time.perf_counter() - start) * 1000)
+            zip_level = "dflt" if profile.zip_level is None else profile.zip_level
+            print(f"{deck_name:>6} {profile.name:>9} {profile.image_dpi:>4} {profile.jpeg_quality:>6} {zip_level:>5} "
+                  f"{size / 1024:>8.0f} {min(timings):>9.1f}")
+
+if __name__ == "__main__":
+    with Flask("bench", root_path=os.path.join(BACKEND_DIR, 'app')).app_context():
+        main()
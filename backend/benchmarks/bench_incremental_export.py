@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Benchmark re-exporting a 30-slide deck after editing one slide: rendering
+every slide again against reusing cached fragments for the unchanged ones.
+
+Run from the backend directory:
+    python benchmarks/bench_incremental_export.py
+"""
+
+import os
+import sys
+import copy
+import time
+import statistics
+from io import BytesIO
+from flask import Flask
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from app import slide_fragments
+from app.pptx_export import build_presentation
+from app.template_assets import load_template_assets
+from app.vector_templates import load_vector_templates
+from bench_parallel_export import make_deck
+
+SLIDE_COUNT = 30
+TEMPLATE_ID = "tailwind-business"
+RUNS = 10
+
+def export_ms(slides, fragment_cache):
+    start = time.perf_counter()
+    build_presentation(slides, TEMPLATE_ID, fragment_cache=fragment_cache).save(BytesIO())
+    return (time.perf_counter() - start) * 1000
+
+def main():
+    load_template_assets()
+    load_vector_templates()
+    slides = make_deck(SLIDE_COUNT)
+    # Cold export: prepares every image and fills the fragment cache
+    cold = export_ms(slides, True)
+
+    full, incremental = [], []
+    for run in range(RUNS):
+        edited = copy.deepcopy(slides)
+        edited[run % SLIDE_COUNT]["textboxes"][0]["text"] = f"Edited title {run}"
+        full.append(export_ms(edited, False))
+        slides = edited
+        incremental.append(export_ms(edited, True))
+
+    print(f"{SLIDE_COUNT} slides with a photo each, one slide edited per run, {RUNS} runs (images already prepared)")
+    print(f"{'path':>24} {'ms (mean)':>10}")
+    print(f"{'first export':>24} {cold:>10.1f}")
+    print(f"{'re-render every slide':>24} {statistics.mean(full):>10.1f}")
+    print(f"{'reuse fragments':>24} {statistics.mean(incremental):>10.1f}")
+    print(f"fragments cached: {len(slide_fragments._fragments)}")
+
+if __name__ == "__main__":
+    with Flask("bench", root_path=os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app')).app_context():
+        main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Benchmark two-phase export with the slide/image compile phase spread over
+1, 2 and 4 worker processes.
+
+Run from the backend directory:
+    python benchmarks/bench_parallel_export.py
+"""
+
+import os
+import sys
+import time
+import base64
+import statistics
+from io import BytesIO
+import numpy as np
+from flask import Flask
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from app import export_images, pptx_export
+
+SLIDE_COUNT = 48
+WORKER_COUNTS = (1, 2, 4)
+RUNS = 3
+
+def make_deck(slide_count):
+    """Text-heavy slides with one distinct 2400x1600 photo each"""
+    rng = np.random.default_rng(0)
+    slides = []
+    for i in range(slide_count):
+        photo = Image.fromarray((rng.random((160, 240, 3)) * 255).astype(np.uint8), "RGB")
+        output = BytesIO()
+        photo.resize((2400, 1600), Image.Resampling.BICUBIC).save(output, format="JPEG", quality=90)
+        body = "\\\\n".join(
+            f'Point {j} with <span style="color: #1E3A8A; bold: true">emphasis</span> and more supporting text'
+            for j in range(8)
+        )
+        slides.append({
+            "textboxes": [
+                {"id": "title", "text": f"Slide {i}", "x": 80, "y": 40, "width": 800, "height": 80, "fontSize": 32},
+                {"id": "body", "text": body, "x": 80, "y": 140, "width": 560, "height": 520, "fontSize": 16, "bullets": True}
+            ],
+            "images": [{
+                "id": f"photo-{i}", "x": 680, "y": 140, "width": 560, "height": 380,
+                "src": "data:image/jpeg;base64," + base64.b64encode(output.getvalue()).decode("ascii")
+            }]
+        })
+    return slides
+
+def main():
+    slides = make_deck(SLIDE_COUNT)
+    px_to_in_x = pptx_export.PPTX_SLIDE_WIDTH_INCHES / pptx_export.EDITOR_SLIDE_WIDTH_PX
+    px_to_in_y = pptx_export.PPTX_SLIDE_HEIGHT_INCHES / pptx_export.EDITOR_SLIDE_HEIGHT_PX
+
+    print(f"{SLIDE_COUNT} slides, {os.cpu_count()} CPUs, {RUNS} runs, image cache cleared before each run")
+    print(f"{'workers':>8} {'compile ms':>11} {'total ms':>9} {'speedup':>8}")
+    baseline = None
+    for workers in WORKER_COUNTS:
+        pptx_export._discard_render_pool()
+        if workers > 1:
+            pptx_export.start_render_pool(workers, "fork")
+        compile_times, total_times = [], []
+        for _ in range(RUNS):
+            export_images._prepared.clear()
+            start = time.perf_counter()
+            pptx_export.compile_render_plans(slides, px_to_in_x, px_to_in_y, workers=workers)
+            compile_times.append((time.perf_counter() - start) * 1000)
+
+            export_images._prepared.clear()
+            start = time.perf_counter()
+            pptx_export.build_presentation(slides, None, render_workers=workers).save(BytesIO())
+            total_times.append((time.perf_counter() - start) * 1000)
+        total = statistics.mean(total_times)
+        baseline = baseline or total
+        print(f"{workers:>8} {statistics.mean(compile_times):>11.1f} {total:>9.1f} {baseline / total:>7.2f}x")
+    pptx_export._discard_render_pool()
+
+if __name__ == "__main__":
+    with Flask("bench").app_context():
+        main()
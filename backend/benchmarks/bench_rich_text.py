@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmark the single-pass rich-text tokenizer against the BeautifulSoup path
+it replaced in textbox export.
+
+Run from the backend directory:
+    python benchmarks/bench_rich_text.py
+"""
+
+import os
+import sys
+import time
+import random
+import statistics
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from app import rich_text
+
+# Paragraphs per simulated text-heavy deck (30 slides x ~12 paragraphs)
+PARAGRAPHS = 360
+RUNS = 20
+
+STYLES = [
+    "font-size: 18; color: #1F2937",
+    "color: #1E3A8A; bold: true",
+    "font-family: Lexend; italic: true",
+    "underline: true; color: #ff0000",
+    "fontSize: 24pt; color: #065F46; bold: true"
+]
+WORDS = "market growth strategy learners outcome design data &amp; insight revenue team".split()
+
+def make_paragraphs(count, seed=0):
+    """Editor paragraphs mixing plain text, styled spans and entities"""
+    rng = random.Random(seed)
+    paragraphs = []
+    for _ in range(count):
+        parts = []
+        for _ in range(rng.randint(1, 4)):
+            text = " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 9)))
+            if rng.random() < 0.5:
+                parts.append(f'<span style="{rng.choice(STYLES)}">{text}</span>')
+            else:
+                parts.append(text + " ")
+        paragraphs.append("".join(parts).replace("&nbsp;", " "))
+    return paragraphs
+
+def soup_runs(paragraph):
+    """The previous export path: a BeautifulSoup tree plus a style parse per span"""
+    soup = BeautifulSoup(f"<div>{paragraph}</div>", "html.parser")
+    runs = []
+    for node in soup.div.contents:
+        if node.name == 'span':
+            runs.append((node.get_text(), rich_text.parse_span_style(node.get('style', ''))))
+        elif node.name is None:
+            runs.append((str(node), None))
+    return runs
+
+def time_ms(fn, paragraphs):
+    start = time.perf_counter()
+    for paragraph in paragraphs:
+        fn(paragraph)
+    return (time.perf_counter() - start) * 1000
+
+def cold_parse(paragraph):
+    rich_text.parse_runs.__wrapped__(paragraph)
+
+def main():
+    paragraphs = make_paragraphs(PARAGRAPHS)
+
+    # The tokenizer must agree with BeautifulSoup on every paragraph
+    mismatches = sum(
+        1 for p in paragraphs
+        if rich_text.parse_runs.__wrapped__(p) != rich_text._parse_runs_with_soup(p)
+    )
+
+    soup = [time_ms(soup_runs, paragraphs) for _ in range(RUNS)]
+    cold = []
+    for _ in range(RUNS):
+        rich_text.parse_run_style.cache_clear()
+        cold.append(time_ms(cold_parse, paragraphs))
+    time_ms(rich_text.parse_runs, paragraphs)
+    warm = [time_ms(rich_text.parse_runs, paragraphs) for _ in range(RUNS)]
+
+    print(f"{PARAGRAPHS} paragraphs, {RUNS} runs, mismatches vs BeautifulSoup: {mismatches}")
+    print(f"{'path':>24} {'ms (mean)':>10} {'p95':>8}")
+    for name, timings in (("BeautifulSoup", soup), ("tokenizer", cold), ("tokenizer, memoized", warm)):
+        p95 = sorted(timings)[int(len(timings) * 0.95) - 1]
+        print(f"{name:>24} {statistics.mean(timings):>10.2f} {p95:>8.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Benchmark the saliency-aware smart crop used when placing slide images.
+
+Run from the backend directory:
+    python benchmarks/bench_smart_crop.py
+"""
+
+import os
+import sys
+import time
+import statistics
+from io import BytesIO
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from app import smart_crop as smart_crop_module
+
+# (width, height) of the source images and the slide-half target ratio
+IMAGE_SIZES = [(1024, 576), (1920, 1080), (4000, 3000)]
+TARGET_RATIO = (13.33 / 2) / 7.5
+RUNS = 30
+
+def make_image(width, height, seed=0):
+    """Noisy background with a high-contrast subject away from the centre"""
+    rng = np.random.default_rng(seed)
+    pixels = (rng.random((height, width, 3)) * 40 + 100).astype(np.uint8)
+    cx, cy, r = int(width * 0.8), int(height * 0.4), min(width, height) // 6
+    yy, xx = np.ogrid[:height, :width]
+    subject = (xx - cx) ** 2 + (yy - cy) ** 2 < r ** 2
+    stripes = ((xx // 6 + yy // 6) % 2 == 0)
+    pixels[subject & stripes] = (250, 250, 250)
+    pixels[subject & ~stripes] = (10, 10, 10)
+    return Image.fromarray(pixels, "RGB"), (cx, cy)
+
+def time_ms(fn):
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) * 1000
+
+def main():
+    print(f"{'size':>12} {'uncached ms (mean)':>20} {'p95':>8} {'cached ms':>10}  subject kept")
+    for width, height in IMAGE_SIZES:
+        image, (cx, cy) = make_image(width, height)
+        # The export path keys the cache on the downloaded (encoded) image
+        encoded = BytesIO()
+        image.save(encoded, format="JPEG", quality=85)
+        image_bytes = encoded.getvalue()
+
+        uncached = []
+        for _ in range(RUNS):
+            smart_crop_module._crop_box_cache.clear()
+            uncached.append(time_ms(lambda: smart_crop_module.smart_crop_box(image, TARGET_RATIO, image_bytes)))
+        cached = [time_ms(lambda: smart_crop_module.smart_crop_box(image, TARGET_RATIO, image_bytes)) for _ in range(RUNS)]
+
+        left, top, right, bottom = smart_crop_module.smart_crop_box(image, TARGET_RATIO, image_bytes)
+        kept = left <= cx < right and top <= cy < bottom
+        p95 = sorted(uncached)[int(len(uncached) * 0.95) - 1]
+        print(f"{width:>5}x{height:<6} {statistics.mean(uncached):>20.2f} {p95:>8.2f} {statistics.mean(cached):>10.3f}  {kept}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Benchmark template backgrounds on slide layouts against a picture per slide,
+and vector templates against background images.
+
+Run from the backend directory:
+    python benchmarks/bench_template_layouts.py
+"""
+
+import os
+import sys
+import time
+import base64
+import statistics
+from io import BytesIO
+from flask import Flask
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from app import pptx_export
+from app.template_assets import load_template_assets
+from app.vector_templates import load_vector_templates
+
+TEMPLATE_ID = "tailwind-business"
+SLIDE_COUNT = 30
+RUNS = 20
+
+def make_deck(slide_count):
+    """Editor-format deck with a title, a bulleted body and a small logo per slide"""
+    logo = BytesIO()
+    Image.new("RGB", (300, 200), (200, 30, 30)).save(logo, format="PNG")
+    logo_src = "data:image/png;base64," + base64.b64encode(logo.getvalue()).decode("ascii")
+    slides = []
+    for i in range(slide_count):
+        slides.append({
+            "textboxes": [
+                {"id": "title", "text": f"Slide {i} title", "x": 80, "y": 60, "width": 800, "height": 80, "fontSize": 32},
+                {"id": "body", "text": "First point\\\\nSecond point\\\\nThird point", "x": 80, "y": 180,
+                 "width": 700, "height": 300, "fontSize": 18, "bullets": True}
+            ],
+            "images": [{"id": "logo", "src": logo_src, "x": 1000, "y": 500, "width": 200, "height": 130}]
+        })
+    return slides
+
+def export(slides, use_vector_templates):
+    output = BytesIO()
+    pptx_export.build_presentation(slides, TEMPLATE_ID, use_vector_templates=use_vector_templates).save(output)
+    return output.getvalue()
+
+def measure(slides, use_vector_templates=False):
+    # Warm-up export builds the cached base deck, which later exports reuse
+    export(slides, use_vector_templates)
+    timings, size = [], 0
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        size = len(export(slides, use_vector_templates))
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings, size
+
+def main():
+    load_template_assets()
+    load_vector_templates()
+    slides = make_deck(SLIDE_COUNT)
+    build_base_deck = pptx_export.build_base_deck
+
+    # Previous behaviour: no base deck, every slide gets its own full-bleed picture
+    pptx_export.build_base_deck = lambda definition, *args, **kwargs: None
+    picture_timings, picture_size = measure(slides)
+    pptx_export.build_base_deck = build_base_deck
+
+    layout_timings, layout_size = measure(slides)
+    vector_timings, vector_size = measure(slides, use_vector_templates=True)
+
+    print(f"{SLIDE_COUNT}-slide deck, template '{TEMPLATE_ID}', {RUNS} runs")
+    print(f"{'mode':>18} {'ms (mean)':>10} {'p95':>8} {'bytes':>10}")
+    for mode, timings, size in (("picture per slide", picture_timings, picture_size),
+                                ("layout background", layout_timings, layout_size),
+                                ("vector layout", vector_timings, vector_size)):
+        p95 = sorted(timings)[int(len(timings) * 0.95) - 1]
+        print(f"{mode:>18} {statistics.mean(timings):>10.1f} {p95:>8.1f} {size:>10}")
+
+if __name__ == "__main__":
+    with Flask("bench").app_context():
+        main()
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Export benchmark suite: synthetic editor decks of 1, 10, 30 and 100 slides in
+text-heavy, image-heavy and span-heavy variants, exported in-process with
+every built-in template (and none).
+
+Each case records wall time, per-phase timings (background, textboxes,
+images, fragments, save), tracemalloc peak, the process RSS high-water mark
+and output size. Results go to a JSON file; with --baseline, cases that got
+slower, hungrier or larger than the thresholds are reported as regressions
+and the script exits with status 1.
+
+Run from the backend directory:
+    python benchmarks/export_suite.py
+    python benchmarks/export_suite.py --quick --output results.json
+    python benchmarks/export_suite.py --baseline results.json
+"""
+
+import os
+import sys
+import json
+import time
+import base64
+import random
+import argparse
+import platform
+import resource
+import statistics
+import tracemalloc
+from datetime import datetime, timezone
+from io import BytesIO
+import numpy as np
+from flask import Flask
+from PIL import Image
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, BACKEND_DIR)
+from app import export_images, rich_text, slide_fragments
+from app.pptx_export import build_presentation
+from app.template_assets import load_template_assets
+from app.template_registry import BUILTIN_TEMPLATES
+from app.vector_templates import load_vector_templates
+
+SLIDE_COUNTS = (1, 10, 30, 100)
+VARIANTS = ("text", "image", "span")
+TEMPLATES = (None,) + tuple(BUILTIN_TEMPLATES)
+QUICK_SLIDE_COUNTS = (1, 10)
+QUICK_TEMPLATES = (None, "tailwind-business")
+
+# Relative growth over the baseline that counts as a regression; time uses the
+# fastest run, which is far less sensitive to a busy machine than the mean
+THRESHOLDS = {
+    "wall_ms_min": 0.25,
+    "tracemalloc_peak_bytes": 0.25,
+    "output_bytes": 0.05
+}
+# Cases faster than this are too noisy to compare on time
+MIN_COMPARABLE_MS = 20
+
+WORDS = "market growth strategy learners outcome design data insight revenue team roadmap launch".split()
+SPAN_STYLES = (
+    "color: #1E3A8A; bold: true",
+    "font-family: Lexend; italic: true",
+    "underline: true; color: #ff0000",
+    "fontSize: 24pt; color: #065F46; bold: true",
+    "font-size: 14; color: #6B7280"
+)
+
+def _sentence(rng, low=6, high=14):
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(low, high)))
+
+def _photo_uri(rng, width, height):
+    noise = (rng.random((height // 10, width // 10, 3)) * 255).astype(np.uint8)
+    output = BytesIO()
+    Image.fromarray(noise, "RGB").resize((width, height), Image.Resampling.BICUBIC).save(output, format="JPEG", quality=88)
+    return "data:image/jpeg;base64," + base64.b64encode(output.getvalue()).decode("ascii")
+
+def _title(index, rng):
+    return {"id": "title", "type": "title", "text": f"Slide {index + 1}: {_sentence(rng, 2, 5)}",
+            "x": 80, "y": 40, "width": 1120, "height": 90, "fontSize": 36, "color": "#1F2937"}
+
+def make_deck(slide_count, variant, seed=0):
+    """
+    Synthetic editor-format deck.
+
+    Args:
+        slide_count: Number of slides
+        variant: "text" (long bullet lists), "image" (three photos per slide, one shared logo)
+            or "span" (paragraphs made of many styled spans)
+        seed: Random seed, so every run exports the same content
+
+    Returns:
+        List of editor slide dicts
+    """
+    rng = random.Random(seed)
+    np_rng = np.random.default_rng(seed)
+    logo = _photo_uri(np_rng, 600, 300) if variant == "image" else None
+    slides = []
+    for index in range(slide_count):
+        textboxes = [_title(index, rng)]
+        images = []
+        if variant == "text":
+            for column in range(2):
+                body = "\\\\n".join(_sentence(rng) for _ in range(10))
+                textboxes.append({"id": f"body-{column}", "text": body, "x": 80 + column * 580, "y": 150,
+                                  "width": 540, "height": 520, "fontSize": 16, "bullets": True})
+        elif variant == "span":
+            paragraphs = []
+            for _ in range(8):
+                parts = [f'<span style="{rng.choice(SPAN_STYLES)}">{_sentence(rng, 2, 5)}</span> ' for _ in range(6)]
+                paragraphs.append("".join(parts))
+            textboxes.append({"id": "body", "text": "\\\\n".join(paragraphs), "x": 80, "y": 150,
+                              "width": 1120, "height": 520, "fontSize": 16})
+        else:
+            textboxes.append({"id": "caption", "text": _sentence(rng), "x": 80, "y": 620,
+                              "width": 1120, "height": 60, "fontSize": 14})
+            for column in range(3):
+                images.append({"id": f"photo-{column}", "src": _photo_uri(np_rng, 1800, 1200),
+                               "x": 80 + column * 380, "y": 160, "width": 360, "height": 420})
+            images.append({"id": "logo", "src": logo, "x": 1120, "y": 20, "width": 120, "height": 60})
+        slides.append({"textboxes": textboxes, "images": images, "background": {"fill": "#FFFFFF"}})
+    return slides
+
+def _clear_caches():
+    """Forget prepared images, parsed runs and rendered slides so each run exports cold"""
+    export_images._prepared.clear()
+    rich_text.parse_runs.cache_clear()
+    rich_text.parse_run_style.cache_clear()
+    slide_fragments._fragments.clear()
+
+def _export(slides, template_id, timings):
+    prs = build_presentation(slides, template_id, timings=timings)
+    started = time.perf_counter()
+    output = BytesIO()
+    prs.save(output)
+    timings["save"] = time.perf_counter() - started
+    return len(output.getvalue())
+
+def run_case(slides, template_id, runs, warm=False):
+    """
+    Export one deck `runs` times and summarize.
+
+    Returns:
+        Dict of wall_ms (mean), wall_ms_min, phases_ms (mean per phase),
+        tracemalloc_peak_bytes, rss_high_water_kb and output_bytes
+    """
+    walls = []
+    phases = {}
+    output_bytes = 0
+    for _ in range(runs):
+        if not warm:
+            _clear_caches()
+        timings = {}
+        started = time.perf_counter()
+        output_bytes = _export(slides, template_id, timings)
+        walls.append((time.perf_counter() - started) * 1000)
+        for phase, seconds in timings.items():
+            phases.setdefault(phase, []).append(seconds * 1000)
+
+    # A separate traced run: tracemalloc slows allocation-heavy code too much to time it
+    if not warm:
+        _clear_caches()
+    tracemalloc.start()
+    _export(slides, template_id, {})
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        "wall_ms": round(statistics.mean(walls), 2),
+        "wall_ms_min": round(min(walls), 2),
+        "phases_ms": {phase: round(statistics.mean(values), 2) for phase, values in sorted(phases.items())},
+        "tracemalloc_peak_bytes": peak,
+        # Process-wide high-water mark (KB on Linux); only ever grows across cases
+        "rss_high_water_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "output_bytes": output_bytes
+    }
+
+def case_name(slide_count, variant, template_id):
+    return f"{slide_count}-{variant}-{template_id or 'none'}"
+
+def compare(results, baseline):
+    """
+    Regressions of `results` against a baseline results file.
+
+    Returns:
+        List of {"case", "metric", "baseline", "current", "growth"} dicts
+    """
+    previous = {case["name"]: case for case in baseline.get("cases", [])}
+    regressions = []
+    for case in results["cases"]:
+        before = previous.get(case["name"])
+        if not before:
+            continue
+        for metric, allowed in THRESHOLDS.items():
+            old, new = before.get(metric), case.get(metric)
+            if not old or new is None:
+                continue
+            if metric == "wall_ms_min" and max(old, new) < MIN_COMPARABLE_MS:
+                continue
+            growth = (new - old) / old
+            if growth > allowed:
+                regressions.append({"case": case["name"], "metric": metric, "baseline": old, "current": new, "growth": round(growth, 3)})
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark presentation export on synthetic decks")
+    parser.add_argument("--quick", action="store_true", help="1 and 10 slides, no template and tailwind-business only")
+    parser.add_argument("--runs", type=int, default=3, help="Timed exports per case (default 3)")
+    parser.add_argument("--warm", action="store_true", help="Keep image, text and slide caches between runs")
+    parser.add_argument("--output", default="export_benchmark_results.json", help="Results file to write")
+    parser.add_argument("--baseline", help="Earlier results file to check for regressions")
+    args = parser.parse_args()
+
+    load_template_assets()
+    load_vector_templates()
+
+    slide_counts = QUICK_SLIDE_COUNTS if args.quick else SLIDE_COUNTS
+    templates = QUICK_TEMPLATES if args.quick else TEMPLATES
+    results = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "environment": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+        "settings": {"runs": args.runs, "warm": args.warm, "thresholds": THRESHOLDS},
+        "cases": []
+    }
+
+    print(f"{'case':>36} {'wall ms':>9} {'peak MB':>8} {'KB out':>8}  phases (ms)")
+    for slide_count in slide_counts:
+        for variant in VARIANTS:
+            slides = make_deck(slide_count, variant)
+            for template_id in templates:
+                name = case_name(slide_count, variant, template_id)
+                case = dict(run_case(slides, template_id, args.runs, args.warm),
+                            name=name, slides=slide_count, variant=variant, template=template_id)
+                results["cases"].append(case)
+                phases = " ".join(f"{phase}={ms:.0f}" for phase, ms in case["phases_ms"].items())
+                print(f"{name:>36} {case['wall_ms']:>9.1f} {case['tracemalloc_peak_bytes'] / 1e6:>8.1f} "
+                      f"{case['output_bytes'] / 1024:>8.0f}  {phases}")
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f))
+        results["baseline"] = args.baseline
+        results["regressions"] = regressions
+        for r in regressions:
+            print(f"REGRESSION {r['case']}: {r['metric']} {r['baseline']} -> {r['current']} (+{r['growth']:.0%})")
+        print(f"{len(regressions)} regressions against {args.baseline}")
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Wrote {args.output}")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    with Flask("bench", root_path=os.path.join(BACKEND_DIR, 'app')).app_context():
+        sys.exit(main())
@@ -7,4 +7,41 @@ class Config:
     # Other configurations
     GROQ_API_KEY = os.environ.get('GROQ_API_KEY')
     #EMAIL_ADDRESS = os.environ.get('EMAIL_ADDRESS')
-    #EMAIL_PASSWORD = os.environ.get('EMAIL_PASSWORD')
\ No newline at end of file
+    #EMAIL_PASSWORD = os.environ.get('EMAIL_PASSWORD')
+
+    # Image generation budgets
+    IMAGE_BUDGET_PER_DECK = int(os.environ.get('IMAGE_BUDGET_PER_DECK', '6'))
+    IMAGE_BUDGET_PER_USER_DAILY = int(os.environ.get('IMAGE_BUDGET_PER_USER_DAILY', '60'))
+
+    # Seconds to wait for a remote slide image before using a local placeholder
+    IMAGE_DEADLINE_SECONDS = float(os.environ.get('IMAGE_DEADLINE_SECONDS', '8'))
+    # Swap placeholders for the remote image once it arrives
+    IMAGE_PLACEHOLDER_UPGRADE = os.environ.get('IMAGE_PLACEHOLDER_UPGRADE', 'True').lower() == 'true'
+
+    # Export templates that have a vector version as shapes instead of background images
+    EXPORT_VECTOR_TEMPLATES = os.environ.get('EXPORT_VECTOR_TEMPLATES', 'True').lower() == 'true'
+    # Resolution editor images are downscaled to when exported
+    EXPORT_IMAGE_DPI = int(os.environ.get('EXPORT_IMAGE_DPI', '150'))
+    # Worker processes that compile slides and prepare images for large exports (1 = in-process)
+    EXPORT_RENDER_WORKERS = int(os.environ.get('EXPORT_RENDER_WORKERS', str(min(4, os.cpu_count() or 1))))
+    # Exported files larger than this are spooled to a temp file instead of memory
+    EXPORT_SPOOL_MAX_BYTES = int(os.environ.get('EXPORT_SPOOL_MAX_BYTES', str(8 * 1024 * 1024)))
+    # Disk cache of finished exports, keyed by a hash of their input
+    EXPORT_CACHE_ENABLED = os.environ.get('EXPORT_CACHE_ENABLED', 'True').lower() == 'true'
+    EXPORT_CACHE_DIR = os.environ.get('EXPORT_CACHE_DIR')  # defaults to <tmp>/smartslide-exports
+    EXPORT_CACHE_MAX_BYTES = int(os.environ.get('EXPORT_CACHE_MAX_BYTES', str(512 * 1024 * 1024)))
+    # Export profile used when a request names none: draft, standard or print
+    EXPORT_DEFAULT_PROFILE = os.environ.get('EXPORT_DEFAULT_PROFILE', 'standard')
+    # Server-rendered slide thumbnails
+    THUMBNAIL_WIDTH = int(os.environ.get('THUMBNAIL_WIDTH', '320'))
+    THUMBNAIL_FORMAT = os.environ.get('THUMBNAIL_FORMAT', 'WEBP')
+    THUMBNAIL_CACHE_DIR = os.environ.get('THUMBNAIL_CACHE_DIR')  # defaults to <tmp>/smartslide-thumbnails
+    THUMBNAIL_CACHE_MAX_BYTES = int(os.environ.get('THUMBNAIL_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+    # Largest page the dashboard presentation list returns
+    PRESENTATION_LIST_MAX_LIMIT = int(os.environ.get('PRESENTATION_LIST_MAX_LIMIT', '50'))
+    # Newest presentations kept in each user's dashboard summary document
+    PRESENTATION_SUMMARY_SIZE = int(os.environ.get('PRESENTATION_SUMMARY_SIZE', '50'))
+    # Editor autosaves of a presentation are coalesced for this many idle seconds (0 writes each one)
+    AUTOSAVE_COALESCE_SECONDS = float(os.environ.get('AUTOSAVE_COALESCE_SECONDS', '2'))
+    # Longest an autosave waits during a continuous burst of edits
+    AUTOSAVE_MAX_DELAY_SECONDS = float(os.environ.get('AUTOSAVE_MAX_DELAY_SECONDS', '10'))
@@ -0,0 +1,29 @@
+from app.template_assets import load_template_assets
+from app.vector_templates import LOOK_CONVERTERS, convert_png_template, write_vector_template
+
+def convert_builtin_templates():
+    """Write a vector version of every built-in PNG template that has a converter"""
+    print("Converting built-in templates to vector templates...")
+    load_template_assets()
+
+    converted_count = 0
+    for template_id in LOOK_CONVERTERS:
+        data = convert_png_template(template_id)
+        if data is None:
+            print(f"Skipped {template_id}: background images not found")
+            continue
+        path = write_vector_template(data)
+        shape_count = sum(len(shapes) for shapes in data["slides"].values())
+        print(f"Wrote {path} ({shape_count} shapes)")
+        converted_count += 1
+
+    print(f"Conversion completed! Wrote {converted_count} vector templates.")
+
+if __name__ == "__main__":
+    try:
+        convert_builtin_templates()
+        print("\n✅ All templates converted successfully!")
+    except Exception as e:
+        print(f"❌ Error during conversion: {str(e)}")
+        import traceback
+        traceback.print_exc()
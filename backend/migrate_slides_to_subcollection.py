@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Move presentations that keep their deck in a 'slides' array to one
+document per slide under presentations/<id>/slides (see app/slide_store.py).
+
+Each presentation is moved in its own transaction, so editors saving at the
+same time are never lost. Safe to re-run: moved presentations are skipped.
+
+Usage (from the backend directory):
+    python migrate_slides_to_subcollection.py [--dry-run]
+"""
+
+import sys
+import firebase_admin
+from firebase_admin import credentials, firestore
+from app.slide_store import can_store_slides, stage_slide_writes, uses_slide_subcollection
+
+# Initialize Firebase (same as in routes.py)
+cred = credentials.Certificate("firebase_key.json")
+if not firebase_admin._apps:
+    firebase_admin.initialize_app(cred)
+firestore_db = firestore.client()
+
+# Firestore commits at most 500 writes; the parent update takes one
+MAX_SLIDES_PER_COMMIT = 499
+
+def migrate_presentation(presentation_ref, dry_run=False):
+    """
+    Move one presentation's slides into its subcollection.
+
+    Returns:
+        'moved', 'skipped' (already moved, gone or empty) or 'kept' (cannot be moved)
+    """
+    @firestore.transactional
+    def move(transaction):
+        snapshot = presentation_ref.get(transaction=transaction)
+        if not snapshot.exists:
+            return 'skipped'
+        data = snapshot.to_dict()
+        slides = data.get('slides')
+        if uses_slide_subcollection(data) or slides is None:
+            return 'skipped'
+        if not can_store_slides(slides) or len(slides) > MAX_SLIDES_PER_COMMIT:
+            return 'kept'
+        if dry_run:
+            return 'moved'
+        fields = stage_slide_writes(transaction, presentation_ref, slides)
+        fields['slides'] = firestore.DELETE_FIELD
+        fields['slide_count'] = len(slides)
+        transaction.update(presentation_ref, fields)
+        return 'moved'
+
+    return move(firestore_db.transaction())
+
+def migrate_slides(dry_run=False):
+    print(f"Starting slide migration{' (dry run)' if dry_run else ''}...")
+    counts = {'moved': 0, 'skipped': 0, 'kept': 0}
+
+    # Only the storage marker is read here; each candidate is re-read in its transaction
+    presentations = firestore_db.collection('presentations').select(['slide_storage']).stream()
+    for presentation_doc in presentations:
+        if uses_slide_subcollection(presentation_doc.to_dict()):
+            counts['skipped'] += 1
+            continue
+        try:
+            result = migrate_presentation(presentation_doc.reference, dry_run)
+        except Exception as e:
+            print(f"Failed to migrate presentation {presentation_doc.id}: {e}")
+            continue
+        counts[result] += 1
+        if result == 'moved':
+            print(f"Moved slides of presentation {presentation_doc.id}")
+        elif result == 'kept':
+            print(f"Kept presentation {presentation_doc.id} inline (non-map slides or too many to commit at once)")
+
+    print(f"Migration completed! Moved {counts['moved']}, skipped {counts['skipped']}, kept inline {counts['kept']}.")
+
+if __name__ == "__main__":
+    migrate_slides(dry_run="--dry-run" in sys.argv)
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Report how many documents and bytes the dashboard presentation list reads
+from Firestore, before and after the limited, projected query.
+
+Sizes follow Firestore's storage size rules, which is what each document
+costs on the wire up to encoding overhead.
+
+Usage (from the backend directory):
+    python report_presentation_list_bytes.py <user_id> [<user_id> ...]
+"""
+
+import sys
+import firebase_admin
+from firebase_admin import credentials, firestore
+
+# Initialize Firebase (same as in routes.py)
+cred = credentials.Certificate("firebase_key.json")
+if not firebase_admin._apps:
+    firebase_admin.initialize_app(cred)
+firestore_db = firestore.client()
+
+# Must match PRESENTATION_LIST_FIELDS / PRESENTATION_SUMMARY_FIELDS in app/routes.py
+LIST_FIELDS = ['title', 'template', 'presentation_type', 'created_at', 'updated_at']
+SUMMARY_FIELDS = ['slide_count', 'cover_thumbnail_key']
+PAGE_SIZE = 10
+
+def value_size(value):
+    """Storage size of a Firestore value"""
+    if value is None or isinstance(value, bool):
+        return 1
+    if isinstance(value, (int, float)) or hasattr(value, 'timestamp'):
+        return 8
+    if isinstance(value, str):
+        return len(value.encode('utf-8')) + 1
+    if isinstance(value, bytes):
+        return len(value)
+    if isinstance(value, (list, tuple)):
+        return sum(value_size(item) for item in value)
+    if isinstance(value, dict):
+        return sum(len(str(key).encode('utf-8')) + 1 + value_size(item) for key, item in value.items())
+    if hasattr(value, 'path'):  # DocumentReference
+        return name_size(value.path)
+    return 16  # GeoPoint
+
+def name_size(path):
+    return sum(len(segment.encode('utf-8')) + 1 for segment in path.split('/')) + 16
+
+def document_size(snapshot):
+    """Storage size of a document snapshot: its name, its (projected) fields and 32 bytes of overhead"""
+    return name_size(snapshot.reference.path) + value_size(snapshot.to_dict() or {}) + 32
+
+def measure(docs):
+    docs = list(docs)
+    return len(docs), sum(document_size(doc) for doc in docs)
+
+def report_user(user_id):
+    presentations_ref = firestore_db.collection('presentations')
+
+    # Before: every presentation of the user with all fields, trimmed to 10 in Python
+    before = measure(presentations_ref.where('user_id', '==', user_id).stream())
+
+    # After: the page the endpoint reads now, plus its one look-ahead document
+    query = (
+        presentations_ref.where('user_id', '==', user_id)
+        .order_by('created_at', direction=firestore.Query.DESCENDING)
+        .order_by('__name__', direction=firestore.Query.DESCENDING)
+    )
+    after = measure(query.select(LIST_FIELDS).limit(PAGE_SIZE + 1).stream())
+    after_summary = measure(query.select(LIST_FIELDS + SUMMARY_FIELDS).limit(PAGE_SIZE + 1).stream())
+
+    print(f"User {user_id}:")
+    print(f"  before:           {before[0]:>5} docs {before[1]:>12,} bytes")
+    print(f"  after:            {after[0]:>5} docs {after[1]:>12,} bytes")
+    print(f"  after (summary):  {after_summary[0]:>5} docs {after_summary[1]:>12,} bytes")
+    if after[1]:
+        print(f"  {before[1] / after[1]:.1f}x fewer bytes")
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    for user_id in sys.argv[1:]:
+        report_user(user_id)